@@ -0,0 +1,108 @@
+"""Times the hot dashboard and report queries against the short term database."""
+
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+
+from pyodbc import Connection
+
+from backend import DIALECTS, get_sqlite_connection
+
+HOT_QUERIES = {
+    "latest_readings": """
+        WITH LatestReadings AS (
+            SELECT r.plant_id, r.temperature, r.soil_moisture, r.recording_taken,
+                ROW_NUMBER() OVER (PARTITION BY r.plant_id
+                                   ORDER BY r.recording_taken DESC) as record
+            FROM {schema}.record r
+        )
+        SELECT lr.plant_id, p.name, lr.temperature, lr.soil_moisture, lr.recording_taken
+        FROM LatestReadings lr
+        JOIN {schema}.plant p ON lr.plant_id = p.plant_id
+        WHERE lr.record = 1
+    """,
+    "report_latest_three": """
+        WITH LatestReadings AS (
+            SELECT r.plant_id, r.temperature, r.soil_moisture, r.recording_taken,
+                ROW_NUMBER() OVER (PARTITION BY r.plant_id
+                                   ORDER BY r.recording_taken DESC) as record
+            FROM {schema}.record r
+        )
+        SELECT lr.plant_id, lr.temperature, lr.soil_moisture, lr.recording_taken,
+            b.botanist_id, b.name, b.phone
+        FROM LatestReadings lr
+        JOIN {schema}.botanist_plant bp ON lr.plant_id = bp.plant_id
+        JOIN {schema}.botanist b ON bp.botanist_id = b.botanist_id
+        WHERE lr.record <= 3
+    """,
+    "readings_24h": """
+        SELECT r.temperature, r.soil_moisture, r.recording_taken, p.name, r.plant_id
+        FROM {schema}.record r
+        JOIN {schema}.plant p ON r.plant_id = p.plant_id
+        WHERE r.recording_taken >= {hours_ago}
+        ORDER BY r.recording_taken
+    """,
+    "least_readings": """
+        SELECT {top} p.plant_id, p.name, COUNT(r.record_id) as reading_count
+        FROM {schema}.plant p
+        LEFT JOIN {schema}.record r ON p.plant_id = r.plant_id
+        GROUP BY p.plant_id, p.name
+        ORDER BY reading_count
+        {limit}
+    """
+}
+
+
+def time_query(conn: Connection, query: str, repeats: int) -> float:
+    """Return the median seconds taken to run a query and fetch its rows."""
+    timings = []
+    with conn.cursor() as curs:
+        for _ in range(repeats):
+            start = perf_counter()
+            curs.execute(query)
+            curs.fetchall()
+            timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def get_query(query: str, schema: str, backend: str = "mssql") -> str:
+    """Return a hot query for the given schema and database backend."""
+    dialect = DIALECTS[backend]
+    return query.format(schema=schema,
+                        hours_ago=dialect["hours_ago"].format(hours=24),
+                        top=dialect["top"].format(rows=5),
+                        limit=dialect["limit"].format(rows=5))
+
+
+def benchmark_queries(conn: Connection, schema: str, repeats: int = 5,
+                      backend: str = "mssql") -> dict[str, float]:
+    """Return the median run time of each hot query."""
+    return {name: time_query(conn, get_query(query, schema, backend), repeats)
+            for name, query in HOT_QUERIES.items()}
+
+
+def print_comparison(before: dict[str, float], after: dict[str, float]):
+    """Print query timings before and after a change."""
+    print(f"{'query':<22}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name, before_time in before.items():
+        after_time = after[name]
+        speedup = before_time / after_time if after_time else float("inf")
+        print(f"{name:<22}{before_time * 1000:>14.1f}"
+              f"{after_time * 1000:>14.1f}{speedup:>9.1f}x")
+
+
+def print_timings(timings: dict[str, float]):
+    """Print query timings."""
+    print(f"{'query':<22}{'time (ms)':>14}")
+    for name, timing in timings.items():
+        print(f"{name:<22}{timing * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time the hot queries on a local SQLite database.")
+    parser.add_argument("db_path", help="Path to a database made by set_up_local_database.py")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    local_conn = get_sqlite_connection(args.db_path, "gamma")
+    print_timings(benchmark_queries(local_conn, "gamma", args.repeats, "sqlite"))
+    local_conn.close()
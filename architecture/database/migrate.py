@@ -0,0 +1,177 @@
+"""Applies versioned schema migrations to the short term database."""
+
+from argparse import ArgumentParser
+from logging import getLogger, StreamHandler, INFO
+from os import environ as ENV, listdir, path
+from re import compile as compile_regex
+from sys import stdout
+
+from dotenv import load_dotenv
+from pyodbc import connect, Connection
+
+from benchmark_queries import benchmark_queries, print_comparison
+
+MIGRATION_DIR = path.join(path.dirname(path.abspath(__file__)), "migrations")
+MIGRATION_PATTERN = compile_regex(r"^(\d{3})_(\w+?)(\.optional)?\.sql$")
+BATCH_SEPARATOR = compile_regex(r"(?im)^\s*GO\s*;?\s*$")
+
+
+def set_logger():
+    """Set logger."""
+    logger = getLogger()
+    logger.setLevel(INFO)
+    logger.addHandler(StreamHandler(stdout))
+
+
+def get_connection() -> Connection:
+    """Return database connection."""
+    logger = getLogger()
+    logger.info("Getting RDS connection...")
+    connection_string = f"""
+                            DRIVER={{ODBC Driver 18 for SQL Server}};
+                            SERVER={ENV["DB_HOST"]},{ENV["DB_PORT"]};
+                            DATABASE={ENV["DB_NAME"]};
+                            UID={ENV["DB_USER"]};
+                            PWD={ENV["DB_PASSWORD"]};
+                            TrustServerCertificate=yes;
+                            Encrypt=yes;
+                            Connection Timeout=30;
+                         """
+    return connect(connection_string)
+
+
+def get_schema() -> str:
+    """Return schema name from environment."""
+    schema = ENV["DB_SCHEMA"]
+    if not schema.isidentifier():
+        raise ValueError(f"Invalid schema name: {schema}")
+    return schema
+
+
+def parse_migration_name(filename: str) -> dict | None:
+    """Return migration details from a file name, or None if it is not a migration."""
+    match = MIGRATION_PATTERN.match(filename)
+    if not match:
+        return None
+    return {
+        "version": int(match.group(1)),
+        "name": match.group(2),
+        "optional": bool(match.group(3)),
+        "filename": filename
+    }
+
+
+def get_migrations(directory: str = MIGRATION_DIR) -> list[dict]:
+    """Return all migrations in a directory ordered by version."""
+    migrations = [parse_migration_name(filename)
+                  for filename in listdir(directory)]
+    migrations = sorted((migration for migration in migrations if migration),
+                        key=lambda migration: migration["version"])
+    versions = [migration["version"] for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration versions found.")
+    return migrations
+
+
+def get_pending_migrations(migrations: list[dict], applied: set[int],
+                           include_optional: bool = False) -> list[dict]:
+    """Return migrations that still need to be applied, in order."""
+    return [migration for migration in migrations
+            if migration["version"] not in applied
+            and (include_optional or not migration["optional"])]
+
+
+def split_batches(sql: str) -> list[str]:
+    """Return the batches of a script separated by `GO` lines."""
+    return [batch.strip() for batch in BATCH_SEPARATOR.split(sql)
+            if batch.strip()]
+
+
+def read_migration(migration: dict, schema: str,
+                   directory: str = MIGRATION_DIR) -> list[str]:
+    """Return the SQL batches of a migration for the given schema."""
+    with open(path.join(directory, migration["filename"]), encoding="utf-8") as file:
+        sql = file.read()
+    return split_batches(sql.replace("{schema}", schema))
+
+
+def ensure_migration_table(conn: Connection, schema: str):
+    """Create the table recording applied migrations if it does not exist."""
+    with conn.cursor() as curs:
+        curs.execute(f"""
+            IF OBJECT_ID('{schema}.schema_migration') IS NULL
+            CREATE TABLE {schema}.schema_migration (
+                version SMALLINT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                applied_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            );""")
+    conn.commit()
+
+
+def get_applied_versions(conn: Connection, schema: str) -> set[int]:
+    """Return the versions of migrations already applied."""
+    with conn.cursor() as curs:
+        curs.execute(f"SELECT version FROM {schema}.schema_migration;")
+        return {row[0] for row in curs.fetchall()}
+
+
+def apply_migration(conn: Connection, schema: str, migration: dict):
+    """Apply a migration and record it in a single transaction."""
+    logger = getLogger()
+    logger.info("Applying migration %03d_%s...",
+                migration["version"], migration["name"])
+    batches = read_migration(migration, schema)
+    try:
+        with conn.cursor() as curs:
+            for batch in batches:
+                curs.execute(batch)
+            curs.execute(
+                f"INSERT INTO {schema}.schema_migration (version, name) VALUES (?, ?);",
+                (migration["version"], migration["name"]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_migrations(conn: Connection, schema: str, include_optional: bool = False) -> list[dict]:
+    """Apply all pending migrations and return them."""
+    logger = getLogger()
+    ensure_migration_table(conn, schema)
+    pending = get_pending_migrations(get_migrations(),
+                                     get_applied_versions(conn, schema),
+                                     include_optional)
+    if not pending:
+        logger.info("Database is up to date.")
+    for migration in pending:
+        apply_migration(conn, schema, migration)
+    return pending
+
+
+def get_arguments():
+    """Return command line arguments."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--optional", action="store_true",
+                        help="Also apply migrations marked as optional.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Time the hot queries before and after migrating.")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Runs of each query when benchmarking.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    set_logger()
+    args = get_arguments()
+    target_schema = get_schema()
+    db_conn = get_connection()
+    try:
+        before = (benchmark_queries(db_conn, target_schema, args.repeats)
+                  if args.benchmark else None)
+        run_migrations(db_conn, target_schema, args.optional)
+        if args.benchmark:
+            after = benchmark_queries(db_conn, target_schema, args.repeats)
+            print_comparison(before, after)
+    finally:
+        db_conn.close()
@@ -0,0 +1,10 @@
+-- Covering index for the latest-reading and per-plant queries.
+-- Serves ROW_NUMBER() OVER (PARTITION BY plant_id ORDER BY recording_taken DESC)
+-- and COUNT(record_id) per plant without touching the clustered key.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE name = 'ix_record_plant_recording'
+               AND object_id = OBJECT_ID('{schema}.record'))
+CREATE NONCLUSTERED INDEX ix_record_plant_recording
+    ON {schema}.record (plant_id, recording_taken DESC)
+    INCLUDE (temperature, soil_moisture, last_watered);
+GO
@@ -0,0 +1,18 @@
+-- Nonclustered columnstore index for range aggregates over the day's readings,
+-- such as the last 24 hours query and the nightly summary.
+-- Optional: only applied with `python3 migrate.py --optional`.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE name = 'ncci_record'
+               AND object_id = OBJECT_ID('{schema}.record'))
+CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_record
+    ON {schema}.record (plant_id, recording_taken, temperature, soil_moisture);
+GO
+
+-- Partition switching needs matching indexes on the archive table (see 004).
+IF OBJECT_ID('{schema}.record_archive') IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM sys.indexes
+                WHERE name = 'ncci_record'
+                AND object_id = OBJECT_ID('{schema}.record_archive'))
+CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_record
+    ON {schema}.record_archive (plant_id, recording_taken, temperature, soil_moisture);
+GO
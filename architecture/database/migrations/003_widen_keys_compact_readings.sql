@@ -0,0 +1,93 @@
+-- Widens the TINYINT keys that capped the system at 255 plants, botanists
+-- and countries, and stores sensor readings as DECIMAL(7,2) (5 bytes)
+-- instead of FLOAT (8 bytes). The transform already rounds readings to 2dp.
+--
+-- Constraints in the baseline schema are unnamed, so they are looked up and
+-- dropped dynamically, then recreated with fixed names.
+
+IF OBJECT_ID('tempdb..#dropped_index') IS NOT NULL
+    DROP TABLE #dropped_index;
+CREATE TABLE #dropped_index (name SYSNAME PRIMARY KEY);
+GO
+
+INSERT INTO #dropped_index (name)
+SELECT name FROM sys.indexes
+WHERE object_id = OBJECT_ID('{schema}.record')
+AND name IN ('ix_record_plant_recording', 'ncci_record');
+
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ix_record_plant_recording')
+    DROP INDEX ix_record_plant_recording ON {schema}.record;
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ncci_record')
+    DROP INDEX ncci_record ON {schema}.record;
+GO
+
+DECLARE @sql NVARCHAR(MAX);
+
+SELECT @sql = STRING_AGG(CAST(
+    N'ALTER TABLE {schema}.' + QUOTENAME(OBJECT_NAME(parent_object_id))
+    + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';' AS NVARCHAR(MAX)), N' ')
+FROM sys.foreign_keys
+WHERE referenced_object_id IN (OBJECT_ID('{schema}.origin_country'),
+                               OBJECT_ID('{schema}.botanist'),
+                               OBJECT_ID('{schema}.plant'));
+IF @sql IS NOT NULL
+    EXEC sp_executesql @sql;
+
+SELECT @sql = STRING_AGG(CAST(
+    N'ALTER TABLE {schema}.' + QUOTENAME(OBJECT_NAME(parent_object_id))
+    + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';' AS NVARCHAR(MAX)), N' ')
+FROM sys.key_constraints
+WHERE type = 'PK'
+AND parent_object_id IN (OBJECT_ID('{schema}.origin_country'),
+                         OBJECT_ID('{schema}.botanist'),
+                         OBJECT_ID('{schema}.plant'),
+                         OBJECT_ID('{schema}.botanist_plant'));
+IF @sql IS NOT NULL
+    EXEC sp_executesql @sql;
+GO
+
+ALTER TABLE {schema}.origin_country ALTER COLUMN country_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.origin_city ALTER COLUMN country_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.botanist ALTER COLUMN botanist_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.plant ALTER COLUMN plant_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.botanist_plant ALTER COLUMN botanist_plant_id INT NOT NULL;
+ALTER TABLE {schema}.botanist_plant ALTER COLUMN plant_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.botanist_plant ALTER COLUMN botanist_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.record ALTER COLUMN plant_id SMALLINT NOT NULL;
+ALTER TABLE {schema}.record ALTER COLUMN temperature DECIMAL(7,2) NULL;
+ALTER TABLE {schema}.record ALTER COLUMN soil_moisture DECIMAL(7,2) NULL;
+GO
+
+ALTER TABLE {schema}.origin_country
+    ADD CONSTRAINT PK_origin_country PRIMARY KEY (country_id);
+ALTER TABLE {schema}.botanist
+    ADD CONSTRAINT PK_botanist PRIMARY KEY (botanist_id);
+ALTER TABLE {schema}.plant
+    ADD CONSTRAINT PK_plant PRIMARY KEY (plant_id);
+ALTER TABLE {schema}.botanist_plant
+    ADD CONSTRAINT PK_botanist_plant PRIMARY KEY (botanist_plant_id);
+
+ALTER TABLE {schema}.origin_city
+    ADD CONSTRAINT FK_origin_city_origin_country
+    FOREIGN KEY (country_id) REFERENCES {schema}.origin_country (country_id);
+ALTER TABLE {schema}.botanist_plant
+    ADD CONSTRAINT FK_botanist_plant_plant
+    FOREIGN KEY (plant_id) REFERENCES {schema}.plant (plant_id);
+ALTER TABLE {schema}.botanist_plant
+    ADD CONSTRAINT FK_botanist_plant_botanist
+    FOREIGN KEY (botanist_id) REFERENCES {schema}.botanist (botanist_id);
+ALTER TABLE {schema}.record
+    ADD CONSTRAINT FK_record_plant
+    FOREIGN KEY (plant_id) REFERENCES {schema}.plant (plant_id);
+GO
+
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ix_record_plant_recording')
+CREATE NONCLUSTERED INDEX ix_record_plant_recording
+    ON {schema}.record (plant_id, recording_taken DESC)
+    INCLUDE (temperature, soil_moisture, last_watered);
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ncci_record')
+CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_record
+    ON {schema}.record (plant_id, recording_taken, temperature, soil_moisture);
+
+DROP TABLE #dropped_index;
+GO
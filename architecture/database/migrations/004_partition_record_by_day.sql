@@ -0,0 +1,99 @@
+-- Partitions `record` by day on recording_taken so the long term pipeline can
+-- switch a closed day out to `record_archive` as a metadata-only operation,
+-- instead of reading the whole table and truncating it under the short term
+-- pipeline's inserts.
+--
+-- Both tables share the partition scheme and have identical clustered and
+-- nonclustered indexes, which SWITCH requires. Any index later added to
+-- `record` must also be added to `record_archive`.
+
+IF OBJECT_ID('tempdb..#dropped_index') IS NOT NULL
+    DROP TABLE #dropped_index;
+CREATE TABLE #dropped_index (name SYSNAME PRIMARY KEY);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'pf_record_day')
+BEGIN
+    DECLARE @today DATE = CAST(GETDATE() AS DATE);
+    DECLARE @sql NVARCHAR(MAX) = N'CREATE PARTITION FUNCTION pf_record_day (DATETIME)
+        AS RANGE RIGHT FOR VALUES ('
+        + N'''' + CONVERT(NVARCHAR(10), DATEADD(day, -1, @today), 23) + N''', '
+        + N'''' + CONVERT(NVARCHAR(10), @today, 23) + N''', '
+        + N'''' + CONVERT(NVARCHAR(10), DATEADD(day, 1, @today), 23) + N''', '
+        + N'''' + CONVERT(NVARCHAR(10), DATEADD(day, 2, @today), 23) + N''', '
+        + N'''' + CONVERT(NVARCHAR(10), DATEADD(day, 3, @today), 23) + N''');';
+    EXEC sp_executesql @sql;
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'ps_record_day')
+CREATE PARTITION SCHEME ps_record_day
+    AS PARTITION pf_record_day ALL TO ([PRIMARY]);
+GO
+
+INSERT INTO #dropped_index (name)
+SELECT name FROM sys.indexes
+WHERE object_id = OBJECT_ID('{schema}.record')
+AND name IN ('ix_record_plant_recording', 'ncci_record');
+
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ix_record_plant_recording')
+    DROP INDEX ix_record_plant_recording ON {schema}.record;
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ncci_record')
+    DROP INDEX ncci_record ON {schema}.record;
+
+DECLARE @sql NVARCHAR(MAX);
+SELECT @sql = N'ALTER TABLE {schema}.record DROP CONSTRAINT ' + QUOTENAME(name) + N';'
+FROM sys.key_constraints
+WHERE type = 'PK' AND parent_object_id = OBJECT_ID('{schema}.record');
+IF @sql IS NOT NULL
+    EXEC sp_executesql @sql;
+GO
+
+-- Readings without a timestamp cannot be placed in a day.
+DELETE FROM {schema}.record WHERE recording_taken IS NULL;
+ALTER TABLE {schema}.record ALTER COLUMN recording_taken DATETIME NOT NULL;
+GO
+
+ALTER TABLE {schema}.record
+    ADD CONSTRAINT PK_record PRIMARY KEY CLUSTERED (record_id, recording_taken)
+    ON ps_record_day (recording_taken);
+GO
+
+IF OBJECT_ID('{schema}.record_archive') IS NULL
+CREATE TABLE {schema}.record_archive (
+    record_id BIGINT IDENTITY(1,1) NOT NULL,
+    temperature DECIMAL(7,2),
+    last_watered DATETIME,
+    soil_moisture DECIMAL(7,2),
+    recording_taken DATETIME NOT NULL,
+    plant_id SMALLINT NOT NULL,
+    CONSTRAINT PK_record_archive PRIMARY KEY CLUSTERED (record_id, recording_taken)
+        ON ps_record_day (recording_taken),
+    CONSTRAINT FK_record_archive_plant
+        FOREIGN KEY (plant_id) REFERENCES {schema}.plant (plant_id)
+) ON ps_record_day (recording_taken);
+GO
+
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ix_record_plant_recording')
+BEGIN
+    CREATE NONCLUSTERED INDEX ix_record_plant_recording
+        ON {schema}.record (plant_id, recording_taken DESC)
+        INCLUDE (temperature, soil_moisture, last_watered)
+        ON ps_record_day (recording_taken);
+    CREATE NONCLUSTERED INDEX ix_record_plant_recording
+        ON {schema}.record_archive (plant_id, recording_taken DESC)
+        INCLUDE (temperature, soil_moisture, last_watered)
+        ON ps_record_day (recording_taken);
+END
+IF EXISTS (SELECT 1 FROM #dropped_index WHERE name = 'ncci_record')
+BEGIN
+    CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_record
+        ON {schema}.record (plant_id, recording_taken, temperature, soil_moisture)
+        ON ps_record_day (recording_taken);
+    CREATE NONCLUSTERED COLUMNSTORE INDEX ncci_record
+        ON {schema}.record_archive (plant_id, recording_taken, temperature, soil_moisture)
+        ON ps_record_day (recording_taken);
+END
+
+DROP TABLE #dropped_index;
+GO
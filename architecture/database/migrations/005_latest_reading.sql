@@ -0,0 +1,29 @@
+-- Holds each plant's newest reading, replaced by the short term pipeline every
+-- minute. Lets the dashboard show fresh readings while `record` is only
+-- written to in bulk when the pipeline buffers readings between flushes.
+--
+-- There is no foreign key to `plant`, as a new plant's first readings can
+-- arrive before its buffered `plant` row is flushed.
+IF OBJECT_ID('{schema}.latest_reading') IS NULL
+CREATE TABLE {schema}.latest_reading (
+    plant_id SMALLINT NOT NULL,
+    temperature DECIMAL(7,2),
+    last_watered DATETIME,
+    soil_moisture DECIMAL(7,2),
+    recording_taken DATETIME NOT NULL,
+    CONSTRAINT PK_latest_reading PRIMARY KEY (plant_id)
+);
+GO
+
+INSERT INTO {schema}.latest_reading
+    (plant_id, temperature, last_watered, soil_moisture, recording_taken)
+SELECT plant_id, temperature, last_watered, soil_moisture, recording_taken
+FROM (
+    SELECT r.*, ROW_NUMBER() OVER (PARTITION BY r.plant_id
+                                   ORDER BY r.recording_taken DESC) AS record
+    FROM {schema}.record r
+) latest
+WHERE latest.record = 1
+AND NOT EXISTS (SELECT 1 FROM {schema}.latest_reading lr
+                WHERE lr.plant_id = latest.plant_id);
+GO
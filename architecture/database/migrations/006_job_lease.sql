@@ -0,0 +1,41 @@
+-- Guards the per-minute short term pipeline and report against overlapping
+-- runs. A run holds its job's lease row until it finishes, or until the lease
+-- expires if the run was killed. Runs that find the lease held are skipped, or
+-- merged into the running one, and every run is recorded in `job_run` with how
+-- far behind its schedule it started, so sustained overload is visible.
+IF OBJECT_ID('{schema}.job_lease') IS NULL
+CREATE TABLE {schema}.job_lease (
+    job_name VARCHAR(50) NOT NULL,
+    holder VARCHAR(32),
+    expires_at DATETIME,
+    pending BIT NOT NULL DEFAULT 0,
+    CONSTRAINT PK_job_lease PRIMARY KEY (job_name)
+);
+GO
+
+IF OBJECT_ID('{schema}.job_run') IS NULL
+CREATE TABLE {schema}.job_run (
+    run_id INT IDENTITY(1,1) NOT NULL,
+    job_name VARCHAR(50) NOT NULL,
+    scheduled_at DATETIME,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME,
+    lag_seconds FLOAT,
+    duration_seconds FLOAT,
+    outcome VARCHAR(10) NOT NULL,
+    CONSTRAINT PK_job_run PRIMARY KEY (run_id)
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE name = 'ix_job_run_job_started'
+               AND object_id = OBJECT_ID('{schema}.job_run'))
+CREATE NONCLUSTERED INDEX ix_job_run_job_started
+    ON {schema}.job_run (job_name, started_at DESC);
+GO
+
+INSERT INTO {schema}.job_lease (job_name, pending)
+SELECT job_name, 0
+FROM (VALUES ('short_pipeline'), ('report')) AS jobs (job_name)
+WHERE NOT EXISTS (SELECT 1 FROM {schema}.job_lease jl WHERE jl.job_name = jobs.job_name);
+GO
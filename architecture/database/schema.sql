@@ -1,3 +1,6 @@
+-- Baseline schema (version 0).
+-- Later revisions are versioned scripts in migrations/, applied with migrate.py.
+
 USE plants;
 GO
 
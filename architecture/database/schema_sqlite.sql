@@ -0,0 +1,101 @@
+-- SQLite version of the short term schema for local runs and benchmarks.
+-- Mirrors schema.sql with all migrations applied. SQLite has no partitions,
+-- so record_archive is a plain table that closed days are moved into.
+
+DROP TABLE IF EXISTS job_run;
+DROP TABLE IF EXISTS job_lease;
+DROP TABLE IF EXISTS latest_reading;
+DROP TABLE IF EXISTS botanist_plant;
+DROP TABLE IF EXISTS record_archive;
+DROP TABLE IF EXISTS record;
+DROP TABLE IF EXISTS plant;
+DROP TABLE IF EXISTS botanist;
+DROP TABLE IF EXISTS origin_city;
+DROP TABLE IF EXISTS origin_country;
+
+CREATE TABLE origin_country (
+    country_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE botanist (
+    botanist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    email VARCHAR(50) NOT NULL,
+    phone VARCHAR(20) NOT NULL
+);
+
+CREATE TABLE origin_city (
+    city_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    country_id SMALLINT NOT NULL,
+    FOREIGN KEY (country_id) REFERENCES origin_country(country_id)
+);
+
+CREATE TABLE plant (
+    plant_id SMALLINT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    city_id INT NOT NULL,
+    FOREIGN KEY (city_id) REFERENCES origin_city(city_id)
+);
+
+CREATE TABLE botanist_plant (
+    botanist_plant_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plant_id SMALLINT NOT NULL,
+    botanist_id SMALLINT NOT NULL,
+    FOREIGN KEY (plant_id) REFERENCES plant(plant_id),
+    FOREIGN KEY (botanist_id) REFERENCES botanist(botanist_id)
+);
+
+CREATE TABLE record (
+    record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    temperature DECIMAL(7,2),
+    last_watered DATETIME,
+    soil_moisture DECIMAL(7,2),
+    recording_taken DATETIME NOT NULL,
+    plant_id SMALLINT NOT NULL,
+    FOREIGN KEY (plant_id) REFERENCES plant(plant_id)
+);
+
+CREATE INDEX ix_record_plant_recording
+    ON record (plant_id, recording_taken DESC);
+
+CREATE TABLE record_archive (
+    record_id INTEGER PRIMARY KEY,
+    temperature DECIMAL(7,2),
+    last_watered DATETIME,
+    soil_moisture DECIMAL(7,2),
+    recording_taken DATETIME NOT NULL,
+    plant_id SMALLINT NOT NULL,
+    FOREIGN KEY (plant_id) REFERENCES plant(plant_id)
+);
+
+CREATE TABLE latest_reading (
+    plant_id SMALLINT PRIMARY KEY,
+    temperature DECIMAL(7,2),
+    last_watered DATETIME,
+    soil_moisture DECIMAL(7,2),
+    recording_taken DATETIME NOT NULL
+);
+
+CREATE TABLE job_lease (
+    job_name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(32),
+    expires_at DATETIME,
+    pending BIT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE job_run (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_name VARCHAR(50) NOT NULL,
+    scheduled_at DATETIME,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME,
+    lag_seconds FLOAT,
+    duration_seconds FLOAT,
+    outcome VARCHAR(10) NOT NULL
+);
+
+CREATE INDEX ix_job_run_job_started ON job_run (job_name, started_at DESC);
+
+INSERT INTO job_lease (job_name, pending) VALUES ('short_pipeline', 0), ('report', 0);
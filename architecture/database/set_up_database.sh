@@ -1,2 +1,3 @@
 source .env
-sqlcmd -S $DB_HOST,$DB_PORT -U $DB_USER -P $DB_PASSWORD -d $DB_NAME -i schema.sql
\ No newline at end of file
+sqlcmd -S $DB_HOST,$DB_PORT -U $DB_USER -P $DB_PASSWORD -d $DB_NAME -i schema.sql
+python3 migrate.py
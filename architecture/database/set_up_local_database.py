@@ -0,0 +1,92 @@
+"""Creates a local SQLite copy of the short term database, optionally filled with readings."""
+
+import sqlite3
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from logging import getLogger, INFO, basicConfig
+from random import Random
+
+SCHEMA_FILE = "schema_sqlite.sql"
+
+
+def set_logger():
+    """Set logger."""
+    basicConfig(level=INFO)
+
+
+def create_database(db_path: str, schema_file: str = SCHEMA_FILE) -> sqlite3.Connection:
+    """Return a connection to a new SQLite database with the short term schema."""
+    logger = getLogger()
+    with open(schema_file, encoding="utf-8") as file:
+        schema = file.read()
+    conn = sqlite3.connect(db_path)
+    conn.executescript(schema)
+    logger.info("Created SQLite database at %s.", db_path)
+    return conn
+
+
+def get_seed_rows(plants: int, days: int, end: datetime, seed: int = 0) -> dict[str, list]:
+    """Return synthetic rows for every table, with one reading per plant per minute."""
+    rand = Random(seed)
+    countries = [(f"Country {i}",) for i in range(1, 11)]
+    cities = [(f"City {i}", i % len(countries) + 1) for i in range(1, 51)]
+    botanists = [(f"Botanist {i}", f"botanist{i}@lnhm.co.uk", f"0{i:010d}")
+                 for i in range(1, 11)]
+    plant_rows = [(i, f"Plant {i}", rand.randint(1, len(cities))) for i in range(1, plants + 1)]
+    botanist_plants = [(i, rand.randint(1, len(botanists))) for i in range(1, plants + 1)]
+
+    start = end - timedelta(days=days)
+    minutes = days * 24 * 60
+    records = []
+    for plant_id in range(1, plants + 1):
+        temperature = rand.uniform(10, 20)
+        moisture = rand.uniform(20, 60)
+        for minute in range(minutes):
+            taken = start + timedelta(minutes=minute)
+            temperature += rand.uniform(-0.1, 0.1)
+            moisture += rand.uniform(-0.2, 0.2)
+            records.append((round(temperature, 2), (taken - timedelta(hours=6)).isoformat(" "),
+                            round(moisture, 2), taken.isoformat(" "), plant_id))
+    return {"countries": countries, "cities": cities, "botanists": botanists,
+            "plants": plant_rows, "botanist_plants": botanist_plants, "records": records}
+
+
+def seed_database(conn: sqlite3.Connection, rows: dict[str, list]):
+    """Insert seed rows into the local database."""
+    logger = getLogger()
+    conn.executemany("INSERT INTO origin_country (name) VALUES (?);", rows["countries"])
+    conn.executemany("INSERT INTO origin_city (name, country_id) VALUES (?, ?);",
+                     rows["cities"])
+    conn.executemany("INSERT INTO botanist (name, email, phone) VALUES (?, ?, ?);",
+                     rows["botanists"])
+    conn.executemany("INSERT INTO plant (plant_id, name, city_id) VALUES (?, ?, ?);",
+                     rows["plants"])
+    conn.executemany("INSERT INTO botanist_plant (plant_id, botanist_id) VALUES (?, ?);",
+                     rows["botanist_plants"])
+    conn.executemany("""INSERT INTO record
+                        (temperature, last_watered, soil_moisture, recording_taken, plant_id)
+                        VALUES (?, ?, ?, ?, ?);""", rows["records"])
+    conn.execute("""INSERT INTO latest_reading
+                    (plant_id, temperature, last_watered, soil_moisture, recording_taken)
+                    SELECT plant_id, temperature, last_watered, soil_moisture,
+                        MAX(recording_taken)
+                    FROM record GROUP BY plant_id;""")
+    conn.commit()
+    logger.info("Seeded %s readings for %s plants.", len(rows["records"]), len(rows["plants"]))
+
+
+if __name__ == "__main__":
+    set_logger()
+    parser = ArgumentParser(description="Create a local SQLite short term database.")
+    parser.add_argument("db_path", help="Path of the SQLite file to create")
+    parser.add_argument("--plants", type=int, default=0,
+                        help="Number of plants to seed readings for")
+    parser.add_argument("--days", type=int, default=1,
+                        help="Days of minute-by-minute readings to seed")
+    args = parser.parse_args()
+    local_conn = create_database(args.db_path)
+    if args.plants:
+        # Seeded as naive UTC, matching DATETIME columns.
+        seed_end = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+        seed_database(local_conn, get_seed_rows(args.plants, args.days, seed_end))
+    local_conn.close()
@@ -0,0 +1,79 @@
+# pylint: skip-file
+"""Tests for the migrate script."""
+
+from unittest.mock import MagicMock, patch
+
+from pytest import raises
+
+from migrate import (apply_migration, get_migrations, get_pending_migrations,
+                     parse_migration_name, read_migration, split_batches)
+
+
+def test_parse_migration_name():
+    """Test that migration file names are parsed."""
+    assert parse_migration_name("001_add_index.sql") == {
+        "version": 1, "name": "add_index", "optional": False,
+        "filename": "001_add_index.sql"}
+    assert parse_migration_name("002_columnstore.optional.sql")["optional"]
+    assert parse_migration_name("README.md") is None
+
+
+def test_get_migrations_ordered(tmp_path):
+    """Test that migrations are returned in version order."""
+    for name in ("002_b.sql", "001_a.sql", "notes.txt"):
+        (tmp_path / name).write_text("")
+
+    actual = get_migrations(str(tmp_path))
+
+    assert [migration["version"] for migration in actual] == [1, 2]
+
+
+def test_get_migrations_duplicate_versions(tmp_path):
+    """Test that duplicate versions are rejected."""
+    for name in ("001_a.sql", "001_b.sql"):
+        (tmp_path / name).write_text("")
+
+    with raises(ValueError, match="Duplicate migration versions found."):
+        get_migrations(str(tmp_path))
+
+
+def test_get_pending_migrations():
+    """Test that applied and optional migrations are skipped."""
+    migrations = [{"version": 1, "optional": False},
+                  {"version": 2, "optional": True},
+                  {"version": 3, "optional": False}]
+
+    assert get_pending_migrations(migrations, {1}) == [migrations[2]]
+    assert get_pending_migrations(migrations, {1}, True) == migrations[1:]
+
+
+def test_split_batches():
+    """Test that scripts are split on GO lines only."""
+    sql = "CREATE TABLE a (GOAL INT);\nGO\nSELECT 1;\n  go  \n"
+
+    assert split_batches(sql) == ["CREATE TABLE a (GOAL INT);", "SELECT 1;"]
+
+
+def test_bundled_migrations_are_valid():
+    """Test that the bundled migrations parse and target the given schema."""
+    for migration in get_migrations():
+        batches = read_migration(migration, "gamma")
+        assert batches
+        assert all("{schema}" not in batch for batch in batches)
+
+
+def test_apply_migration_rolls_back_on_failure():
+    """Test that a failing migration is not recorded."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.execute.side_effect = RuntimeError("bad sql")
+    migration = {"version": 1, "name": "a", "optional": False,
+                 "filename": "001_a.sql"}
+
+    with patch("migrate.read_migration", return_value=["SELECT 1;"]):
+        with raises(RuntimeError):
+            apply_migration(mock_conn, "gamma", migration)
+
+    mock_conn.rollback.assert_called_once()
+    mock_conn.commit.assert_not_called()
@@ -132,7 +132,10 @@ resource "aws_iam_policy" "glue_bucket_policy" {
                     "s3:PutObject"
                 ],
                 "Resource": [
-                    "arn:aws:s3:::${aws_s3_bucket.s3_bucket.bucket}/input/*"
+                    "arn:aws:s3:::${aws_s3_bucket.s3_bucket.bucket}/input/*",
+                    "arn:aws:s3:::${aws_s3_bucket.s3_bucket.bucket}/raw/*",
+                    "arn:aws:s3:::${aws_s3_bucket.s3_bucket.bucket}/rollup/*",
+                    "arn:aws:s3:::${aws_s3_bucket.s3_bucket.bucket}/compact/*"
                 ],
                 "Condition": {
                     "StringEquals": {
@@ -155,8 +158,83 @@ resource "aws_glue_crawler" "crawler" {
     role = aws_iam_role.glue_service_role.arn
     schedule= "cron(10 0 * * ? *)"
 
+    # Raw readings exported when EXPORT_RAW is set, crawled as their own table.
     s3_target {
-      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/input/"
+      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/raw/"
+    }
+
+    # Rollups exported when EXPORT_ROLLUPS is set, a table per level.
+    s3_target {
+      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/rollup/plant_hourly/"
+    }
+
+    s3_target {
+      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/rollup/plant_daily/"
+    }
+
+    s3_target {
+      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/rollup/plant_monthly/"
+    }
+
+    # Closed months of summaries compacted when COMPACT_MONTHS is set.
+    s3_target {
+      path = "s3://${aws_s3_bucket.s3_bucket.bucket}/compact/summary/"
+      exclusions = ["_manifest.json"]
+    }
+}
+
+locals {
+    summary_statistics = ["min", "median", "max", "mean", "std", "p5", "p95", "time_weighted_mean"]
+    summary_columns = merge(
+        { plant_name = "string", botanist = "string" },
+        { for statistic in local.summary_statistics : "temperature_${statistic}" => "double" },
+        { for statistic in local.summary_statistics : "soil_moisture_${statistic}" => "double" },
+        { count = "bigint", plant_id = "bigint",
+          temperature_sketch = "binary", soil_moisture_sketch = "binary" }
+    )
+    # Buffered readings can reach RDS up to FLUSH_MINUTES after midnight, so days close then.
+    day_close_minutes = var.BUFFER_READINGS ? var.FLUSH_MINUTES : "0"
+}
+
+# Daily summaries, partitioned by dt. Partitions are projected from the dates queried,
+# so none are crawled or registered, and a query filtering on dt only lists its days.
+resource "aws_glue_catalog_table" "plant_summary" {
+    database_name = aws_glue_catalog_database.data_catalog.name
+    name = "plant_summary"
+    table_type = "EXTERNAL_TABLE"
+
+    parameters = {
+        "classification" = "parquet"
+        "projection.enabled" = "true"
+        "projection.dt.type" = "date"
+        "projection.dt.format" = "yyyy-MM-dd"
+        "projection.dt.range" = "${var.SUMMARY_START_DATE},NOW"
+        "projection.dt.interval" = "1"
+        "projection.dt.interval.unit" = "DAYS"
+        "storage.location.template" = "s3://${aws_s3_bucket.s3_bucket.bucket}/input/plant/dt=$${dt}/"
+    }
+
+    partition_keys {
+        name = "dt"
+        type = "string"
+    }
+
+    storage_descriptor {
+        location = "s3://${aws_s3_bucket.s3_bucket.bucket}/input/plant/"
+        input_format = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat"
+        output_format = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat"
+
+        ser_de_info {
+            serialization_library = "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+        }
+
+        dynamic "columns" {
+            for_each = local.summary_columns
+            content {
+                name = columns.key
+                type = columns.value
+            }
+        }
     }
 }
 
@@ -326,6 +404,75 @@ resource "aws_ecs_service" "service" {
     }
 }
 
+resource "aws_ecs_task_definition" "short_daemon_task" {
+    count = var.SHORT_PIPELINE_DAEMON ? 1 : 0
+    depends_on = [ aws_iam_role_policy_attachment.ecs_task_exec_ecs_role ]
+    family = "c17-cattus-short-pipeline-daemon-td"
+    memory = 1024
+    cpu = 512
+    container_definitions = jsonencode([{
+        name = "short-pipeline-daemon"
+        image = data.aws_ecr_image.short_pipe_image.image_uri
+        cpu = 512
+        essential = true
+        entryPoint = ["python3", "daemon_short.py"]
+        stopTimeout = 120
+        environment = [
+            { "name": "DB_HOST", "value": var.DB_HOST },
+            { "name": "DB_PORT", "value": var.DB_PORT },
+            { "name": "DB_USER", "value": var.DB_USER },
+            { "name": "DB_PASSWORD", "value": var.DB_PASSWORD },
+            { "name": "DB_NAME", "value": var.DB_NAME },
+            { "name": "DB_SCHEMA", "value": var.DB_SCHEMA },
+            { "name": "S3_BUCKET", "value": aws_s3_bucket.s3_bucket.bucket },
+            { "name": "AWS_ACCESS_KEY_ID", "value": var.AWS_ACCESS_KEY },
+            { "name": "AWS_SECRET_ACCESS_KEY", "value": var.AWS_SECRET_KEY },
+            { "name": "BUFFER_URI", "value": var.BUFFER_READINGS ? "s3://${aws_s3_bucket.s3_bucket.bucket}/buffer" : "" },
+            { "name": "FLUSH_MINUTES", "value": var.FLUSH_MINUTES },
+            { "name": "FLUSH_ROWS", "value": var.FLUSH_ROWS },
+            { "name": "PIPELINE_INTERVAL", "value": var.PIPELINE_INTERVAL },
+            { "name": "TRACE_OUTPUT", "value": var.TRACE_OUTPUT },
+            { "name": "OTEL_SERVICE_NAME", "value": "short-pipeline" }
+        ],
+        "logConfiguration": {
+            "logDriver": "awslogs",
+            "options": {
+                "awslogs-group": "/ecs/c17-cattus-short-pipeline-logs",
+                "awslogs-region": var.AWS_REGION,
+                "awslogs-stream-prefix": "ecs",
+                "awslogs-create-group": "true"
+            }
+        }
+    }])
+    execution_role_arn = aws_iam_role.ecs_task_exec_role.arn
+    task_role_arn = aws_iam_role.ecs_task_exec_role.arn
+    runtime_platform {
+      operating_system_family = "LINUX"
+      cpu_architecture = "X86_64"
+    }
+    requires_compatibilities = ["FARGATE"]
+    network_mode = "awsvpc"
+}
+
+resource "aws_ecs_service" "short_daemon_service" {
+    count = var.SHORT_PIPELINE_DAEMON ? 1 : 0
+    depends_on = [ aws_iam_role_policy_attachment.ecs_task_exec_ecs_role ]
+    name = "c17-cattus-short-pipeline-daemon-service"
+    cluster = data.aws_ecs_cluster.c17-ecs-cluster.id
+    task_definition = aws_ecs_task_definition.short_daemon_task[0].arn
+    desired_count = 1
+    launch_type = "FARGATE"
+    force_delete = true
+    # Never run two daemons at once, as both would load every reading.
+    deployment_minimum_healthy_percent = 0
+    deployment_maximum_percent = 100
+    network_configuration {
+      subnets = [ var.SUBNET_1, var.SUBNET_2, var.SUBNET_3 ]
+      security_groups = [ aws_security_group.ecs_sg.id ]
+      assign_public_ip = true
+    }
+}
+
 # LAMBDA
 
 resource "aws_iam_role" "lambda_role" {
@@ -435,6 +582,9 @@ resource "aws_lambda_function" "report_lambda" {
             DB_SCHEMA=var.DB_SCHEMA
             TOPIC_REGION=var.AWS_REGION
             TOPIC_ARN=aws_sns_topic.report-topic.arn
+            TRACE_OUTPUT=var.TRACE_OUTPUT
+            OVERLAP_POLICY=var.OVERLAP_POLICY
+            OTEL_SERVICE_NAME="report"
         }
     }
 }
@@ -459,6 +609,12 @@ resource "aws_lambda_function" "short_pipeline_lambda" {
             DB_NAME=var.DB_NAME
             DB_SCHEMA=var.DB_SCHEMA
             S3_BUCKET=aws_s3_bucket.s3_bucket.bucket
+            BUFFER_URI=var.BUFFER_READINGS ? "s3://${aws_s3_bucket.s3_bucket.bucket}/buffer" : ""
+            FLUSH_MINUTES=var.FLUSH_MINUTES
+            FLUSH_ROWS=var.FLUSH_ROWS
+            TRACE_OUTPUT=var.TRACE_OUTPUT
+            OVERLAP_POLICY=var.OVERLAP_POLICY
+            OTEL_SERVICE_NAME="short-pipeline"
         }
     }
 }
@@ -483,6 +639,18 @@ resource "aws_lambda_function" "long_pipeline_lambda" {
             DB_NAME=var.DB_NAME
             DB_SCHEMA=var.DB_SCHEMA
             S3_BUCKET=aws_s3_bucket.s3_bucket.bucket
+            TRACE_OUTPUT=var.TRACE_OUTPUT
+            EXTRACT_CHUNK_ROWS=var.EXTRACT_CHUNK_ROWS
+            AGGREGATE_IN_SQL=var.AGGREGATE_IN_SQL
+            NARROW_EXTRACT=var.NARROW_EXTRACT
+            EXPORT_RAW=var.EXPORT_RAW
+            EXPORT_ROLLUPS=var.EXPORT_ROLLUPS
+            EXPORT_SKETCHES=var.EXPORT_SKETCHES
+            LOAD_IN_MEMORY=var.LOAD_IN_MEMORY
+            COMPACT_MONTHS=var.COMPACT_MONTHS
+            EXPORT_BATCH_ROWS=var.INCREMENTAL_EXPORT ? var.EXPORT_BATCH_ROWS : "0"
+            DAY_CLOSE_MINUTES=local.day_close_minutes
+            OTEL_SERVICE_NAME="long-pipeline"
         }
     }
 }
@@ -538,12 +706,16 @@ resource "aws_scheduler_schedule" "report_schedule" {
   target {
     arn      = aws_lambda_function.report_lambda.arn
     role_arn = aws_iam_role.scheduler_role.arn
+    # Passes the scheduled time so each run can record how far behind it started.
+    input    = jsonencode({ scheduled_time = "<aws.scheduler.scheduled-time>" })
   }
 }
 
 resource "aws_scheduler_schedule" "short_pipe_schedule" {
   name       = "c17-cattus-short-pipeline-schedule"
   group_name = "default"
+  # The daemon service runs the pipeline instead when SHORT_PIPELINE_DAEMON is set.
+  state      = var.SHORT_PIPELINE_DAEMON ? "DISABLED" : "ENABLED"
 
   flexible_time_window {
     mode = "OFF"
@@ -554,6 +726,8 @@ resource "aws_scheduler_schedule" "short_pipe_schedule" {
   target {
     arn      = aws_lambda_function.short_pipeline_lambda.arn
     role_arn = aws_iam_role.scheduler_role.arn
+    # Passes the scheduled time so each run can record how far behind it started.
+    input    = jsonencode({ scheduled_time = "<aws.scheduler.scheduled-time>" })
   }
 }
 
@@ -565,7 +739,11 @@ resource "aws_scheduler_schedule" "long_pipe_schedule" {
     mode = "OFF"
   }
 
-  schedule_expression =  "cron(0 0 * * ? *)"
+  # Incremental exports run hourly, each exporting a bounded batch of whole closed days,
+  # at a minute past DAY_CLOSE_MINUTES so the first run of a day follows its close.
+  # Buffered days stay open for FLUSH_MINUTES after midnight, so daily exports wait an hour.
+  schedule_expression =  var.INCREMENTAL_EXPORT ? "cron(${local.day_close_minutes + 5} * * * ? *)" : (
+    var.BUFFER_READINGS ? "cron(0 1 * * ? *)" : "cron(0 0 * * ? *)")
 
   target {
     arn      = aws_lambda_function.long_pipeline_lambda.arn
@@ -49,4 +49,94 @@ variable SUBNET_3 {
 
 variable S3_OUTPUT {
     type = string
-}
\ No newline at end of file
+}
+
+variable BUFFER_READINGS {
+    type = bool
+    default = false
+}
+
+variable FLUSH_MINUTES {
+    type = string
+    default = "10"
+}
+
+variable FLUSH_ROWS {
+    type = string
+    default = "5000"
+}
+
+variable SHORT_PIPELINE_DAEMON {
+    type = bool
+    default = false
+}
+
+variable PIPELINE_INTERVAL {
+    type = string
+    default = "60"
+}
+
+variable TRACE_OUTPUT {
+    type = string
+    default = "stdout"
+}
+
+variable OVERLAP_POLICY {
+    type = string
+    default = "skip"
+}
+
+variable EXTRACT_CHUNK_ROWS {
+    type = string
+    default = "50000"
+}
+
+variable INCREMENTAL_EXPORT {
+    type = bool
+    default = false
+}
+
+variable EXPORT_BATCH_ROWS {
+    type = string
+    default = "1000000"
+}
+
+variable AGGREGATE_IN_SQL {
+    type = string
+    default = "false"
+}
+
+variable NARROW_EXTRACT {
+    type = string
+    default = "true"
+}
+
+variable EXPORT_RAW {
+    type = string
+    default = "false"
+}
+
+variable EXPORT_ROLLUPS {
+    type = string
+    default = "false"
+}
+
+variable EXPORT_SKETCHES {
+    type = string
+    default = "false"
+}
+
+variable LOAD_IN_MEMORY {
+    type = string
+    default = "false"
+}
+
+variable COMPACT_MONTHS {
+    type = string
+    default = "false"
+}
+
+variable SUMMARY_START_DATE {
+    type = string
+    default = "2025-01-01"
+}
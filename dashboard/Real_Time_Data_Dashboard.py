@@ -26,7 +26,9 @@ class PlantMonitoringDashboard:
             "DB_PORT": ENV["DB_PORT"],
             "DB_NAME": ENV["DB_NAME"],
             "DB_USER": ENV["DB_USER"],
-            "DB_PASSWORD": ENV["DB_PASSWORD"]
+            "DB_PASSWORD": ENV["DB_PASSWORD"],
+            "DB_SCHEMA": ENV.get("DB_SCHEMA", "gamma"),
+            "SQLITE_PATH": ENV.get("SQLITE_PATH")
         }
         self.db_functions = DatabaseFunctions(config)
         self.data_processor = PlantDataProcessor(self.db_functions)
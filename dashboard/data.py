@@ -10,6 +10,8 @@ import pandas as pd
 import numpy as np
 import streamlit as st
 
+from backend import get_backend, get_dialect, get_sqlite_connection
+
 
 class DatabaseFunctions:
     """Manages database connections and queries for the plant monitoring system."""
@@ -23,6 +25,10 @@ class DatabaseFunctions:
 
     def get_connection(self) -> Connection:
         """Return a database connection."""
+        if get_backend() == "sqlite":
+            self.logger.info("Getting local SQLite connection...")
+            return get_sqlite_connection(self.config["SQLITE_PATH"],
+                                         self.config["DB_SCHEMA"])
         self.logger.info("Getting RDS connection...")
         connection_string = f"""
                                 DRIVER={{ODBC Driver 18 for SQL Server}};
@@ -36,6 +42,13 @@ class DatabaseFunctions:
                             """
         return connect(connection_string)
 
+    @staticmethod
+    def to_float_readings(data: pd.DataFrame) -> pd.DataFrame:
+        """Return data with DECIMAL sensor readings converted to floats."""
+        if data.empty:
+            return data
+        return data.astype({"temperature": float, "soil_moisture": float})
+
     def execute_query(self, query: str, params: tuple = None) -> pd.DataFrame:
         """Execute SQL query and return results as DataFrame."""
         filterwarnings(
@@ -85,15 +98,6 @@ class PlantDataProcessor:
         """Get the latest readings for each plant."""
 
         query = """
-        WITH LatestReadings AS (
-            SELECT 
-                r.plant_id,
-                r.temperature,
-                r.soil_moisture,
-                r.recording_taken,
-                ROW_NUMBER() OVER (PARTITION BY r.plant_id ORDER BY r.recording_taken DESC) as record
-            FROM record r
-        )
         SELECT 
             lr.plant_id,
             p.name as plant_name,
@@ -102,13 +106,13 @@ class PlantDataProcessor:
             lr.recording_taken,
             c.name as city_name,
             co.name as country_name
-        FROM LatestReadings lr
+        FROM latest_reading lr
         JOIN plant p ON lr.plant_id = p.plant_id
         JOIN origin_city c ON p.city_id = c.city_id
         JOIN origin_country co ON c.country_id = co.country_id
-        WHERE lr.record = 1
         """
-        return _self.db_functions.execute_query(query)
+        return _self.db_functions.to_float_readings(
+            _self.db_functions.execute_query(query))
 
     @st.cache_data(ttl=60)
     def identify_critical_plants(_self) -> pd.DataFrame:
@@ -175,8 +179,9 @@ class PlantDataProcessor:
     def get_plants_with_least_readings(_self) -> pd.DataFrame:
         """Get plants with the least number of readings."""
 
-        query = """
-        SELECT TOP 5
+        dialect = get_dialect()
+        query = f"""
+        SELECT {dialect["top"].format(rows=5)}
             p.plant_id,
             p.name as plant_name,
             COUNT(r.record_id) as reading_count
@@ -184,6 +189,7 @@ class PlantDataProcessor:
         LEFT JOIN record r ON p.plant_id = r.plant_id
         GROUP BY p.plant_id, p.name
         ORDER BY reading_count
+        {dialect["limit"].format(rows=5)}
         """
         return _self.db_functions.execute_query(query)
 
@@ -191,7 +197,7 @@ class PlantDataProcessor:
     def get_24h_readings(_self) -> pd.DataFrame:
         """Get all readings from the last 24 hours with plant information."""
 
-        query = """
+        query = f"""
         SELECT 
             r.temperature,
             r.soil_moisture,
@@ -200,10 +206,11 @@ class PlantDataProcessor:
             r.plant_id
         FROM record r
         JOIN plant p ON r.plant_id = p.plant_id
-        WHERE r.recording_taken >= DATEADD(hour, -24, GETDATE())
+        WHERE r.recording_taken >= {get_dialect()["hours_ago"].format(hours=24)}
         ORDER BY r.recording_taken
         """
-        return _self.db_functions.execute_query(query)
+        return _self.db_functions.to_float_readings(
+            _self.db_functions.execute_query(query))
 
     @st.cache_data(ttl=300)
     def get_botanist_list(_self) -> pd.DataFrame:
@@ -1,6 +1,6 @@
 """Handles long-term plant data processing using AWS Athena."""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from logging import getLogger, INFO, StreamHandler
 from sys import stdout
 
@@ -44,25 +44,28 @@ class LongTermDataProcessor:
             else:
                 start_date = end_date - timedelta(days=365)
 
-            query = f"""
+            if _self.config.get("USE_ROLLUPS"):
+                query = _self.get_rollup_query(time_period, start_date, end_date)
+            else:
+                query = f"""
             SELECT 
                 plant_name,
                 botanist,
-                CAST(year AS INTEGER) as year,
-                CAST(month AS INTEGER) as month,
-                CAST(day AS INTEGER) as day,
-                temperature_median as avg_temperature,
-                soil_moisture_median as avg_moisture,
+                CAST(SUBSTR(dt, 1, 4) AS INTEGER) as year,
+                CAST(SUBSTR(dt, 6, 2) AS INTEGER) as month,
+                CAST(SUBSTR(dt, 9, 2) AS INTEGER) as day,
+                COALESCE(temperature_mean, temperature_median) as avg_temperature,
+                COALESCE(soil_moisture_mean, soil_moisture_median) as avg_moisture,
                 count as total_readings,
                 temperature_min,
                 temperature_max,
                 soil_moisture_min,
                 soil_moisture_max,
                 plant_id
-            FROM input
-            WHERE DATE(CONCAT(year, '-', month, '-', day)) BETWEEN DATE('{start_date.strftime('%Y-%m-%d')}') 
-                AND DATE('{end_date.strftime('%Y-%m-%d')}')
-            ORDER BY year, month, day
+            FROM {_self.get_summary_source(start_date, end_date)}
+            WHERE dt BETWEEN '{start_date.strftime('%Y-%m-%d')}'
+                AND '{end_date.strftime('%Y-%m-%d')}'
+            ORDER BY dt
             """
 
             data = wr.athena.read_sql_query(
@@ -72,9 +75,11 @@ class LongTermDataProcessor:
                 boto3_session=_self.session
             )
 
+            if 'hour' not in data:
+                data['hour'] = 0
             data['date'] = pd.to_datetime(
-                data[['year', 'month', 'day']].assign(
-                    hour=0, minute=0, second=0
+                data[['year', 'month', 'day', 'hour']].assign(
+                    minute=0, second=0
                 )
             )
 
@@ -84,13 +89,87 @@ class LongTermDataProcessor:
             _self.logger.error(f"Error fetching long-term data: {str(e)}")
             return pd.DataFrame()
 
+    def get_summary_source(self, start_date: datetime, end_date: datetime) -> str:
+        """Return the table, or union of tables, that daily summaries are read from.
+
+        Daily summaries are partitioned by their dt, which Athena projects from the
+        query's range rather than looking up. With USE_COMPACTED, months from
+        start_date's to before yesterday's are read from the compacted table, which
+        has one object per month, and later months from the daily partitions.
+        """
+        boundary = (end_date - timedelta(days=1)).replace(day=1)
+        if not self.config.get("USE_COMPACTED") or start_date.date() >= boundary.date():
+            return "plant_summary"
+        columns = """plant_id, plant_name, botanist, dt,
+                temperature_mean, temperature_median, soil_moisture_mean, soil_moisture_median,
+                count, temperature_min, temperature_max, soil_moisture_min, soil_moisture_max"""
+        compacted = self.get_partition_filter(start_date, boundary - timedelta(days=1), False)
+        return f"""(
+                SELECT {columns} FROM summary WHERE ({compacted})
+                UNION ALL
+                SELECT {columns} FROM plant_summary WHERE dt >= '{boundary.strftime('%Y-%m-01')}'
+            ) summaries"""
+
+    @staticmethod
+    def get_partition_filter(start_date: datetime, end_date: datetime, daily: bool) -> str:
+        """Return a filter on the year, month and, if daily, day partitions from start_date
+        to end_date, so Athena only lists the partitions asked for."""
+        terms = []
+        month = date(start_date.year, start_date.month, 1)
+        while month <= end_date.date():
+            following = (month + timedelta(days=32)).replace(day=1)
+            first = max(month, start_date.date())
+            last = min(following - timedelta(days=1), end_date.date())
+            term = f"year = '{month.year}' AND month = '{month.month}'"
+            if daily and (first, last) != (month, following - timedelta(days=1)):
+                days = ", ".join(f"'{day}'" for day in range(first.day, last.day + 1))
+                term += f" AND day IN ({days})"
+            terms.append(f"({term})")
+            month = following
+        return " OR ".join(terms)
+
+    @staticmethod
+    def get_rollup_query(time_period: str, start_date: datetime, end_date: datetime) -> str:
+        """Return the query for a time period's hourly, daily or monthly rollup.
+
+        A plant's hour or day can be exported in more than one batch, so rows are
+        merged from their sums rather than read as they are. Only partition columns
+        are grouped by, as Athena reads a constant in GROUP BY as a select position.
+        """
+        table, hour, day = {"24h": ("plant_hourly", "hour", "day"),
+                            "1m": ("plant_daily", "0", "day")}.get(
+                                time_period, ("plant_monthly", "0", "1"))
+        groups = ["plant_id", "plant_name", "botanist", "year", "month"]
+        groups += [column for column in (day, hour) if not column.isdigit()]
+        return f"""
+            SELECT 
+                plant_name,
+                botanist,
+                CAST(year AS INTEGER) as year,
+                CAST(month AS INTEGER) as month,
+                CAST({day} AS INTEGER) as day,
+                CAST({hour} AS INTEGER) as hour,
+                SUM(temperature_sum) / NULLIF(SUM(temperature_count), 0) as avg_temperature,
+                SUM(soil_moisture_sum) / NULLIF(SUM(soil_moisture_count), 0) as avg_moisture,
+                SUM(count) as total_readings,
+                MIN(temperature_min) as temperature_min,
+                MAX(temperature_max) as temperature_max,
+                MIN(soil_moisture_min) as soil_moisture_min,
+                MAX(soil_moisture_max) as soil_moisture_max,
+                plant_id
+            FROM {table}
+            WHERE ({LongTermDataProcessor.get_partition_filter(start_date, end_date, day == 'day')})
+            GROUP BY {', '.join(groups)}
+            ORDER BY year, month, day, hour
+            """
+
     @st.cache_data(ttl=300)
     def get_plant_list(_self) -> list[str]:
         """Get list of all plants in the long-term dataset."""
         try:
             query = """
             SELECT DISTINCT plant_name
-            FROM input
+            FROM plant_summary
             ORDER BY plant_name
             """
 
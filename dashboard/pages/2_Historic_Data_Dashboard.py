@@ -31,7 +31,9 @@ class LongTermAnalysisDashboard:
             "AWS_SECRET_ACCESS_KEY": ENV["AWS_SECRET_ACCESS_KEY"],
             "AWS_REGION_NAME": ENV["AWS_REGION_NAME"],
             "ATHENA_DB_NAME": ENV["ATHENA_DB_NAME"],
-            "S3_OUTPUT": ENV["S3_OUTPUT"]
+            "S3_OUTPUT": ENV["S3_OUTPUT"],
+            "USE_ROLLUPS": ENV.get("USE_ROLLUPS", "false").lower() == "true",
+            "USE_COMPACTED": ENV.get("USE_COMPACTED", "false").lower() == "true"
         }
         self.data_processor = LongTermDataProcessor(config)
         self.dashboard = DashboardLayout()
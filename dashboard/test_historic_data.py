@@ -0,0 +1,64 @@
+# pylint: skip-file
+"""Script to test the queries built by `historic_data.py`."""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("awswrangler")
+pytest.importorskip("streamlit")
+
+from historic_data import LongTermDataProcessor
+
+
+START = datetime(2025, 3, 30)
+END = datetime(2025, 3, 31)
+
+
+def get_group_by(query):
+    return query.split("GROUP BY")[1].split("ORDER BY")[0].strip()
+
+
+def test_get_rollup_query_hourly_groups_by_day_and_hour():
+    query = LongTermDataProcessor.get_rollup_query("24h", START, END)
+    assert "FROM plant_hourly" in query
+    assert get_group_by(query) == "plant_id, plant_name, botanist, year, month, day, hour"
+    assert "AND day IN ('30', '31')" in query
+
+
+def test_get_rollup_query_daily_keeps_constant_hour_out_of_group_by():
+    query = LongTermDataProcessor.get_rollup_query("1m", START, END)
+    assert "FROM plant_daily" in query
+    assert "CAST(0 AS INTEGER) as hour" in query
+    assert get_group_by(query) == "plant_id, plant_name, botanist, year, month, day"
+
+
+def test_get_rollup_query_monthly_keeps_constants_out_of_group_by():
+    query = LongTermDataProcessor.get_rollup_query("1y", START, END)
+    assert "FROM plant_monthly" in query
+    assert "CAST(1 AS INTEGER) as day" in query
+    assert "CAST(0 AS INTEGER) as hour" in query
+    assert get_group_by(query) == "plant_id, plant_name, botanist, year, month"
+    assert "day IN" not in query
+
+
+def get_processor(config):
+    processor = LongTermDataProcessor.__new__(LongTermDataProcessor)
+    processor.config = config
+    return processor
+
+
+def test_get_summary_source_bounds_compacted_months_on_both_sides():
+    source = get_processor({"USE_COMPACTED": True}).get_summary_source(
+        datetime(2024, 11, 20), datetime(2025, 2, 10))
+    compacted = source.split("FROM summary WHERE")[1].split("UNION ALL")[0]
+    assert compacted.strip() == ("((year = '2024' AND month = '11') OR "
+                                 "(year = '2024' AND month = '12') OR "
+                                 "(year = '2025' AND month = '1'))")
+    assert "dt >= '2025-02-01'" in source
+
+
+def test_get_summary_source_skips_compacted_within_the_month():
+    processor = get_processor({"USE_COMPACTED": True})
+    assert processor.get_summary_source(START, END) == "plant_summary"
+    assert get_processor({}).get_summary_source(
+        datetime(2024, 1, 1), END) == "plant_summary"
@@ -0,0 +1,209 @@
+"""Times filtered reads of summaries written with different parquet layouts.
+
+Reads go through a filesystem that counts the bytes read, as Athena charges by the
+bytes it scans. pyarrow's dataset reader skips row groups by their statistics, but not
+by bloom filters or the page index, and reads footers more than once, so it can read
+more bytes than were written and shows none of the tuned layout's bloom filters or
+page index. The bytes scanned are also counted from the footers: each file's footer,
+and the chunks of the columns read in the row groups whose statistics may match.
+Only readers that use bloom filters or the page index, like Athena's, skip more.
+"""
+
+from argparse import ArgumentParser
+from os import environ as ENV
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from numpy import arange, repeat, tile
+from numpy.random import default_rng
+from pandas import DataFrame, Timestamp, to_timedelta
+from pyarrow import PythonFile, Table, dataset as ds, parquet as pq
+from pyarrow.fs import FileSystemHandler, LocalFileSystem, PyFileSystem
+
+from load import (SUMMARY_PARTITIONS, get_dated_summary, get_directory_size,
+                  get_summary_write_options)
+from transform import get_sorted_summary, get_time_parts
+
+
+class CountedFile:
+    """File that adds the bytes read from it to its handler's count."""
+
+    def __init__(self, file, handler):
+        self.file = file
+        self.handler = handler
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.handler.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class CountingHandler(FileSystemHandler):
+    """Local filesystem under root that counts the bytes read from its files."""
+    # pylint: disable=missing-function-docstring
+
+    def __init__(self, root: str):
+        self.local = LocalFileSystem()
+        self.root = root
+        self.bytes_read = 0
+
+    def get_type_name(self):
+        return "counting"
+
+    def equals(self, other):
+        return self is other
+
+    def normalize_path(self, path):
+        return self.local.normalize_path(path)
+
+    def get_file_info(self, paths):
+        return self.local.get_file_info(paths)
+
+    def get_file_info_selector(self, selector):
+        return self.local.get_file_info(selector)
+
+    def open_input_file(self, path):
+        return PythonFile(CountedFile(open(path, "rb"), self), mode="r")
+
+    def open_input_stream(self, path):
+        return self.open_input_file(path)
+
+    def create_dir(self, path, recursive):
+        self.local.create_dir(path, recursive=recursive)
+
+    def delete_dir(self, path):
+        self.local.delete_dir(path)
+
+    def delete_dir_contents(self, path, missing_dir_ok=False):
+        self.local.delete_dir_contents(path, missing_dir_ok=missing_dir_ok)
+
+    def delete_root_dir_contents(self):
+        self.local.delete_dir_contents(self.root)
+
+    def delete_file(self, path):
+        self.local.delete_file(path)
+
+    def move(self, src, dest):
+        self.local.move(src, dest)
+
+    def copy_file(self, src, dest):
+        self.local.copy_file(src, dest)
+
+    def open_output_stream(self, path, metadata):
+        return self.local.open_output_stream(path, metadata=metadata)
+
+    def open_append_stream(self, path, metadata):
+        return self.local.open_append_stream(path, metadata=metadata)
+
+
+def get_summaries(plants: int, days: int, readings: int = 24, seed: int = 0) -> DataFrame:
+    """Return daily summaries of readings taken readings times a day by each plant."""
+    rng = default_rng(seed)
+    rows = plants * days * readings
+    plant_ids = tile(arange(1, plants + 1), days * readings)
+    return get_sorted_summary(get_time_parts(DataFrame({
+        "plant_id": plant_ids,
+        "plant_name": [f"Plant {plant_id}" for plant_id in plant_ids],
+        "botanist": [f"Botanist {plant_id % 7}" for plant_id in plant_ids],
+        "temperature": rng.normal(18, 3, rows).round(2),
+        "soil_moisture": rng.normal(60, 15, rows).round(2),
+        "recording_taken": Timestamp("2025-01-01")
+        + to_timedelta(repeat(arange(days * readings), plants) * 86400 // readings, unit="s")
+    })))
+
+
+def write_layout(summary: DataFrame, root: str, tuned: bool):
+    """Write summaries as the loader does, with its tuned options or pyarrow's defaults."""
+    # Each day's summaries are written to a file of their own, as each run does.
+    for _, day in get_dated_summary(summary).groupby(SUMMARY_PARTITIONS):
+        table = Table.from_pandas(day.sort_values("plant_id", kind="stable"))
+        options = get_summary_write_options(table.drop_columns(SUMMARY_PARTITIONS).schema,
+                                            table.num_rows) if tuned else {}
+        pq.write_to_dataset(table, root_path=root, partition_cols=SUMMARY_PARTITIONS,
+                            basename_template="summary-{i}", **options)
+
+
+def get_scanned_bytes(root: str, query: dict) -> int:
+    """Return the bytes of the footers of the files a query's partitions are in, and of
+    the column chunks it reads in row groups whose statistics may match its filter."""
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    expression = query.get("filter")
+    scanned = 0
+    for fragment in dataset.get_fragments(filter=expression):
+        metadata = fragment.metadata
+        scanned += metadata.serialized_size
+        pieces = [fragment] if expression is None \
+            else fragment.split_by_row_group(expression, schema=dataset.schema)
+        for row_group in (group.id for piece in pieces for group in piece.row_groups):
+            chunks = metadata.row_group(row_group)
+            scanned += sum(chunks.column(i).total_compressed_size
+                           for i in range(chunks.num_columns)
+                           if "columns" not in query
+                           or chunks.column(i).path_in_schema in query["columns"])
+    return scanned
+
+
+def time_query(root: str, query: dict, repeats: int) -> tuple[int, int, float]:
+    """Return the bytes read, the bytes scanned and median seconds taken to read a
+    query's rows."""
+    timings = []
+    for _ in range(repeats):
+        handler = CountingHandler(root)
+        dataset = ds.dataset(root, filesystem=PyFileSystem(handler), format="parquet",
+                             partitioning="hive")
+        start = perf_counter()
+        dataset.to_table(**query)
+        timings.append(perf_counter() - start)
+    return handler.bytes_read, get_scanned_bytes(root, query), median(timings)
+
+
+def get_queries(plants: int) -> dict[str, dict]:
+    """Return filters and columns like those of historic queries."""
+    plant = plants // 2
+    return {"one plant": {"filter": ds.field("plant_id") == plant},
+            "one plant name": {"filter": ds.field("plant_name") == f"Plant {plant}"},
+            "one week": {"filter": (ds.field("dt") >= "2025-01-08")
+                         & (ds.field("dt") <= "2025-01-14")},
+            "daily means": {"columns": ["plant_id", "temperature_mean", "soil_moisture_mean"]}}
+
+
+def benchmark_load(summary: DataFrame, plants: int, repeats: int = 3) -> dict[str, dict]:
+    """Return the size of each layout, and the bytes read and scanned and time taken by
+    each query."""
+    timings = {}
+    for layout, tuned in (("defaults", False), ("tuned", True)):
+        with TemporaryDirectory() as root:
+            write_layout(summary, root, tuned)
+            timings[layout] = {"size": get_directory_size(root),
+                               "queries": {name: time_query(root, query, repeats)
+                                           for name, query in get_queries(plants).items()}}
+    return timings
+
+
+def print_timings(timings: dict[str, dict]):
+    """Print each layout's size, then the bytes read and scanned and time taken by each
+    query."""
+    for layout, timing in timings.items():
+        print(f"{layout}: {timing['size'] / 1024:.0f} KB written")
+        print(f"  {'query':<18}{'read (KB)':>12}{'scanned (KB)':>14}{'time (ms)':>12}")
+        for name, (bytes_read, scanned, seconds) in timing["queries"].items():
+            print(f"  {name:<18}{bytes_read / 1024:>12.0f}{scanned / 1024:>14.0f}"
+                  f"{seconds * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time filtered reads of generated summaries.")
+    parser.add_argument("--plants", type=int, default=700)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--row-group-rows", type=int)
+    args = parser.parse_args()
+    if args.row_group_rows:
+        ENV["SUMMARY_ROW_GROUP_ROWS"] = str(args.row_group_rows)
+    sample = get_summaries(args.plants, args.days)
+    print(f"{len(sample)} summaries over {args.days} days")
+    print_timings(benchmark_load(sample, args.plants, args.repeats))
@@ -0,0 +1,103 @@
+"""Times the sorted summary against the groupby aggregation it replaced, and against a
+groupby aggregation of the same statistics.
+
+The sorted summary is slower than the aggregation it replaced, which only computed each
+reading's min, median and max.
+"""
+
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+
+from numpy import arange, nan, repeat, tile, where
+from numpy.random import default_rng
+from pandas import DataFrame, Timestamp, to_timedelta
+
+from transform import (QUANTILES, READING_COLUMNS, get_grouped_data, get_summary_stats,
+                       get_sorted_summary, get_time_parts)
+
+
+def get_readings(plants: int, minutes: int, seed: int = 0) -> DataFrame:
+    """Return a reading per plant per minute in time order, as the extract returns them."""
+    rng = default_rng(seed)
+    rows = plants * minutes
+    plant_ids = tile(arange(1, plants + 1), minutes)
+    readings = DataFrame({
+        "plant_id": plant_ids,
+        "plant_name": [f"Plant {plant_id}" for plant_id in plant_ids],
+        "botanist": [f"Botanist {plant_id % 7}" for plant_id in plant_ids],
+        "temperature": where(rng.random(rows) < 0.02, nan, rng.normal(18, 3, rows).round(2)),
+        "soil_moisture": where(rng.random(rows) < 0.02, nan, rng.normal(60, 15, rows).round(2)),
+        "recording_taken": Timestamp("2025-06-01")
+        + to_timedelta(repeat(arange(minutes), plants) * 60
+                       + rng.integers(0, 30, rows), unit="s")
+    })
+    return get_time_parts(readings)
+
+
+def get_full_agg(data: DataFrame) -> DataFrame:
+    """Return the sorted summary's statistics from a groupby aggregation, for readings in
+    time order."""
+    held = (get_grouped_data(data)["recording_taken"].shift(-1) - data["recording_taken"]) \
+        .dt.total_seconds().fillna(0)
+    weighted = data.assign(**{f"{column}_held": held.where(data[column].notna(), 0)
+                              for column in READING_COLUMNS},
+                           **{f"{column}_weighted": data[column] * held
+                              for column in READING_COLUMNS})
+    grouping = get_grouped_data(weighted)
+    summary = grouping.agg(**{f"{column}_{name}": (column, name)
+                              for column in READING_COLUMNS
+                              for name in ("min", "median", "max", "mean", "std")},
+                           count=("plant_id", "count"))
+    for column in READING_COLUMNS:
+        for name, quantile in QUANTILES.items():
+            if name != "median":
+                summary[f"{column}_{name}"] = grouping[column].quantile(quantile)
+        held_seconds = grouping[f"{column}_held"].sum()
+        summary[f"{column}_time_weighted_mean"] = \
+            (grouping[f"{column}_weighted"].sum() / held_seconds.where(held_seconds > 0)) \
+            .fillna(summary[f"{column}_mean"])
+    return summary
+
+
+def time_summary(summarise, data: DataFrame, repeats: int) -> float:
+    """Return the median seconds taken to summarise the data."""
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        summarise(data)
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def benchmark_transform(data: DataFrame, repeats: int = 5) -> dict[str, float]:
+    """Return the median run time of the aggregation, the aggregation of the same statistics
+    as the sorted summary and the sorted summary."""
+    return {"agg": time_summary(lambda readings: get_summary_stats(get_grouped_data(readings)),
+                                data, repeats),
+            "full_agg": time_summary(get_full_agg, data, repeats),
+            "sorted": time_summary(get_sorted_summary, data, repeats)}
+
+
+def print_timings(timings: dict[str, dict[str, float]]):
+    """Print summary timings, with the sorted summary next to the aggregation of the same
+    statistics."""
+    print(f"{'keys':<14}{'agg (ms)':>12}{'full agg (ms)':>16}{'sorted (ms)':>14}")
+    for keys, timing in timings.items():
+        print(f"{keys:<14}{timing['agg'] * 1000:>12.1f}{timing['full_agg'] * 1000:>16.1f}"
+              f"{timing['sorted'] * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time the long term summary on generated readings.")
+    parser.add_argument("--plants", type=int, default=700)
+    parser.add_argument("--minutes", type=int, default=1440)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    sample = get_readings(args.plants, args.minutes)
+    print(f"{len(sample)} readings in {len(get_sorted_summary(sample))} groups")
+    print_timings({
+        "strings": benchmark_transform(sample, args.repeats),
+        "categories": benchmark_transform(
+            sample.astype({"plant_name": "category", "botanist": "category"}), args.repeats)
+    })
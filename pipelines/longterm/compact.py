@@ -0,0 +1,92 @@
+"""Module for compacting closed months of daily summaries into one object each."""
+
+from datetime import date
+from io import BytesIO
+from json import dumps, loads
+from logging import getLogger
+from os import environ as ENV
+
+from boto3 import client
+from botocore.exceptions import ClientError
+from pandas import concat
+from pyarrow import Table, parquet as pq
+
+from load import get_partition_values, get_summary_write_options, read_object
+from tracing import traced, set_attributes
+
+SUMMARY_PREFIX = "input/plant"
+COMPACT_PREFIX = "compact/summary"
+MANIFEST_KEY = f"{COMPACT_PREFIX}/_manifest.json"
+
+
+def get_manifest(awsclient: client) -> dict:
+    """Return the manifest of compacted months, or an empty one if there is none yet."""
+    try:
+        body = awsclient.get_object(Bucket=ENV["S3_BUCKET"], Key=MANIFEST_KEY)["Body"]
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return {"months": {}}
+    return loads(body.read())
+
+
+def put_manifest(awsclient: client, manifest: dict):
+    """Store the manifest of compacted months."""
+    awsclient.put_object(Bucket=ENV["S3_BUCKET"], Key=MANIFEST_KEY,
+                         Body=dumps(manifest, indent=2, sort_keys=True).encode(),
+                         ContentType="application/json")
+
+
+def get_month_sources(awsclient: client, before: date) -> dict[str, dict[str, str]]:
+    """Return the ETag of each daily summary object, by month, for months before before."""
+    months = {}
+    paginator = awsclient.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=ENV["S3_BUCKET"], Prefix=f"{SUMMARY_PREFIX}/dt="):
+        for found in page.get("Contents", []):
+            day = date.fromisoformat(get_partition_values(found["Key"])["dt"])
+            if day < before.replace(day=1):
+                month = f"year={day.year}/month={day.month}"
+                months.setdefault(month, {})[found["Key"]] = found["ETag"]
+    return months
+
+
+@traced("compact.compact_month")
+def compact_month(awsclient: client, month: str, keys: list[str]) -> dict:
+    """Write the month's daily summary objects as one object sorted by dt and plant, and
+    return its manifest entry."""
+    logger = getLogger()
+    logger.info("Compacting daily summaries of %s...", month)
+    summary = concat(read_object(awsclient, key) for key in keys).reset_index() \
+        .sort_values(["dt", "plant_id"], ignore_index=True)
+    table = Table.from_pandas(summary, preserve_index=False)
+    buffer = BytesIO()
+    pq.write_table(table, buffer, **get_summary_write_options(table.schema, table.num_rows,
+                                                              ("dt", "plant_id")))
+    key = f"{COMPACT_PREFIX}/{month}/summary-compact-0"
+    awsclient.put_object(Bucket=ENV["S3_BUCKET"], Key=key, Body=buffer.getvalue())
+    set_attributes(rows=len(summary), bytes=buffer.tell())
+    return {"key": key, "rows": len(summary), "bytes": buffer.tell()}
+
+
+@traced("compact.compact_closed_months")
+def compact_closed_months(awsclient: client, today: date = None) -> list[str]:
+    """Compact each month before today's whose daily summaries changed since it was last
+    compacted, returning the months compacted.
+
+    The daily summaries are kept, so a month is rebuilt from them whenever a late or
+    re-run day changes it, and compacting again without changes does nothing.
+    """
+    logger = getLogger()
+    manifest = get_manifest(awsclient)
+    compacted = []
+    for month, sources in sorted(get_month_sources(awsclient, today or date.today()).items()):
+        if manifest["months"].get(month, {}).get("sources") == sources:
+            continue
+        manifest["months"][month] = {**compact_month(awsclient, month, list(sources)),
+                                    "sources": sources}
+        compacted.append(month)
+    if compacted:
+        put_manifest(awsclient, manifest)
+    logger.info("Compacted %d months.", len(compacted))
+    set_attributes(months=len(compacted))
+    return compacted
@@ -2,7 +2,11 @@
 """Module for test fixtures in historic pipeline."""
 
 from datetime import datetime
+from hashlib import md5
+from io import BytesIO
+from unittest.mock import Mock
 
+from botocore.exceptions import ClientError
 from pytest import fixture
 from pandas import DataFrame
 
@@ -61,9 +65,9 @@ def test_sample_dataframe():
     return DataFrame({
         "plant_id": [1, 2, 3],
         "plant_name": ["Mike", "Stan", "Geoff"],
-        "temperature": [10, 80, 60],
+        "temperature": [10.0, 80.0, 60.0],
         "last_watered": ["then", "after", "now"],
-        "soil_moisture": [5, 10, 2],
+        "soil_moisture": [5.0, 10.0, 2.0],
         "recording_taken": ["this year", "that year", "then year"],
         "city": ["LA", "BRUM", "MANNY"],
         "country": ["USA", "UK", "united Kingdom"],
@@ -138,3 +142,40 @@ def test_summary_dataframe():
         "soil_moisture_max": [37.0, 22.0, 15.0, 30.0],
         "count": [3, 2, 1, 1]
     }).set_index(keys="plant_id")
+
+
+class FakeS3:
+    """S3 client holding one bucket's objects in memory."""
+
+    def __init__(self):
+        self.objects = {}
+        self.meta = Mock()
+
+    def put_object(self, Bucket, Key, Body, **_):
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, body, bucket, key, **_):
+        self.put_object(bucket, key, body.read())
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": BytesIO(self.objects[Key])}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def delete_objects(self, Bucket, Delete):
+        for found in Delete["Objects"]:
+            self.objects.pop(found["Key"])
+
+    def get_paginator(self, _):
+        return Mock(paginate=lambda Bucket, Prefix: [{"Contents": [
+            {"Key": key, "ETag": md5(body).hexdigest()}
+            for key, body in sorted(self.objects.items()) if key.startswith(Prefix)]}])
+
+
+@fixture
+def fake_s3(monkeypatch):
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    return FakeS3()
@@ -1,16 +1,44 @@
 """Module for extracting from short term storage for use in historic storage."""
 
+from itertools import compress
 from logging import getLogger
+from operator import itemgetter
 from os import environ as ENV
 
 from dotenv import load_dotenv
-from pandas import DataFrame
+from numpy import fromiter, flatnonzero, int64
+from pandas import DataFrame, to_datetime
 from pyodbc import connect, Connection
 
+from backend import get_backend, get_dialect, get_sqlite_connection
+from tracing import traced, set_attributes, add_to_attribute
+
+PARTITION_FUNCTION = "pf_record_day"
+PARTITION_SCHEME = "ps_record_day"
+DAYS_AHEAD = 3
+# The start of the day it was the given number of minutes ago.
+DAY_MINUTES_AGO = {
+    "mssql": "CAST(CAST(DATEADD(minute, -{minutes}, GETDATE()) AS DATE) AS DATETIME)",
+    "sqlite": "datetime('now', '-{minutes} minutes', 'start of day')"
+}
+SUMMARY_KEY = "plant_id, plant_name, botanist, day_taken"
+READING_COLUMNS = ("temperature", "soil_moisture")
+SUMMARY_STATISTICS = ("min", "median", "max", "mean", "std", "p5", "p95", "time_weighted_mean")
+SUMMARY_COLUMNS = ("plant_id", "plant_name", "botanist", "day_taken",
+                   *(f"{column}_{statistic}" for column in READING_COLUMNS
+                     for statistic in SUMMARY_STATISTICS), "count")
+COLUMNS = ("plant_id", "plant_name", "temperature", "last_watered", "soil_moisture",
+           "recording_taken", "city", "country", "botanist")
+RECORD_COLUMNS = ("plant_id", "temperature", "last_watered", "soil_moisture", "recording_taken")
+DIMENSION_COLUMNS = ("plant_id", "plant_name", "city", "country", "botanist")
+
 
 def get_connection():
     """Return database connection."""
     logger = getLogger()
+    if get_backend() == "sqlite":
+        logger.info("Getting local SQLite connection...")
+        return get_sqlite_connection(ENV["SQLITE_PATH"], get_schema())
     logger.info("Getting RDS connection...")
     connection_string = f"""
                             DRIVER={{ODBC Driver 18 for SQL Server}};
@@ -25,16 +53,14 @@ def get_connection():
     return connect(connection_string)
 
 
-def get_full_data(conn: Connection, schema: str) -> list:
-    """Return row data from full sql query."""
-    logger = getLogger()
-    logger.info("Send SELECT query to RDS...")
-    with conn.cursor() as curs:
-        query = f"""SELECT p.plant_id, p.name,
+def get_full_data_query(schema: str, ordered: bool = False) -> str:
+    """Return the query joining archived records to their plant details."""
+    order = "\n                     ORDER BY p.plant_id" if ordered else ""
+    return f"""SELECT p.plant_id, p.name,
                      r.temperature, r.last_watered, r.soil_moisture,
                      r.recording_taken, ci.name, co.name, b.name
                      FROM {schema}.plant AS p
-                     JOIN {schema}.record AS r
+                     JOIN {schema}.record_archive AS r
                      ON (p.plant_id = r.plant_id)
                      JOIN {schema}.botanist_plant AS bp
                      ON (p.plant_id=bp.plant_id)
@@ -43,43 +69,227 @@ def get_full_data(conn: Connection, schema: str) -> list:
                      JOIN {schema}.origin_city AS ci
                      ON (p.city_id = ci.city_id)
                      JOIN {schema}.origin_country AS co
-                     ON (ci.country_id = co.country_id);"""
-        curs.execute(query)
+                     ON (ci.country_id = co.country_id){order};"""
+
+
+def get_daily_summary_query(schema: str) -> str:
+    """Return the query summarising records per plant, botanist and day on the server."""
+    if get_backend() == "sqlite":
+        day_taken = "date(r.recording_taken)"
+        summary = get_sqlite_summary_select()
+    else:
+        day_taken = "CAST(r.recording_taken AS DATE)"
+        summary = get_mssql_summary_select()
+    return f"""WITH day_records AS (
+                SELECT p.plant_id, p.name AS plant_name, b.name AS botanist,
+                       {day_taken} AS day_taken, r.recording_taken,
+                       CAST(r.temperature AS FLOAT) AS temperature,
+                       CAST(r.soil_moisture AS FLOAT) AS soil_moisture
+                FROM {schema}.plant AS p
+                JOIN {schema}.record_archive AS r ON (p.plant_id = r.plant_id)
+                JOIN {schema}.botanist_plant AS bp ON (p.plant_id = bp.plant_id)
+                JOIN {schema}.botanist AS b ON (bp.botanist_id = b.botanist_id)
+                JOIN {schema}.origin_city AS ci ON (p.city_id = ci.city_id)
+                JOIN {schema}.origin_country AS co ON (ci.country_id = co.country_id)
+            ){summary}
+            ORDER BY {SUMMARY_KEY};"""
+
+
+def get_time_weighted_mean(column: str, over: str = "") -> str:
+    """Return the mean of a reading weighted by how long each value was held."""
+    return f"""COALESCE(SUM({column} * held_seconds) {over}
+                    / NULLIF(SUM(CASE WHEN {column} IS NOT NULL THEN held_seconds END) {over}, 0),
+                    AVG({column}) {over})"""
+
+
+def get_mssql_summary_select() -> str:
+    """Return the SQL Server summary, using PERCENTILE_CONT for medians and percentiles."""
+    over = f"OVER (PARTITION BY {SUMMARY_KEY})"
+    statistics = ",".join(f"""
+                MIN({column}) {over},
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY {column}) {over},
+                MAX({column}) {over},
+                AVG({column}) {over},
+                STDEV({column}) {over},
+                PERCENTILE_CONT(0.05) WITHIN GROUP (ORDER BY {column}) {over},
+                PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY {column}) {over},
+                {get_time_weighted_mean(column, over)}""" for column in READING_COLUMNS)
+    return f""", timed_records AS (
+                SELECT *, DATEDIFF(millisecond, recording_taken, LEAD(recording_taken)
+                    OVER (PARTITION BY {SUMMARY_KEY} ORDER BY recording_taken)) / 1000.0
+                    AS held_seconds
+                FROM day_records
+            )
+            SELECT DISTINCT {SUMMARY_KEY},{statistics},
+                COUNT(*) {over}
+            FROM timed_records"""
+
+
+def get_sqlite_percentile(column: str, fraction: float) -> str:
+    """Return a percentile interpolated between the two ranked values either side of it."""
+    position = f"({column}_count - 1) * {fraction}"
+    lower = f"CAST({position} AS INTEGER)"
+    return f"""CASE WHEN MAX({column}_count) > 0 THEN SUM(
+                    CASE WHEN {column}_position = {lower} + 1
+                         THEN {column} * (1 - ({position} - {lower})) ELSE 0 END
+                    + CASE WHEN {column}_position = {lower} + 2
+                           THEN {column} * ({position} - {lower}) ELSE 0 END) END"""
+
+
+def get_sqlite_summary_select() -> str:
+    """Return the SQLite summary, which has no PERCENTILE_CONT, interpolating between
+    ranked values instead."""
+    ranks = ",".join(f"""
+                ROW_NUMBER() OVER (PARTITION BY {SUMMARY_KEY}
+                                   ORDER BY {column} IS NULL, {column}) AS {column}_position,
+                COUNT({column}) OVER (PARTITION BY {SUMMARY_KEY}) AS {column}_count,
+                {column} - AVG({column}) OVER (PARTITION BY {SUMMARY_KEY})
+                    AS {column}_deviation""" for column in READING_COLUMNS)
+    statistics = ",".join(f"""
+                MIN({column}), {get_sqlite_percentile(column, 0.5)}, MAX({column}),
+                AVG({column}),
+                sqrt(SUM({column}_deviation * {column}_deviation) / ({column}_count - 1)),
+                {get_sqlite_percentile(column, 0.05)},
+                {get_sqlite_percentile(column, 0.95)},
+                {get_time_weighted_mean(column)}""" for column in READING_COLUMNS)
+    return f""", ranked AS (
+                SELECT *,{ranks},
+                    (julianday(LEAD(recording_taken) OVER (PARTITION BY {SUMMARY_KEY}
+                                                           ORDER BY recording_taken))
+                     - julianday(recording_taken)) * 86400 AS held_seconds
+                FROM day_records
+            )
+            SELECT {SUMMARY_KEY},{statistics},
+                COUNT(*)
+            FROM ranked
+            GROUP BY {SUMMARY_KEY}"""
+
+
+@traced("extract.get_daily_summary")
+def get_daily_summary(conn: Connection, schema: str) -> DataFrame:
+    """Return the daily summary statistics computed by the database."""
+    logger = getLogger()
+    logger.info("Send summary query to RDS...")
+    with conn.cursor() as curs:
+        curs.execute(get_daily_summary_query(schema))
+        rows = curs.fetchall()
+    set_attributes(rows=len(rows))
+    if not rows:
+        logger.error("No data returned from RDS.")
+        return DataFrame()
+    return get_dataframe_from_summary_rows(rows)
+
+
+def get_dataframe_from_summary_rows(rows: list) -> DataFrame:
+    """Return summary rows in the same shape as transform.get_summary_from_df."""
+    summary = DataFrame.from_records(rows, columns=SUMMARY_COLUMNS)
+    days = to_datetime(summary.pop("day_taken"))
+    summary.insert(3, "year", days.dt.year)
+    summary.insert(4, "month", days.dt.month)
+    summary.insert(5, "day", days.dt.day)
+    statistics = list(SUMMARY_COLUMNS[4:-1])
+    summary[statistics] = summary[statistics].astype(float)
+    return summary.astype({"count": "int64"}).set_index("plant_id")
+
+
+def get_record_query(schema: str, ordered: bool = False) -> str:
+    """Return the query for archived records without their plant details."""
+    order = "\n                     ORDER BY r.plant_id" if ordered else ""
+    return f"""SELECT r.plant_id, r.temperature, r.last_watered, r.soil_moisture,
+                     r.recording_taken
+                     FROM {schema}.record_archive AS r{order};"""
+
+
+@traced("extract.get_records")
+def get_records(conn: Connection, schema: str) -> list:
+    """Return record rows without their plant details."""
+    logger = getLogger()
+    logger.info("Send SELECT query for records to RDS...")
+    with conn.cursor() as curs:
+        curs.execute(get_record_query(schema))
         rows = curs.fetchall()
+    set_attributes(rows=len(rows))
+    return rows
+
+
+@traced("extract.get_dimensions")
+def get_dimensions(conn: Connection, schema: str) -> DataFrame:
+    """Return each plant's name, origin and botanists, with the strings as categories."""
+    logger = getLogger()
+    logger.info("Send SELECT query for plant details to RDS...")
+    with conn.cursor() as curs:
+        curs.execute(f"""SELECT p.plant_id, p.name, ci.name, co.name, b.name
+                         FROM {schema}.plant AS p
+                         JOIN {schema}.botanist_plant AS bp
+                         ON (p.plant_id=bp.plant_id)
+                         JOIN {schema}.botanist AS b
+                         ON (bp.botanist_id=b.botanist_id)
+                         JOIN {schema}.origin_city AS ci
+                         ON (p.city_id = ci.city_id)
+                         JOIN {schema}.origin_country AS co
+                         ON (ci.country_id = co.country_id);""")
+        rows = curs.fetchall()
+    set_attributes(rows=len(rows))
+    dimensions = DataFrame(get_dict_from_rows(rows, DIMENSION_COLUMNS))
+    return dimensions.astype({column: "category" for column in DIMENSION_COLUMNS[1:]})
+
+
+def join_dimensions(rows: list, dimensions: DataFrame) -> DataFrame:
+    """Return record rows joined to their plant details, in the full data's columns."""
+    records = DataFrame(get_dict_from_rows(rows, RECORD_COLUMNS))
+    joined = records.merge(dimensions, on="plant_id", how="inner")
+    return joined[list(COLUMNS)].astype({"temperature": float, "soil_moisture": float})
+
+
+def is_narrow_extract() -> bool:
+    """Return true if records are fetched without their plant details and joined locally."""
+    return ENV.get("NARROW_EXTRACT", "false").lower() == "true"
+
+
+@traced("extract.get_full_data")
+def get_full_data(conn: Connection, schema: str) -> list:
+    """Return row data from full sql query."""
+    logger = getLogger()
+    logger.info("Send SELECT query to RDS...")
+    with conn.cursor() as curs:
+        curs.execute(get_full_data_query(schema))
+        rows = curs.fetchall()
+        set_attributes(rows=len(rows))
         if not rows:
             logger.error("No data returned from RDS.")
     return rows
 
 
-def get_dict_from_rows(rows: list) -> dict:
-    """Return dictionary from row data."""
-    logger = getLogger()
-    logger.info("Converting rows to dictionary...")
-    output_object = {
-        "plant_id": [],
-        "plant_name": [],
-        "temperature": [],
-        "last_watered": [],
-        "soil_moisture": [],
-        "recording_taken": [],
-        "city": [],
-        "country": [],
-        "botanist": []
-    }
-    for row in rows:
-        if len(row) == 9:
-            output_object["plant_id"].append(row[0])
-            output_object["plant_name"].append(row[1])
-            output_object["temperature"].append(row[2])
-            output_object["last_watered"].append(row[3])
-            output_object["soil_moisture"].append(row[4])
-            output_object["recording_taken"].append(row[5])
-            output_object["city"].append(row[6])
-            output_object["country"].append(row[7])
-            output_object["botanist"].append(row[8])
-            logger.info("Succesfully retrieved values from row")
-        else:
-            logger.error("Row data is malformed: %s", row)
+def get_full_data_chunks(conn: Connection, schema: str, chunk_rows: int,
+                         narrow: bool = False):
+    """Yield row data from the full sql query in chunks, ordered by plant.
+
+    Narrow chunks hold only the record columns, to be joined with get_dimensions.
+    """
+    logger = getLogger()
+    logger.info("Send SELECT query to RDS, fetching %d rows at a time...", chunk_rows)
+    with conn.cursor() as curs:
+        curs.execute(get_record_query(schema, ordered=True) if narrow
+                     else get_full_data_query(schema, ordered=True))
+        while rows := curs.fetchmany(chunk_rows):
+            add_to_attribute("rows", len(rows))
+            yield rows
+
+
+def get_dict_from_rows(rows: list, columns: tuple[str, ...] = COLUMNS) -> dict:
+    """Return dictionary of columns from row data, dropping malformed rows."""
+    logger = getLogger()
+    logger.info("Converting %d rows to columns...", len(rows))
+    widths = fromiter(map(len, rows), dtype=int64, count=len(rows))
+    well_formed = widths == len(columns)
+    if not well_formed.all():
+        malformed = flatnonzero(~well_formed)
+        logger.error("Dropping %d malformed rows, the first being: %s",
+                     malformed.size, rows[malformed[0]])
+        rows = list(compress(rows, well_formed))
+    output_object = {name: list(map(itemgetter(index), rows))
+                     for index, name in enumerate(columns)}
+    logger.info("Converted %d rows to columns.", len(rows))
     return output_object
 
 
@@ -87,15 +297,171 @@ def get_dataframe_from_dict(data: dict) -> DataFrame:
     """Return Dataframe from dictionary data."""
     logger = getLogger()
     logger.info("Converting dictionary to Dataframe...")
-    return DataFrame.from_dict(data)
+    return DataFrame.from_dict(data).astype({"temperature": float,
+                                             "soil_moisture": float})
 
 
-def truncate_record(conn: Connection, schema: str):
-    """Remove data from records table."""
+@traced("extract.split_future_partitions")
+def split_future_partitions(conn: Connection):
+    """Add empty daily partitions ahead of today so new readings land in their own day."""
     logger = getLogger()
-    logger.info("Removing data from Record table...")
+    logger.info("Adding daily partitions for the next %d days...", DAYS_AHEAD)
     with conn.cursor() as curs:
-        query = f"TRUNCATE TABLE {schema}.record;"
+        query = f"""
+            DECLARE @today DATETIME = CAST(CAST(GETDATE() AS DATE) AS DATETIME);
+            DECLARE @day DATETIME = DATEADD(day, 1, @today);
+            WHILE @day <= DATEADD(day, {DAYS_AHEAD}, @today)
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM sys.partition_range_values AS prv
+                    JOIN sys.partition_functions AS pf
+                    ON (prv.function_id = pf.function_id)
+                    WHERE pf.name = '{PARTITION_FUNCTION}'
+                    AND CAST(prv.value AS DATETIME) = @day)
+                BEGIN
+                    ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY];
+                    ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE (@day);
+                END
+                SET @day = DATEADD(day, 1, @day);
+            END;"""
+        curs.execute(query)
+        curs.commit()
+
+
+def get_export_batch_rows() -> int:
+    """Return the most readings to archive in one run, or 0 to archive every closed day."""
+    return int(ENV.get("EXPORT_BATCH_ROWS", "0"))
+
+
+def get_closed_before() -> str:
+    """Return the SQL for the start of the first day still open.
+
+    A day stays open for DAY_CLOSE_MINUTES after midnight, so readings buffered before
+    midnight are loaded before it is exported.
+    """
+    return DAY_MINUTES_AGO[get_backend()].format(minutes=int(ENV.get("DAY_CLOSE_MINUTES", "0")))
+
+
+def get_whole_days(days: list[tuple], batch_rows: int) -> list:
+    """Return the first of the (day, readings) pairs whose readings fit in batch_rows.
+
+    A day is never split, so the first day is always returned, however many readings
+    it holds.
+    """
+    if batch_rows <= 0:
+        return [day for day, _ in days]
+    whole_days = []
+    total = 0
+    for day, readings in days:
+        total += readings
+        if whole_days and total > batch_rows:
+            break
+        whole_days.append(day)
+    return whole_days
+
+
+def get_closed_partitions(conn: Connection, schema: str, batch_rows: int = 0) -> list[int]:
+    """Return record partitions for closed days that can be switched out, only as many
+    whole days as fit in batch_rows if it is set."""
+    logger = getLogger()
+    logger.info("Finding closed daily partitions...")
+    with conn.cursor() as curs:
+        query = f"""SELECT p.partition_number, p.rows
+                     FROM sys.partitions AS p
+                     JOIN sys.partition_range_values AS prv
+                     ON (prv.boundary_id = p.partition_number)
+                     JOIN sys.partition_functions AS pf
+                     ON (prv.function_id = pf.function_id)
+                     WHERE pf.name = '{PARTITION_FUNCTION}'
+                     AND p.object_id = OBJECT_ID('{schema}.record')
+                     AND p.index_id = 1
+                     AND CAST(prv.value AS DATETIME) <= {get_closed_before()}
+                     AND NOT EXISTS (
+                        SELECT 1 FROM {schema}.record_archive AS a
+                        WHERE $PARTITION.{PARTITION_FUNCTION}(a.recording_taken)
+                            = p.partition_number)
+                     ORDER BY p.partition_number;"""
+        curs.execute(query)
+        return get_whole_days([tuple(row) for row in curs.fetchall()], batch_rows)
+
+
+@traced("extract.switch_out_partitions")
+def switch_out_partitions(conn: Connection, schema: str, partitions: list[int]):
+    """Move closed daily partitions from record to record_archive."""
+    logger = getLogger()
+    logger.info("Switching out %d closed partitions...", len(partitions))
+    set_attributes(partitions=len(partitions))
+    with conn.cursor() as curs:
+        for partition in partitions:
+            curs.execute(f"""ALTER TABLE {schema}.record
+                             SWITCH PARTITION {int(partition)}
+                             TO {schema}.record_archive PARTITION {int(partition)};""")
+        curs.commit()
+
+
+@traced("extract.move_closed_days")
+def move_closed_days(conn: Connection, schema: str, batch_rows: int = 0):
+    """Move readings from closed days to record_archive on backends without partitions,
+    only as many whole days as fit in batch_rows if it is set."""
+    logger = getLogger()
+    logger.info("Moving closed days to Record archive table...")
+    with conn.cursor() as curs:
+        curs.execute(f"""SELECT date(recording_taken), COUNT(*) FROM {schema}.record
+                         WHERE recording_taken < {get_closed_before()}
+                         GROUP BY date(recording_taken) ORDER BY date(recording_taken);""")
+        days = get_whole_days(curs.fetchall(), batch_rows)
+        if not days:
+            return
+        # Both statements run in one transaction, so each moved reading is deleted once.
+        closed = "recording_taken < date(?, '+1 day')"
+        curs.execute(f"""INSERT INTO {schema}.record_archive
+                         SELECT * FROM {schema}.record WHERE {closed};""", (days[-1],))
+        set_attributes(rows=curs.rowcount, days=len(days))
+        curs.execute(f"DELETE FROM {schema}.record WHERE {closed};", (days[-1],))
+        curs.commit()
+
+
+@traced("extract.truncate_archive")
+def truncate_archive(conn: Connection, schema: str):
+    """Remove exported data from record archive table."""
+    logger = getLogger()
+    logger.info("Removing data from Record archive table...")
+    with conn.cursor() as curs:
+        query = get_dialect()["truncate"].format(
+            table=f"{schema}.record_archive") + ";"
+        curs.execute(query)
+        curs.commit()
+
+
+@traced("extract.merge_closed_partitions")
+def merge_closed_partitions(conn: Connection, schema: str):
+    """Remove daily partition boundaries before today once their data is exported.
+
+    Boundaries from the first closed day still in record on are kept, so no data is
+    moved, and days left by a batched export can still be switched out.
+    """
+    logger = getLogger()
+    logger.info("Merging exported daily partitions...")
+    with conn.cursor() as curs:
+        query = f"""
+            DECLARE @boundary DATETIME;
+            DECLARE @today DATETIME = CAST(CAST(GETDATE() AS DATE) AS DATETIME);
+            DECLARE @kept DATETIME = COALESCE(
+                (SELECT CAST(CAST(MIN(recording_taken) AS DATE) AS DATETIME)
+                 FROM {schema}.record WHERE recording_taken < @today), @today);
+            SELECT @boundary = MIN(CAST(prv.value AS DATETIME))
+            FROM sys.partition_range_values AS prv
+            JOIN sys.partition_functions AS pf ON (prv.function_id = pf.function_id)
+            WHERE pf.name = '{PARTITION_FUNCTION}';
+            WHILE @boundary < @kept
+            BEGIN
+                ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() MERGE RANGE (@boundary);
+                SET @boundary = NULL;
+                SELECT @boundary = MIN(CAST(prv.value AS DATETIME))
+                FROM sys.partition_range_values AS prv
+                JOIN sys.partition_functions AS pf ON (prv.function_id = pf.function_id)
+                WHERE pf.name = '{PARTITION_FUNCTION}';
+            END;"""
         curs.execute(query)
         curs.commit()
 
@@ -110,23 +476,117 @@ def get_schema() -> str:
     return schema
 
 
+def is_archive_empty(conn: Connection, schema: str) -> bool:
+    """Return true if record_archive holds no readings."""
+    with conn.cursor() as curs:
+        curs.execute(f"""SELECT {get_dialect()["top"].format(rows=1)} 1
+                         FROM {schema}.record_archive {get_dialect()["limit"].format(rows=1)};""")
+        return curs.fetchone() is None
+
+
+def archive_closed_days(conn: Connection, schema: str):
+    """Move readings from closed days out of the record table into record_archive.
+
+    Readings left in the archive by a failed run are exported again as they are, before
+    any more days are archived. With EXPORT_BATCH_ROWS set, only as many whole days as
+    fit in it are archived.
+    """
+    logger = getLogger()
+    if get_backend() != "sqlite":
+        split_future_partitions(conn)
+    if not is_archive_empty(conn, schema):
+        logger.info("Exporting readings left in record_archive by a failed run...")
+        return
+    if get_backend() == "sqlite":
+        move_closed_days(conn, schema, get_export_batch_rows())
+    else:
+        switch_out_partitions(conn, schema,
+                              get_closed_partitions(conn, schema, get_export_batch_rows()))
+
+
+def fill_archive() -> int:
+    """Archive closed days for export, returning the highest record_id in record_archive.
+
+    The id names the export's files, so a failed run exporting the same archive again
+    overwrites them, and later exports of readings loaded late don't.
+    """
+    logger = getLogger()
+    logger.info("Archiving closed days in RDS...")
+    rds_conn = get_connection()
+    target_schema = get_schema()
+    try:
+        archive_closed_days(rds_conn, target_schema)
+        with rds_conn.cursor() as curs:
+            curs.execute(f"SELECT MAX(record_id) FROM {target_schema}.record_archive;")
+            return curs.fetchone()[0] or 0
+    finally:
+        rds_conn.close()
+
+
 def get_data_from_rds() -> DataFrame:
-    """Return data as Dataframe from RDS connection."""
+    """Return data as Dataframe from closed days switched out of the record table."""
     logger = getLogger()
     logger.info("Getting data from RDS...")
     rds_conn = get_connection()
     target_schema = get_schema()
-    data_rows = get_full_data(rds_conn, target_schema)
-    if data_rows:
-        data_dict = get_dict_from_rows(data_rows)
-        data_df = get_dataframe_from_dict(data_dict)
-        truncate_record(rds_conn, target_schema)
+    if is_narrow_extract():
+        data_rows = get_records(rds_conn, target_schema)
+        data_df = (join_dimensions(data_rows, get_dimensions(rds_conn, target_schema))
+                   if data_rows else DataFrame())
     else:
-        data_df = DataFrame()
+        data_rows = get_full_data(rds_conn, target_schema)
+        if data_rows:
+            data_dict = get_dict_from_rows(data_rows)
+            data_df = get_dataframe_from_dict(data_dict)
+        else:
+            data_df = DataFrame()
     rds_conn.close()
     return data_df
 
 
+def get_summary_from_rds() -> DataFrame:
+    """Return the summary of closed days switched out of the record table, computed by RDS."""
+    logger = getLogger()
+    logger.info("Getting summary from RDS...")
+    rds_conn = get_connection()
+    target_schema = get_schema()
+    try:
+        return get_daily_summary(rds_conn, target_schema)
+    finally:
+        rds_conn.close()
+
+
+def stream_data_from_rds(chunk_rows: int):
+    """Yield Dataframes of at most chunk_rows rows from closed days, ordered by plant."""
+    logger = getLogger()
+    logger.info("Streaming data from RDS...")
+    rds_conn = get_connection()
+    target_schema = get_schema()
+    try:
+        if is_narrow_extract():
+            dimensions = get_dimensions(rds_conn, target_schema)
+            for rows in get_full_data_chunks(rds_conn, target_schema, chunk_rows, narrow=True):
+                yield join_dimensions(rows, dimensions)
+        else:
+            for rows in get_full_data_chunks(rds_conn, target_schema, chunk_rows):
+                yield get_dataframe_from_dict(get_dict_from_rows(rows))
+    finally:
+        rds_conn.close()
+
+
+def clear_archive():
+    """Remove exported data from RDS and merge its daily partitions."""
+    logger = getLogger()
+    logger.info("Clearing exported data from RDS...")
+    rds_conn = get_connection()
+    target_schema = get_schema()
+    truncate_archive(rds_conn, target_schema)
+    if get_backend() != "sqlite":
+        merge_closed_partitions(rds_conn, target_schema)
+    rds_conn.close()
+
+
 if __name__ == "__main__":
     load_dotenv()
+    fill_archive()
     get_data_from_rds()
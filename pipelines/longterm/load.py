@@ -1,18 +1,54 @@
 """Module for loading long term data to S3."""
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from io import BytesIO
 from logging import getLogger
 from os import environ as ENV, path, walk, mkdir
 from shutil import rmtree
+from time import perf_counter
 
-from pandas import DataFrame
+from pandas import DataFrame, concat, to_datetime
 from boto3 import client
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
-from pyarrow import Table, parquet as pq
+from pyarrow import Schema, Table, compute as pc, parquet as pq, types
+
+from tracing import traced, set_attributes
+from transform import merge_summaries
+
+# Summaries are partitioned by a single sortable date, so Athena can project them.
+SUMMARY_PARTITIONS = ["dt"]
+DATE_PARTS = ["year", "month", "day"]
+SUMMARY_BLOOM_COLUMNS = ("plant_id", "plant_name")
+RAW_PREFIX = "raw"
+# Each export's summaries are staged here, and merged into their days under input/.
+STAGED_PREFIX = "export"
+STAGED_ROOT = f"/tmp/data/{STAGED_PREFIX}/plant"
+MERGED_TEMPLATE = "summary-day-{i}"
+ROLLUP_PREFIX = "rollup"
+ROLLUP_PARTITIONS = {"hourly": ["year", "month", "day"],
+                     "daily": ["year", "month", "day"],
+                     "monthly": ["year", "month"]}
+MB = 1024 ** 2
+UPLOAD_WORKERS = 8
+# Parquet built in memory, by S3 key, until it is uploaded.
+PENDING_UPLOADS: dict[str, bytes] = {}
+RAW_COLUMNS = ("plant_id", "recording_taken", "temperature", "soil_moisture", "last_watered",
+               "plant_name", "city", "country")
+
+
+def is_loaded_in_memory() -> bool:
+    """Return true if parquet is built in memory and uploaded from there, not from /tmp."""
+    return ENV.get("LOAD_IN_MEMORY", "false").lower() == "true"
 
 
 def create_data_directory() -> bool:
     """Return true if data directory created successfully."""
     logger = getLogger()
+    if is_loaded_in_memory():
+        return False
     logger.info("Creating empty data directory for Parquet files...")
     dir_path = "/tmp/data"
     if not path.exists(dir_path):
@@ -25,6 +61,8 @@ def create_data_directory() -> bool:
 def delete_data_directory() -> bool:
     """Return true if deleted data directory."""
     logger = getLogger()
+    if is_loaded_in_memory():
+        return False
     logger.info("Deleting filled data directory...")
     dir_path = "/tmp/data"
     rmtree(dir_path)
@@ -33,52 +71,361 @@ def delete_data_directory() -> bool:
     return True
 
 
-def create_parquet(data: DataFrame) -> bool:
-    """Save data as parquet files."""
+def get_directory_size(dir_path: str) -> int:
+    """Return the total size in bytes of the files under a directory."""
+    return sum(path.getsize(path.join(root, file))
+               for root, _, files in walk(dir_path) for file in files)
+
+
+def get_partitions(table: Table, partition_cols: list[str]):
+    """Yield the values and rows of each partition of table, without the partition columns."""
+    for values in table.select(partition_cols).group_by(partition_cols).aggregate([]).to_pylist():
+        rows = reduce(pc.and_, (pc.equal(table[name], value) for name, value in values.items()))
+        yield values, table.filter(rows).drop_columns(partition_cols)
+
+
+def write_partitions(table: Table, root_path: str, partition_cols: list[str],
+                     basename_template: str, **options):
+    """Write table as hive partitioned parquet under root_path, or into memory under the
+    S3 keys it would be uploaded to."""
+    if not is_loaded_in_memory():
+        pq.write_to_dataset(table, root_path=root_path, partition_cols=partition_cols,
+                            basename_template=basename_template, **options)
+        return
+    for values, rows in get_partitions(table, partition_cols):
+        buffer = BytesIO()
+        pq.write_table(rows, buffer, **options)
+        directory = "/".join([root_path, *(f"{name}={value}" for name, value in values.items())])
+        key = get_s3_key(directory, basename_template.format(i=0))
+        PENDING_UPLOADS[key] = buffer.getvalue()
+
+
+def get_summary_write_options(schema: Schema, rows: int,
+                              sort_by: tuple[str] = ("plant_id",)) -> dict:
+    """Return the parquet write options for summaries with the given file schema.
+
+    Rows are sorted by plant with a page index, so row groups and pages can be skipped
+    by their min and max, and plant_id and plant_name have bloom filters, so files without
+    a plant can be skipped too. Only text columns are dictionary encoded.
+    """
+    options = {"compression": ENV.get("SUMMARY_COMPRESSION", "zstd"),
+               "use_dictionary": [field.name for field in schema
+                                  if types.is_string(field.type)
+                                  or types.is_large_string(field.type)
+                                  or types.is_dictionary(field.type)],
+               "sorting_columns": pq.SortingColumn.from_ordering(
+                   schema, [(column, "ascending") for column in sort_by]),
+               "write_page_index": True}
+    if ENV.get("SUMMARY_COMPRESSION_LEVEL"):
+        options["compression_level"] = int(ENV["SUMMARY_COMPRESSION_LEVEL"])
+    if ENV.get("SUMMARY_ROW_GROUP_ROWS"):
+        options["row_group_size"] = int(ENV["SUMMARY_ROW_GROUP_ROWS"])
+        rows = min(rows, options["row_group_size"])
+    # Each row group has its own bloom filter, sized for its plants.
+    if ENV.get("SUMMARY_BLOOM_FILTERS", "true").lower() == "true":
+        options["bloom_filter_options"] = {column: {"ndv": max(rows, 1), "fpp": 0.05}
+                                           for column in SUMMARY_BLOOM_COLUMNS
+                                           if column in schema.names}
+    return options
+
+
+def get_dated_summary(data: DataFrame) -> DataFrame:
+    """Return summaries with their year, month and day replaced by their dt, as YYYY-MM-DD."""
+    return data.drop(columns=DATE_PARTS).assign(
+        dt=to_datetime(data[DATE_PARTS]).dt.strftime("%Y-%m-%d"))
+
+
+def get_undated_summary(data: DataFrame) -> DataFrame:
+    """Return summaries with their dt replaced by their year, month and day."""
+    days = to_datetime(data["dt"])
+    summary = data.drop(columns="dt")
+    for position, part in enumerate(DATE_PARTS, start=2):
+        summary.insert(position, part, getattr(days.dt, part).to_numpy())
+    return summary
+
+
+@traced("load.create_parquet")
+def create_parquet(data: DataFrame, basename_template: str = "summary-{i}",
+                   root_path: str = "/tmp/data/plant") -> bool:
+    """Save data as parquet files partitioned by dt, sorted by plant within each day."""
     logger = getLogger()
     logger.info("Storing local parquet files...")
-    datatable = Table.from_pandas(data)
+    datatable = Table.from_pandas(get_dated_summary(data)
+                                  .sort_values(SUMMARY_PARTITIONS + ["plant_id"], kind="stable"))
     if not datatable:
         logger.error("No data given.")
         return False
-    pq.write_to_dataset(datatable, root_path="/tmp/data/plant",
-                        partition_cols=["year", "month", "day"],
-                        basename_template="summary-{i}")
+    options = get_summary_write_options(datatable.drop_columns(SUMMARY_PARTITIONS).schema,
+                                        datatable.num_rows)
+    write_partitions(datatable, root_path, SUMMARY_PARTITIONS, basename_template, **options)
+    size = sum(len(body) for body in PENDING_UPLOADS.values()) if is_loaded_in_memory() \
+        else get_directory_size(root_path)
+    set_attributes(rows=datatable.num_rows, bytes=size)
     logger.info("Parquet created successfully.")
     return True
 
 
+def clear_data_directory():
+    """Remove any data directory, or parquet in memory, left behind by a failed run."""
+    PENDING_UPLOADS.clear()
+    if path.exists("/tmp/data"):
+        rmtree("/tmp/data")
+
+
+def get_raw_records(data: DataFrame) -> DataFrame:
+    """Return each reading once, sorted by plant and time, with its date parts."""
+    records = data[list(RAW_COLUMNS)].drop_duplicates()
+    records = records.sort_values(["plant_id", "recording_taken"], ignore_index=True)
+    return records.assign(year=records["recording_taken"].dt.year,
+                          month=records["recording_taken"].dt.month,
+                          day=records["recording_taken"].dt.day)
+
+
+@traced("load.create_raw_parquet")
+def create_raw_parquet(data: DataFrame, basename_template: str = "records-{i}") -> bool:
+    """Save raw readings as date partitioned parquet files, sorted for predicate pushdown.
+
+    Sorting by plant and time keeps each row group's min and max statistics narrow, so
+    queries filtering on plant_id or recording_taken can skip most row groups.
+    """
+    logger = getLogger()
+    logger.info("Storing local raw parquet files...")
+    records = get_raw_records(data)
+    if records.empty:
+        logger.error("No raw records given.")
+        return False
+    datatable = Table.from_pandas(records, preserve_index=False)
+    write_partitions(datatable, "/tmp/data/record", ["year", "month", "day"], basename_template,
+                     row_group_size=int(ENV.get("RAW_ROW_GROUP_ROWS", "100000")),
+                     sorting_columns=[pq.SortingColumn(0), pq.SortingColumn(1)],
+                     write_page_index=True)
+    set_attributes(rows=datatable.num_rows)
+    logger.info("Raw parquet created successfully.")
+    return True
+
+
+@traced("load.create_rollup_parquet")
+def create_rollup_parquet(rollup: DataFrame, level: str,
+                          basename_template: str = "rollup-{i}") -> bool:
+    """Save a rollup as parquet files, in its own table partitioned to suit its level."""
+    logger = getLogger()
+    logger.info("Storing local %s rollup parquet files...", level)
+    if rollup.empty:
+        logger.error("No %s rollup given.", level)
+        return False
+    datatable = Table.from_pandas(rollup, preserve_index=False)
+    write_partitions(datatable, f"/tmp/data/{ROLLUP_PREFIX}/plant_{level}",
+                     ROLLUP_PARTITIONS[level], basename_template)
+    set_attributes(level=level, rows=datatable.num_rows)
+    return True
+
+
+def get_partition_values(key: str) -> dict[str, int | str]:
+    """Return the partition columns and values in an S3 key, as numbers where they are."""
+    return dict((name, int(value) if value.isdigit() else value) for name, value in
+                (part.split("=", 1) for part in key.split("/") if "=" in part))
+
+
+def read_object(awsclient: client, key: str) -> DataFrame:
+    """Return the rows of a parquet object, with the partition values held in its key."""
+    body = awsclient.get_object(Bucket=ENV["S3_BUCKET"], Key=key)["Body"]
+    return pq.read_table(BytesIO(body.read())).to_pandas().assign(**get_partition_values(key))
+
+
+def read_objects(awsclient: client, prefix: str) -> DataFrame:
+    """Return the rows of every parquet object under prefix, with the partition values
+    held in their keys."""
+    tables = []
+    paginator = awsclient.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=ENV["S3_BUCKET"], Prefix=f"{prefix}/"):
+        for found in page.get("Contents", []):
+            tables.append(read_object(awsclient, found["Key"]))
+    set_attributes(files=len(tables))
+    return concat(tables) if tables else DataFrame()
+
+
+@traced("load.read_rollup")
+def read_rollup(awsclient: client, level: str, **partitions: int) -> DataFrame:
+    """Return the rollup rows stored in S3 under the given partition values."""
+    logger = getLogger()
+    prefix = "/".join([f"{ROLLUP_PREFIX}/plant_{level}",
+                       *(f"{name}={value}" for name, value in partitions.items())])
+    logger.info("Reading %s rollup from %s...", level, prefix)
+    set_attributes(level=level)
+    return read_objects(awsclient, prefix).reset_index(drop=True)
+
+
 def get_s3_client() -> client:
-    """Return client to S3 bucket."""
+    """Return client to S3 bucket, with a connection for every concurrent upload."""
     logger = getLogger()
     logger.info("Return S3 client")
+    settings = get_upload_settings()
+    connections = settings["workers"] * settings["config"].max_request_concurrency
     return client("s3",
                   aws_access_key_id=ENV["AWS_ACCESS_KEY_ID"],
-                  aws_secret_access_key=ENV["AWS_SECRET_ACCESS_KEY"])
+                  aws_secret_access_key=ENV["AWS_SECRET_ACCESS_KEY"],
+                  config=Config(max_pool_connections=connections, retries={"mode": "standard"}))
+
+
+def get_upload_settings() -> dict:
+    """Return how many files to upload at once, and how to split each into parts."""
+    part_size = int(ENV.get("UPLOAD_PART_MB", "8")) * MB
+    return {"workers": int(ENV.get("UPLOAD_WORKERS", str(UPLOAD_WORKERS))),
+            "config": TransferConfig(multipart_threshold=part_size,
+                                     multipart_chunksize=part_size,
+                                     max_concurrency=int(ENV.get("UPLOAD_PART_WORKERS", "4")))}
 
 
-def load_to_s3(awsclient: client) -> bool:
-    """Load objects to S3."""
+def get_s3_key(root: str, file: str) -> str:
+    """Return the S3 key for a file under the data directory.
+
+    Raw readings, rollups and staged summaries go under their own prefixes, so the
+    crawler keeps the summary table in `input/` to a single schema.
+    """
+    relative = root[10:]
+    top = relative.split("/")[0]
+    if top in (ROLLUP_PREFIX, STAGED_PREFIX):
+        return f"{relative}/{file}"
+    prefix = RAW_PREFIX if top == "record" else "input"
+    return f"{prefix}/{relative}/{file}"
+
+
+def get_uploads() -> list[tuple[str, bytes | str]]:
+    """Return the S3 key of each parquet object in memory or file under the data directory,
+    with its bytes or path."""
+    uploads = list(PENDING_UPLOADS.items())
+    PENDING_UPLOADS.clear()
+    for root, _, files in walk("/tmp/data"):
+        uploads.extend((get_s3_key(root, file), path.join(root, file)) for file in files)
+    return uploads
+
+
+def delete_stale_objects(awsclient: client, keys: list[str]) -> int:
+    """Delete the objects in the partitions of keys that are not among keys, returning how
+    many were deleted."""
+    logger = getLogger()
+    stale = []
+    paginator = awsclient.get_paginator("list_objects_v2")
+    for partition in sorted({key.rsplit("/", 1)[0] for key in keys}):
+        for page in paginator.paginate(Bucket=ENV["S3_BUCKET"], Prefix=f"{partition}/"):
+            stale.extend(found["Key"] for found in page.get("Contents", [])
+                         if found["Key"] not in keys and "/" not in
+                         found["Key"][len(partition) + 1:])
+    # S3 deletes at most 1000 objects per request.
+    for start in range(0, len(stale), 1000):
+        awsclient.delete_objects(Bucket=ENV["S3_BUCKET"], Delete={
+            "Objects": [{"Key": key} for key in stale[start:start + 1000]], "Quiet": True})
+    if stale:
+        logger.info("Deleted %d stale objects from replaced partitions.", len(stale))
+    return len(stale)
+
+
+@traced("load.load_to_s3")
+def load_to_s3(awsclient: client, workers: int = UPLOAD_WORKERS,
+               config: TransferConfig = None, replace: bool = False) -> bool:
+    """Load objects to S3, uploading workers files at once in parts split by config.
+
+    If replace, each partition written to is left holding only the objects just uploaded,
+    so a re-run replaces a partition rather than adding to it.
+    """
     logger = getLogger()
     logger.info("Starting load to S3...")
-    has_data = False
-    for root, _, files in walk("/tmp/data"):
-        if files:
-            has_data = True
-            for file in files:
-                full_path = path.join(root, file)
-                logger.info("Uploading file: %s", full_path)
-                awsclient.upload_file(full_path,
-                                      ENV["S3_BUCKET"], f"input/{root[10:]}/{file}")
-    return has_data
-
-
-def load_all(df: DataFrame):
-    """Load all data given to S3."""
+    config = config or TransferConfig()
+    uploads = get_uploads()
+    sent = []
+    retries = []
+
+    def count_retries(parsed=None, **_):
+        retries.append((parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0))
+
+    def upload(key: str, source: bytes | str):
+        logger.info("Uploading to: %s", key)
+        if isinstance(source, bytes):
+            awsclient.upload_fileobj(BytesIO(source), ENV["S3_BUCKET"], key,
+                                     Config=config, Callback=sent.append)
+        else:
+            awsclient.upload_file(source, ENV["S3_BUCKET"], key,
+                                  Config=config, Callback=sent.append)
+
+    awsclient.meta.events.register("after-call.s3", count_retries)
+    start = perf_counter()
+    try:
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            futures = [pool.submit(upload, key, source) for key, source in uploads]
+            for future in futures:
+                future.result()
+    finally:
+        awsclient.meta.events.unregister("after-call.s3", count_retries)
+    seconds = perf_counter() - start
+    sent_bytes = sum(sent)
+    logger.info("Uploaded %d files, %d bytes in %.2fs (%.1f MB/s), with %d retries.",
+                len(uploads), sent_bytes, seconds, sent_bytes / MB / max(seconds, 1e-9),
+                sum(retries))
+    set_attributes(files=len(uploads), bytes=sent_bytes, seconds=round(seconds, 3),
+                   retries=sum(retries))
+    # Stale objects are only deleted once every upload succeeded, so a partition is
+    # never left empty.
+    if replace and uploads:
+        set_attributes(deleted=delete_stale_objects(awsclient, [key for key, _ in uploads]))
+    return bool(uploads)
+
+
+def adopt_day(awsclient: client, dt: str):
+    """Stage a copy of the summaries of a day exported before staging, so they are kept
+    when the day is rebuilt from its staged summaries."""
+    paginator = awsclient.get_paginator("list_objects_v2")
+    prefix = f"input/plant/dt={dt}/"
+    for page in paginator.paginate(Bucket=ENV["S3_BUCKET"], Prefix=prefix):
+        for found in page.get("Contents", []):
+            name = found["Key"][len(prefix):]
+            if "/" not in name and not name.startswith(MERGED_TEMPLATE.format(i="")):
+                awsclient.copy_object(Bucket=ENV["S3_BUCKET"],
+                                      Key=f"{STAGED_PREFIX}/plant/dt={dt}/adopted-{name}",
+                                      CopySource={"Bucket": ENV["S3_BUCKET"],
+                                                  "Key": found["Key"]})
+
+
+@traced("load.merge_days")
+def merge_days(awsclient: client, days: list[str]) -> DataFrame:
+    """Return the summary of each day, merged from all of its staged summaries."""
+    logger = getLogger()
+    merged = []
+    for dt in days:
+        logger.info("Merging staged summaries of %s...", dt)
+        adopt_day(awsclient, dt)
+        staged = read_objects(awsclient, f"{STAGED_PREFIX}/plant/dt={dt}")
+        merged.append(merge_summaries(get_undated_summary(staged)))
+    set_attributes(days=len(days))
+    return concat(merged)
+
+
+def load_summary(df: DataFrame, export_id: int):
+    """Load an export's summaries to S3, merged into the days they belong to.
+
+    The summaries are staged under a name holding the export id, so a retried export
+    overwrites its own. Each day in `input/` is then rebuilt from all of its staged
+    summaries and replaced, so readings exported after their day are merged into it.
+    """
+    create_data_directory()
+    s3 = get_s3_client()
+    settings = get_upload_settings()
+    if create_parquet(df, f"summary-{export_id}-{{i}}", STAGED_ROOT):
+        load_to_s3(s3, **settings)
+        # Staged files are uploaded, so they aren't uploaded again with the merged days.
+        delete_data_directory()
+        create_data_directory()
+        days = sorted(get_dated_summary(df)["dt"].unique())
+        if create_parquet(merge_days(s3, days), MERGED_TEMPLATE):
+            load_to_s3(s3, **settings, replace=True)
+    delete_data_directory()
+
+
+def load_all(df: DataFrame, basename_template: str = "summary-{i}", replace: bool = True):
+    """Load all data given to S3, replacing the partitions written to if replace."""
     create_data_directory()
-    if create_parquet(df):
+    if create_parquet(df, basename_template):
         s3 = get_s3_client()
-        load_to_s3(s3)
+        load_to_s3(s3, **get_upload_settings(), replace=replace)
     delete_data_directory()
 
 
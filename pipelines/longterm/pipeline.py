@@ -1,13 +1,17 @@
 """Script for running the historic data pipeline."""
 
+from os import environ as ENV
 from sys import stdout
 from logging import getLogger, StreamHandler, INFO
 
 from dotenv import load_dotenv
+from pandas import DataFrame, concat
 
-from extract import get_data_from_rds
-from transform import get_summary_from_df
-from load import load_all
+from extract import (get_data_from_rds, stream_data_from_rds, clear_archive, fill_archive,
+                     get_summary_from_rds, get_export_batch_rows)
+from transform import (get_summary_from_df, get_summary_from_chunks, get_hourly_rollup,
+                       merge_rollup, get_complete_plants)
+from tracing import span
 
 
 def set_logger():
@@ -17,23 +21,217 @@ def set_logger():
     logger.addHandler(StreamHandler(stdout))
 
 
+def is_raw_exported() -> bool:
+    """Return true if raw readings are exported alongside the summary."""
+    return ENV.get("EXPORT_RAW", "false").lower() == "true"
+
+
+def export_raw(data: DataFrame, basename_template: str = "records-{i}"):
+    """Write raw readings as parquet, to be uploaded with the summary."""
+    with span("export_raw", rows=len(data)):
+        # pyarrow is only imported once there are raw readings to write.
+        from load import create_raw_parquet  # pylint: disable=import-outside-toplevel
+        create_raw_parquet(data, basename_template)
+
+
+def export_raw_chunks(chunks, export_id: int):
+    """Write each chunk of raw readings as parquet as it passes through."""
+    for number, chunk in enumerate(chunks):
+        export_raw(chunk, f"records-{export_id}-{number}-{{i}}")
+        yield chunk
+
+
+def is_sketched() -> bool:
+    """Return true if summaries include a quantile sketch of each reading."""
+    return ENV.get("EXPORT_SKETCHES", "false").lower() == "true"
+
+
+def is_rolled_up() -> bool:
+    """Return true if hourly, daily and monthly rollups are exported alongside the summary."""
+    return ENV.get("EXPORT_ROLLUPS", "false").lower() == "true"
+
+
+def export_rollups(hourly: DataFrame, basename_template: str = "rollup-{i}"):
+    """Write the hourly rollup, and the daily rollup merged from it, as parquet."""
+    with span("export_rollups", rows=len(hourly)):
+        from load import create_rollup_parquet  # pylint: disable=import-outside-toplevel
+        create_rollup_parquet(hourly, "hourly", basename_template)
+        create_rollup_parquet(merge_rollup(hourly, "daily"), "daily", basename_template)
+
+
+def rollup_chunks(chunks, hourly: list):
+    """Add the hourly rollup of each plant's raw readings to hourly, passing on the rows of
+    whole plants.
+
+    A plant's rows are rolled up once its last row has arrived, so each reading is held
+    until the plant's next one, even across chunks.
+    """
+    for plants in get_complete_plants(chunks):
+        hourly.append(get_hourly_rollup(plants))
+        yield plants
+
+
+def update_monthly_rollups(summary: DataFrame):
+    """Rebuild the monthly rollup of each month in the summary from its daily rollups in S3.
+
+    Runs after the daily rollups are uploaded, so the month includes every day and batch
+    exported so far, and replaces the month's previous rollup.
+    """
+    # pyarrow and boto3 are only imported once there are rollups to rebuild.
+    from load import (get_s3_client, read_rollup,  # pylint: disable=import-outside-toplevel
+                      create_rollup_parquet, create_data_directory, load_to_s3,
+                      delete_data_directory, get_upload_settings)
+    months = summary[["year", "month"]].drop_duplicates()
+    with span("update_monthly_rollups", months=len(months)):
+        s3 = get_s3_client()
+        create_data_directory()
+        for year, month in months.itertuples(index=False):
+            daily = read_rollup(s3, "daily", year=year, month=month)
+            if not daily.empty:
+                create_rollup_parquet(merge_rollup(daily, "monthly"), "monthly")
+        load_to_s3(s3, **get_upload_settings(), replace=True)
+        delete_data_directory()
+
+
+def is_compacted() -> bool:
+    """Return true if closed months of summaries are compacted after loading."""
+    return ENV.get("COMPACT_MONTHS", "false").lower() == "true"
+
+
+def compact_months():
+    """Compact the daily summaries of each closed month that changed into one object."""
+    with span("compact"):
+        # pyarrow and boto3 are only imported once there are summaries to compact.
+        from load import get_s3_client  # pylint: disable=import-outside-toplevel
+        from compact import compact_closed_months  # pylint: disable=import-outside-toplevel
+        compact_closed_months(get_s3_client())
+
+
+def clear_exports():
+    """Remove raw or rollup parquet left behind by a failed run, so it isn't uploaded twice."""
+    if is_raw_exported() or is_rolled_up():
+        from load import clear_data_directory  # pylint: disable=import-outside-toplevel
+        clear_data_directory()
+
+
+def warn_unexported():
+    """Warn that raw readings, rollups and sketches are not exported, as SQL summaries
+    don't fetch the readings."""
+    logger = getLogger()
+    if is_raw_exported():
+        logger.warning("Raw readings are not exported when summarising in SQL.")
+    if is_rolled_up():
+        logger.warning("Rollups are not exported when summarising in SQL.")
+    if is_sketched():
+        logger.warning("Sketches are not exported when summarising in SQL.")
+
+
+def check_received(data: DataFrame) -> bool:
+    """Return true if RDS returned data, raising if not unless exports are incremental."""
+    if not data.empty:
+        return True
+    if get_export_batch_rows() > 0:
+        return False
+    raise ValueError("Received no data from RDS.")
+
+
+def get_summary(export_id: int):
+    """Return the summary of closed days, extracting them all at once."""
+    logger = getLogger()
+    with span("extract") as stage:
+        data = get_data_from_rds()
+        stage.set(rows=len(data))
+    if not check_received(data):
+        return data
+    logger.info("Successfully received data from RDS!")
+
+    if is_raw_exported():
+        export_raw(data, f"records-{export_id}-{{i}}")
+    if is_rolled_up():
+        export_rollups(get_hourly_rollup(data), f"rollup-{export_id}-{{i}}")
+
+    with span("transform") as stage:
+        summary = get_summary_from_df(data, is_sketched())
+        stage.set(rows=len(summary))
+    return summary
+
+
+def is_aggregated_in_sql() -> bool:
+    """Return true if daily summaries are computed by the database."""
+    return ENV.get("AGGREGATE_IN_SQL", "false").lower() == "true"
+
+
+def get_server_summary():
+    """Return the summary of closed days, computed by the database."""
+    logger = getLogger()
+    warn_unexported()
+    with span("extract_summary") as stage:
+        summary = get_summary_from_rds()
+        stage.set(rows=len(summary))
+    if not check_received(summary):
+        return summary
+    logger.info("Successfully received summary from RDS!")
+    return summary
+
+
+def get_streamed_summary(chunk_rows: int, export_id: int):
+    """Return the summary of closed days, extracting and summarising chunk_rows at a time."""
+    logger = getLogger()
+    hourly = []
+    with span("extract_transform", chunk_rows=chunk_rows) as stage:
+        chunks = stream_data_from_rds(chunk_rows)
+        if is_raw_exported():
+            chunks = export_raw_chunks(chunks, export_id)
+        if is_rolled_up():
+            chunks = rollup_chunks(chunks, hourly)
+        summary = get_summary_from_chunks(chunks, is_sketched())
+        stage.set(summary_rows=len(summary))
+    if not check_received(summary):
+        return summary
+    if hourly:
+        export_rollups(concat(hourly, ignore_index=True), f"rollup-{export_id}-{{i}}")
+    logger.info("Successfully received and summarised data from RDS!")
+    return summary
+
+
 def run():
     """Run pipeline script."""
     logger = getLogger()
     logger.info("Attempting pipeline run...")
 
-    data = get_data_from_rds()
-    if data.empty:
-        raise ValueError("Received no data from RDS.")
-    logger.info("Successfully received data from RDS!")
+    with span("long_pipeline.run"):
+        clear_exports()
+        with span("fill_archive") as stage:
+            export_id = fill_archive()
+            stage.set(export_id=export_id)
+        chunk_rows = int(ENV.get("EXTRACT_CHUNK_ROWS", "0"))
+        if is_aggregated_in_sql():
+            summary = get_server_summary()
+        elif chunk_rows > 0:
+            summary = get_streamed_summary(chunk_rows, export_id)
+        else:
+            summary = get_summary(export_id)
+        if summary.empty and get_export_batch_rows() > 0:
+            # Incremental runs are frequent, so most find no newly closed day.
+            logger.info("No closed days left to export.")
+            return
+        if summary.empty:
+            raise ValueError("Found no summary data from returned raw data!")
+        logger.info("Successfully summarised data from RDS!")
 
-    summary = get_summary_from_df(data)
-    if summary.empty:
-        raise ValueError("Found no summary data from returned raw data!")
-    logger.info("Successfully summarised data from RDS!")
+        with span("load", rows=len(summary)):
+            # pyarrow and boto3 are only imported once there is a summary to load.
+            from load import load_summary  # pylint: disable=import-outside-toplevel
+            load_summary(summary, export_id)
+        if is_rolled_up() and not is_aggregated_in_sql():
+            update_monthly_rollups(summary)
+        if is_compacted():
+            compact_months()
+        logger.info("Successfully loaded data into S3!")
 
-    load_all(summary)
-    logger.info("Successfully loaded data into S3!")
+        with span("clear_archive"):
+            clear_archive()
+        logger.info("Successfully cleared exported data from RDS!")
 
 
 def lambda_handler(event, context):
@@ -0,0 +1,54 @@
+"""Moves daily summaries from year, month and day partitions to dt partitions.
+
+Run once after deploying the dt layout, as only dt partitions are projected into the
+summary table. Summary files do not hold their partition values, so each one is
+copied to its new key unchanged.
+"""
+
+from logging import getLogger, basicConfig, INFO
+from os import environ as ENV
+
+from boto3 import client
+from dotenv import load_dotenv
+
+from load import get_partition_values, get_s3_client
+
+SUMMARY_PREFIX = "input/plant"
+
+
+def get_dated_key(key: str) -> str | None:
+    """Return the dt partitioned key of a year, month and day partitioned summary key."""
+    partition = get_partition_values(key)
+    if not {"year", "month", "day"} <= partition.keys():
+        return None
+    day = f"{partition['year']:04d}-{partition['month']:02d}-{partition['day']:02d}"
+    return f"{SUMMARY_PREFIX}/dt={day}/{key.rsplit('/', 1)[-1]}"
+
+
+def migrate_summaries(awsclient: client) -> int:
+    """Move every year, month and day partitioned summary to its dt partition, returning
+    the number of summaries moved."""
+    logger = getLogger()
+    moved = []
+    paginator = awsclient.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=ENV["S3_BUCKET"], Prefix=f"{SUMMARY_PREFIX}/year="):
+        for found in page.get("Contents", []):
+            dated_key = get_dated_key(found["Key"])
+            if dated_key is None:
+                logger.warning("Skipping %s, which has no year, month and day.", found["Key"])
+                continue
+            awsclient.copy_object(Bucket=ENV["S3_BUCKET"], Key=dated_key,
+                                  CopySource={"Bucket": ENV["S3_BUCKET"], "Key": found["Key"]})
+            moved.append(found["Key"])
+    # Old keys are only deleted once every summary has a copy.
+    for start in range(0, len(moved), 1000):
+        awsclient.delete_objects(Bucket=ENV["S3_BUCKET"], Delete={
+            "Objects": [{"Key": key} for key in moved[start:start + 1000]], "Quiet": True})
+    logger.info("Moved %d summaries to dt partitions.", len(moved))
+    return len(moved)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    basicConfig(level=INFO)
+    migrate_summaries(get_s3_client())
@@ -0,0 +1,107 @@
+"""Module for mergeable quantile sketches of readings.
+
+Each sketch is a DDSketch: readings are counted in buckets whose bounds grow by a fixed
+ratio, so any quantile is answered to within RELATIVE_ACCURACY of a reading, and sketches
+of separate days merge by adding their bucket counts.
+"""
+
+from datetime import date
+from logging import getLogger
+
+from numpy import (ndarray, abs as absolute, argsort, bincount, ceil, clip, concatenate, cumsum,
+                   dtype, frombuffer, int64, isnan, log, nan, searchsorted, sign, unique, where,
+                   zeros)
+from pandas import DataFrame, to_datetime
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Readings closer to zero than this are counted as zero.
+MIN_VALUE = 1e-6
+# Each bucket is stored as its sign, its index and its count, in 7 bytes.
+SKETCH_DTYPE = dtype([("sign", "<i1"), ("key", "<i2"), ("count", "<u4")])
+KEY_OFFSET = 2 ** 15
+KEY_SPAN = 2 ** 16
+
+
+def get_buckets(values: ndarray) -> tuple[ndarray, ndarray]:
+    """Return the sign and bucket index of each reading."""
+    magnitudes = absolute(values)
+    signs = where(magnitudes < MIN_VALUE, 0, sign(values)).astype(int64)
+    keys = ceil(log(where(signs != 0, magnitudes, 1.0)) / log(GAMMA))
+    return signs, clip(keys, -KEY_OFFSET, KEY_OFFSET - 1).astype(int64)
+
+
+def get_bucket_codes(signs: ndarray, keys: ndarray) -> ndarray:
+    """Return a single code for each sign and bucket index."""
+    return (signs + 1) * KEY_SPAN + keys + KEY_OFFSET
+
+
+def to_sketch(codes: ndarray, counts: ndarray) -> bytes:
+    """Return the sketch holding the counts of each bucket code."""
+    buckets = zeros(len(codes), SKETCH_DTYPE)
+    buckets["sign"] = codes // KEY_SPAN - 1
+    buckets["key"] = codes % KEY_SPAN - KEY_OFFSET
+    buckets["count"] = counts
+    return buckets.tobytes()
+
+
+def get_group_sketches(values: ndarray, codes: ndarray, groups: int) -> list[bytes]:
+    """Return a sketch of each group's readings, from each reading's group."""
+    valid = ~isnan(values)
+    bucket_codes = get_bucket_codes(*get_buckets(values[valid]))
+    found, counts = unique(codes[valid] * 3 * KEY_SPAN + bucket_codes, return_counts=True)
+    bounds = searchsorted(found // (3 * KEY_SPAN), range(groups + 1))
+    found = found % (3 * KEY_SPAN)
+    return [to_sketch(found[start:end], counts[start:end])
+            for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def get_sketch(values: ndarray) -> bytes:
+    """Return a sketch of the readings."""
+    return get_group_sketches(values, zeros(len(values), int64), 1)[0]
+
+
+def merge_sketches(sketches) -> bytes:
+    """Return one sketch of the readings in all the sketches."""
+    # Days without readings have no sketch.
+    buckets = concatenate([frombuffer(sketch, SKETCH_DTYPE) for sketch in sketches
+                           if isinstance(sketch, bytes)] or [zeros(0, SKETCH_DTYPE)])
+    found, inverse = unique(get_bucket_codes(buckets["sign"].astype(int64),
+                                             buckets["key"].astype(int64)),
+                            return_inverse=True)
+    counts = bincount(inverse, weights=buckets["count"], minlength=len(found))
+    return to_sketch(found, counts.astype(int64))
+
+
+def get_sketch_quantiles(sketch: bytes, fractions: list[float]) -> list[float]:
+    """Return the readings at each fraction of the way through the sketch's readings."""
+    buckets = frombuffer(sketch, SKETCH_DTYPE)
+    if not buckets.size:
+        return [nan] * len(fractions)
+    # Each bucket's midpoint, relative to its bounds, is within RELATIVE_ACCURACY of them.
+    values = buckets["sign"] * 2 * GAMMA ** buckets["key"].astype(float) / (GAMMA + 1)
+    order = argsort(values)
+    ranks = cumsum(buckets["count"][order].astype(int64))
+    positions = searchsorted(ranks, [fraction * (ranks[-1] - 1) for fraction in fractions],
+                             side="right")
+    return values[order][positions].tolist()
+
+
+def get_percentiles(summary: DataFrame, column: str, fractions: dict[str, float],
+                    start: date = None, end: date = None) -> DataFrame:
+    """Return each plant's percentiles of a reading over the days from start to end.
+
+    Merges the `<column>_sketch` of each plant's daily summaries in the range, so the
+    readings themselves are not needed. Days are read from the summaries' `dt`, as
+    loaded to S3, or from their year, month and day.
+    """
+    logger = getLogger()
+    logger.info("Getting %s percentiles from daily sketches...", column)
+    days = to_datetime(summary["dt"] if "dt" in summary
+                       else summary[["year", "month", "day"]].astype(int64)).dt.date
+    in_range = days.ge(start or date.min) & days.le(end or date.max)
+    sketches = summary.loc[in_range, f"{column}_sketch"] \
+        .groupby("plant_id").agg(merge_sketches)
+    return DataFrame([get_sketch_quantiles(sketch, list(fractions.values()))
+                      for sketch in sketches],
+                     index=sketches.index, columns=list(fractions))
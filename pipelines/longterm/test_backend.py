@@ -0,0 +1,203 @@
+# pylint: skip-file
+"""Script to test extracting from the local SQLite backend."""
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytest
+from pandas.testing import assert_frame_equal
+from backend import get_sqlite_connection
+from extract import (move_closed_days, get_full_data, get_full_data_chunks,
+                     truncate_archive, archive_closed_days, get_daily_summary,
+                     get_dict_from_rows, get_dataframe_from_dict, get_records,
+                     get_dimensions, join_dimensions)
+from transform import get_summary_from_df, get_summary_from_chunks
+
+SCHEMA_FILE = Path(__file__).parents[2] / "architecture" / "database" / "schema_sqlite.sql"
+
+
+@pytest.fixture
+def sqlite_conn(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_BACKEND", "sqlite")
+    db_path = tmp_path / "plants.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+    conn.executescript("""
+        INSERT INTO origin_country (name) VALUES ('Albania');
+        INSERT INTO origin_city (name, country_id) VALUES ('Stammside', 1);
+        INSERT INTO botanist (name, email, phone)
+        VALUES ('Kenneth Buckridge', 'kenneth.buckridge@lnhm.co.uk', '+7639148635');
+        INSERT INTO plant (plant_id, name, city_id) VALUES (1, 'Venus flytrap', 1);
+        INSERT INTO botanist_plant (plant_id, botanist_id) VALUES (1, 1);
+    """)
+    now = datetime.utcnow().replace(microsecond=0)
+    conn.executemany("""INSERT INTO record
+                        (temperature, last_watered, soil_moisture, recording_taken, plant_id)
+                        VALUES (?, ?, ?, ?, 1);""",
+                     [(13.77, (now - timedelta(days=2)).isoformat(" "), 92.33,
+                       (now - timedelta(days=1)).isoformat(" ")),
+                      (14.1, (now - timedelta(days=1)).isoformat(" "), 91.5,
+                       now.isoformat(" "))])
+    conn.commit()
+    conn.close()
+    conn = get_sqlite_connection(str(db_path), "gamma")
+    yield conn
+    conn.close()
+
+
+def test_move_closed_days_keeps_today(sqlite_conn):
+    move_closed_days(sqlite_conn, "gamma")
+
+    with sqlite_conn.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM gamma.record;")
+        assert curs.fetchone()[0] == 1
+        curs.execute("SELECT COUNT(*) FROM gamma.record_archive;")
+        assert curs.fetchone()[0] == 1
+
+
+def test_get_full_data_reads_archive(sqlite_conn):
+    move_closed_days(sqlite_conn, "gamma")
+
+    rows = get_full_data(sqlite_conn, "gamma")
+
+    assert len(rows) == 1
+    assert rows[0][:3] == (1, "Venus flytrap", 13.77)
+    assert isinstance(rows[0][5], datetime)
+    assert rows[0][6:] == ("Stammside", "Albania", "Kenneth Buckridge")
+
+
+def test_get_full_data_chunks_matches_full_data(sqlite_conn):
+    move_closed_days(sqlite_conn, "gamma")
+    with sqlite_conn.cursor() as curs:
+        curs.execute("""INSERT INTO gamma.record_archive
+                        (temperature, last_watered, soil_moisture, recording_taken, plant_id)
+                        SELECT temperature + 1, last_watered, soil_moisture,
+                               recording_taken, plant_id
+                        FROM gamma.record_archive;""")
+        curs.commit()
+
+    chunks = list(get_full_data_chunks(sqlite_conn, "gamma", 1))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    assert sorted(row for chunk in chunks for row in chunk) \
+        == sorted(get_full_data(sqlite_conn, "gamma"))
+
+
+def test_truncate_archive_on_sqlite(sqlite_conn):
+    move_closed_days(sqlite_conn, "gamma")
+
+    truncate_archive(sqlite_conn, "gamma")
+
+    with sqlite_conn.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM gamma.record_archive;")
+        assert curs.fetchone()[0] == 0
+
+
+def add_closed_records(conn, count: int, days_ago: int = 1):
+    taken = (datetime.utcnow() - timedelta(days=days_ago)).replace(microsecond=0)
+    with conn.cursor() as curs:
+        curs.executemany("""INSERT INTO gamma.record
+                            (temperature, last_watered, soil_moisture, recording_taken, plant_id)
+                            VALUES (?, ?, ?, ?, 1);""",
+                         [(15.0 + index, taken, 90.0, taken) for index in range(count)])
+        curs.commit()
+
+
+def count_records(conn, table: str = "record") -> int:
+    with conn.cursor() as curs:
+        curs.execute(f"SELECT COUNT(*) FROM gamma.{table};")
+        return curs.fetchone()[0]
+
+
+def test_move_closed_days_never_splits_a_day(sqlite_conn):
+    add_closed_records(sqlite_conn, 3, days_ago=3)
+    add_closed_records(sqlite_conn, 2, days_ago=2)
+
+    move_closed_days(sqlite_conn, "gamma", 2)
+
+    assert count_records(sqlite_conn, "record_archive") == 3
+    assert count_records(sqlite_conn) == 4
+
+
+def test_move_closed_days_takes_whole_days_that_fit(sqlite_conn):
+    add_closed_records(sqlite_conn, 3, days_ago=3)
+    add_closed_records(sqlite_conn, 2, days_ago=2)
+
+    move_closed_days(sqlite_conn, "gamma", 5)
+
+    assert count_records(sqlite_conn, "record_archive") == 5
+    assert count_records(sqlite_conn) == 2
+
+
+def test_move_closed_days_waits_for_day_close(sqlite_conn, monkeypatch):
+    monkeypatch.setenv("DAY_CLOSE_MINUTES", str(2 * 24 * 60))
+
+    move_closed_days(sqlite_conn, "gamma")
+
+    assert count_records(sqlite_conn, "record_archive") == 0
+
+
+def test_archive_closed_days_keeps_unexported_archive(sqlite_conn, monkeypatch):
+    monkeypatch.setenv("EXPORT_BATCH_ROWS", "1000")
+    add_closed_records(sqlite_conn, 2, days_ago=3)
+    move_closed_days(sqlite_conn, "gamma", 1)
+
+    archive_closed_days(sqlite_conn, "gamma")
+
+    assert count_records(sqlite_conn, "record_archive") == 2
+    assert count_records(sqlite_conn) == 2
+
+
+def add_second_plant_and_botanist(sqlite_conn):
+    with sqlite_conn.cursor() as curs:
+        curs.execute("INSERT INTO gamma.plant (plant_id, name, city_id) VALUES (2, 'Sundew', 1);")
+        curs.execute("""INSERT INTO gamma.botanist (name, email, phone)
+                        VALUES ('Gertrude Jekyll', 'gertrude.jekyll@lnhm.co.uk', '+7639148636');""")
+        curs.executemany("INSERT INTO gamma.botanist_plant (plant_id, botanist_id) VALUES (?, ?);",
+                         [(1, 2), (2, 2)])
+        day = datetime(2025, 6, 1, 9)
+        curs.executemany("""INSERT INTO gamma.record
+                            (temperature, last_watered, soil_moisture, recording_taken, plant_id)
+                            VALUES (?, ?, ?, ?, ?);""",
+                         [(temperature, day, moisture, day + timedelta(minutes=minute), plant)
+                          for plant, temperature, moisture, minute in [
+                              (1, 10.5, 80.0, 0), (1, 12.25, None, 1), (1, 11.0, 70.5, 2),
+                              (1, 30.0, 65.0, 1440), (2, 15.0, None, 0), (2, None, None, 1),
+                              (2, 16.0, 90.0, 2), (2, 18.5, 95.5, 3)]])
+        curs.commit()
+    move_closed_days(sqlite_conn, "gamma")
+
+
+def test_get_daily_summary_matches_pandas(sqlite_conn):
+    add_second_plant_and_botanist(sqlite_conn)
+    raw = get_dataframe_from_dict(get_dict_from_rows(get_full_data(sqlite_conn, "gamma")))
+
+    actual = get_daily_summary(sqlite_conn, "gamma")
+
+    assert len(actual) == 7
+    assert_frame_equal(actual, get_summary_from_df(raw))
+
+
+def as_strings(summary):
+    return summary.astype({"plant_name": object, "botanist": object})
+
+
+def test_join_dimensions_matches_full_data(sqlite_conn):
+    add_second_plant_and_botanist(sqlite_conn)
+    wide = get_dataframe_from_dict(get_dict_from_rows(get_full_data(sqlite_conn, "gamma")))
+
+    narrow = join_dimensions(get_records(sqlite_conn, "gamma"),
+                             get_dimensions(sqlite_conn, "gamma"))
+
+    assert narrow["botanist"].dtype == "category"
+    assert_frame_equal(as_strings(get_summary_from_df(narrow)), get_summary_from_df(wide))
+
+
+def test_join_dimensions_in_chunks_matches_full_data(sqlite_conn):
+    add_second_plant_and_botanist(sqlite_conn)
+    wide = get_dataframe_from_dict(get_dict_from_rows(get_full_data(sqlite_conn, "gamma")))
+    dimensions = get_dimensions(sqlite_conn, "gamma")
+
+    chunks = (join_dimensions(rows, dimensions)
+              for rows in get_full_data_chunks(sqlite_conn, "gamma", 3, narrow=True))
+
+    assert_frame_equal(as_strings(get_summary_from_chunks(chunks)), get_summary_from_df(wide))
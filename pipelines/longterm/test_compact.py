@@ -0,0 +1,58 @@
+# pylint: skip-file
+"""Tests for long term compaction module."""
+
+from datetime import date
+from io import BytesIO
+from json import loads
+
+from pandas import DataFrame
+from pyarrow import Table, parquet as pq
+
+from compact import MANIFEST_KEY, compact_closed_months
+
+
+def add_day(s3, day: date, counts: list[int], name: str = "summary-0"):
+    summary = DataFrame({"plant_id": [2, 1][:len(counts)], "count": counts}).set_index("plant_id")
+    buffer = BytesIO()
+    pq.write_table(Table.from_pandas(summary), buffer)
+    s3.objects[f"input/plant/dt={day.isoformat()}/{name}"] = buffer.getvalue()
+
+
+def read_compacted(s3, month: str) -> DataFrame:
+    return pq.read_table(BytesIO(
+        s3.objects[f"compact/summary/{month}/summary-compact-0"])).to_pandas()
+
+
+def test_compact_closed_months(fake_s3):
+    """Test each closed month's days become one object sorted by dt and plant, listed in
+    the manifest, while the open month is left alone."""
+    add_day(fake_s3, date(2025, 5, 31), [60])
+    add_day(fake_s3, date(2025, 6, 2), [58, 59])
+    add_day(fake_s3, date(2025, 6, 1), [57, 56])
+    add_day(fake_s3, date(2025, 7, 1), [55])
+
+    assert compact_closed_months(fake_s3, date(2025, 7, 2)) == ["year=2025/month=5",
+                                                                "year=2025/month=6"]
+
+    june = read_compacted(fake_s3, "year=2025/month=6")
+    assert june[["dt", "plant_id", "count"]].values.tolist() == [
+        ["2025-06-01", 1, 56], ["2025-06-01", 2, 57],
+        ["2025-06-02", 1, 59], ["2025-06-02", 2, 58]]
+    manifest = loads(fake_s3.objects[MANIFEST_KEY])
+    assert sorted(manifest["months"]) == ["year=2025/month=5", "year=2025/month=6"]
+    assert manifest["months"]["year=2025/month=6"]["rows"] == 4
+    assert len(manifest["months"]["year=2025/month=6"]["sources"]) == 2
+    assert "compact/summary/year=2025/month=7/summary-compact-0" not in fake_s3.objects
+
+
+def test_compact_closed_months_only_rebuilds_changed_months(fake_s3):
+    """Test compacting again does nothing until a month's days change."""
+    add_day(fake_s3, date(2025, 5, 31), [60])
+    add_day(fake_s3, date(2025, 6, 1), [57])
+    compact_closed_months(fake_s3, date(2025, 7, 2))
+
+    assert compact_closed_months(fake_s3, date(2025, 7, 2)) == []
+
+    add_day(fake_s3, date(2025, 6, 1), [50], "summary-11-20-0")
+    assert compact_closed_months(fake_s3, date(2025, 7, 2)) == ["year=2025/month=6"]
+    assert read_compacted(fake_s3, "year=2025/month=6")["count"].tolist() == [57, 50]
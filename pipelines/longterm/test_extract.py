@@ -1,15 +1,16 @@
 # pylint: skip-file
 """Tests for extract module."""
 
+from logging import INFO
 from os import environ
 
 from pandas import DataFrame
 from pytest import mark, raises
 from unittest.mock import MagicMock, patch
 
-from extract import (get_dataframe_from_dict, get_dict_from_rows,
-                     get_full_data, get_schema,
-                     truncate_record)
+from extract import (get_closed_partitions, get_dataframe_from_dict,
+                     get_dict_from_rows, get_full_data, get_schema,
+                     switch_out_partitions, truncate_archive)
 
 
 def test_get_dataframe_from_dict(test_dictionary, test_sample_dataframe):
@@ -33,6 +34,17 @@ def test_get_dict_from_rows(case, test_bad_rows, test_good_rows, test_empty_dict
     assert actual == expected
 
 
+def test_get_dict_from_rows_drops_only_malformed(test_good_rows, test_bad_rows, test_dictionary,
+                                                  caplog):
+    """Test get dictionary from rows keeps well formed rows and logs a summary, not each row."""
+    caplog.set_level(INFO)
+    actual = get_dict_from_rows(test_good_rows + test_bad_rows)
+
+    assert actual == test_dictionary
+    assert "Dropping 3 malformed rows" in caplog.text
+    assert len(caplog.records) == 3
+
+
 @mark.parametrize("sql_response", ("some data", ""))
 def test_get_full_data(sql_response):
     """Test get full data handles expected cases correctly."""
@@ -60,14 +72,54 @@ def test_invalid_schema_identifier_raises():
             get_schema()
 
 
-def test_truncate_record():
-    """Tests that truncate record sends ecpected request."""
+def test_truncate_archive():
+    """Tests that truncate archive sends expected request."""
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
-    truncate_record(mock_conn, "test_schema")
+    truncate_archive(mock_conn, "test_schema")
 
     mock_cursor.execute.assert_called_once_with(
-        "TRUNCATE TABLE test_schema.record;")
+        "TRUNCATE TABLE test_schema.record_archive;")
+    mock_cursor.commit.assert_called_once()
+
+
+def test_get_closed_partitions():
+    """Tests that closed partition numbers are returned from the query."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, 10), (2, 20)]
+
+    actual = get_closed_partitions(mock_conn, "test_schema")
+
+    assert actual == [1, 2]
+    assert "test_schema.record_archive" in mock_cursor.execute.call_args.args[0]
+
+
+@mark.parametrize("batch_rows, expected", ((25, [1]), (30, [1, 2]), (5, [1])))
+def test_get_closed_partitions_whole_days(batch_rows, expected):
+    """Tests that only whole days fitting in the batch are returned, and at least one."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [(1, 10), (2, 20), (3, 5)]
+
+    assert get_closed_partitions(mock_conn, "test_schema", batch_rows) == expected
+
+
+def test_switch_out_partitions():
+    """Tests that each partition is switched to the same archive partition."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    switch_out_partitions(mock_conn, "test_schema", [1, 2])
+
+    queries = [" ".join(call.args[0].split())
+               for call in mock_cursor.execute.call_args_list]
+    assert queries == [
+        "ALTER TABLE test_schema.record SWITCH PARTITION 1 TO test_schema.record_archive PARTITION 1;",
+        "ALTER TABLE test_schema.record SWITCH PARTITION 2 TO test_schema.record_archive PARTITION 2;"]
     mock_cursor.commit.assert_called_once()
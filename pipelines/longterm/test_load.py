@@ -1,13 +1,35 @@
 # pylint: skip-file
 """Tests for long term load module."""
 
+from logging import INFO
+from os import walk
 from unittest.mock import Mock, patch, call
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from boto3.s3.transfer import TransferConfig
+from botocore.hooks import HierarchicalEmitter
+from pandas import DataFrame, concat
+from pyarrow import Table, parquet as pq
+from transform import get_summary_from_df
 from pytest import mark
 
-from load import (create_data_directory,
+from load import (PENDING_UPLOADS,
+                  clear_data_directory,
+                  create_data_directory,
                   create_parquet,
+                  create_raw_parquet,
+                  create_rollup_parquet,
                   delete_data_directory,
-                  load_to_s3)
+                  get_partition_values,
+                  get_raw_records,
+                  get_s3_key,
+                  delete_stale_objects,
+                  get_summary_write_options,
+                  load_summary,
+                  load_to_s3,
+                  read_object,
+                  read_rollup)
 
 
 @mark.parametrize("exists", (True, False))
@@ -40,7 +62,8 @@ def test_create_parquet():
     """Test that create parquet attempts to make parquet files."""
     mock_dataframe = Mock()
     mock_table_instance = Mock()
-    with patch("load.Table") as mock_table:
+    with patch("load.Table") as mock_table, patch("load.get_summary_write_options"), \
+            patch("load.get_dated_summary"):
         with patch("load.pq.write_to_dataset") as mock_write:
             mock_table.from_pandas.return_value = mock_table_instance
             actual = create_parquet(mock_dataframe)
@@ -61,3 +84,285 @@ def test_load_s3(directory):
             mock_walk.return_value = directory
             load_to_s3(mock_client)
             mock_client.upload_file.assert_called()
+
+
+@mark.parametrize("root, key", (("/tmp/data/plant/dt=2025-06-01", "input/plant/dt=2025-06-01/file"),
+                                ("/tmp/data/record/year=2025", "raw/record/year=2025/file"),
+                                ("/tmp/data/rollup/plant_daily/year=2025",
+                                 "rollup/plant_daily/year=2025/file")))
+def test_get_s3_key(root, key):
+    """Test raw readings and rollups are uploaded outside the summary table's prefix."""
+    assert get_s3_key(root, "file") == key
+
+
+def get_raw_data(plants: int, readings: int) -> DataFrame:
+    start = datetime(2025, 6, 1)
+    rows = [{"plant_id": plant, "plant_name": f"plant {plant}", "temperature": 20.0 + minute,
+             "last_watered": start, "soil_moisture": 50.0, "city": "Seattle", "country": "USA",
+             "botanist": botanist, "recording_taken": start + timedelta(minutes=minute)}
+            for minute in reversed(range(readings)) for plant in reversed(range(plants))
+            for botanist in ("Alice", "Bob")]
+    return DataFrame(rows)
+
+
+def test_get_raw_records_once_per_reading_in_order():
+    """Test raw records drop the botanist fan out and are sorted by plant and time."""
+    actual = get_raw_records(get_raw_data(3, 4))
+    assert len(actual) == 12
+    assert "botanist" not in actual.columns
+    assert actual["plant_id"].is_monotonic_increasing
+    assert actual.groupby("plant_id")["recording_taken"].apply(
+        lambda times: times.is_monotonic_increasing).all()
+    assert actual[["year", "month", "day"]].drop_duplicates().values.tolist() == [[2025, 6, 1]]
+
+
+def test_create_raw_parquet_row_groups(tmp_path, monkeypatch):
+    """Test raw parquet is written in row groups with narrow plant statistics."""
+    monkeypatch.setenv("RAW_ROW_GROUP_ROWS", "10")
+    write = pq.write_to_dataset
+    with patch("load.pq.write_to_dataset",
+               side_effect=lambda table, root_path, **kwargs:
+               write(table, root_path=str(tmp_path), **kwargs)):
+        assert create_raw_parquet(get_raw_data(5, 10), "records-{i}")
+
+    metadata = pq.ParquetFile(tmp_path / "year=2025" / "month=6" / "day=1" /
+                              "records-0").metadata
+    assert metadata.num_rows == 50
+    assert metadata.num_row_groups == 5
+    for group in range(metadata.num_row_groups):
+        statistics = metadata.row_group(group).column(0).statistics
+        assert statistics.min == statistics.max == group
+
+
+@mark.parametrize("key, expected", (
+    ("rollup/plant_daily/year=2025/month=6/day=1/rollup-0", {"year": 2025, "month": 6, "day": 1}),
+    ("input/plant/dt=2025-06-01/summary-0", {"dt": "2025-06-01"})))
+def test_get_partition_values(key, expected):
+    """Test numeric partition values are read as numbers and dates as text."""
+    assert get_partition_values(key) == expected
+
+
+@mark.parametrize("level, partitions", (("hourly", ["year=2025", "month=6", "day=1"]),
+                                        ("monthly", ["year=2025", "month=6"])))
+def test_create_rollup_parquet_partitions(tmp_path, level, partitions):
+    """Test each rollup level is written to its own table, partitioned to suit it."""
+    rollup = DataFrame({"plant_id": [1, 2], "year": [2025, 2025], "month": [6, 6],
+                        "day": [1, 1], "hour": [9, 9], "count": [60, 58]})
+    write = pq.write_to_dataset
+    with patch("load.pq.write_to_dataset",
+               side_effect=lambda table, root_path, **kwargs:
+               write(table, root_path=str(tmp_path / root_path[10:]), **kwargs)):
+        assert create_rollup_parquet(rollup, level)
+
+    written = tmp_path.joinpath("rollup", f"plant_{level}", *partitions, "rollup-0")
+    assert pq.read_table(written).num_rows == 2
+
+
+def test_create_rollup_parquet_empty():
+    """Test an empty rollup is not written."""
+    with patch("load.pq.write_to_dataset") as mock_write:
+        assert not create_rollup_parquet(DataFrame(), "daily")
+    mock_write.assert_not_called()
+
+
+def test_read_rollup_adds_partition_values(monkeypatch):
+    """Test rollups read from S3 get back the partition columns held in their keys."""
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    buffer = BytesIO()
+    pq.write_table(Table.from_pandas(DataFrame({"plant_id": [1], "count": [60]})), buffer)
+    mock_client = Mock()
+    mock_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "rollup/plant_daily/year=2025/month=6/day=1/rollup-0"},
+                      {"Key": "rollup/plant_daily/year=2025/month=6/day=2/rollup-0"}]}]
+    mock_client.get_object.side_effect = lambda **_: {"Body": BytesIO(buffer.getvalue())}
+
+    actual = read_rollup(mock_client, "daily", year=2025, month=6)
+
+    mock_client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket="bucket", Prefix="rollup/plant_daily/year=2025/month=6/")
+    assert actual[["year", "month", "day", "count"]].values.tolist() == [[2025, 6, 1, 60],
+                                                                         [2025, 6, 2, 60]]
+
+
+def test_create_parquet_in_memory(monkeypatch):
+    """Test parquet is built in memory under each partition's S3 key, without /tmp."""
+    monkeypatch.setenv("LOAD_IN_MEMORY", "true")
+    summary = DataFrame({"plant_id": [1, 2, 1], "count": [60, 58, 59], "year": [2025] * 3,
+                         "month": [6] * 3, "day": [1, 1, 2]}).set_index("plant_id")
+    with patch("load.pq.write_to_dataset") as mock_write, patch("load.mkdir") as mock_mkdir:
+        create_data_directory()
+        assert create_parquet(summary, "summary-7-9-{i}")
+    mock_write.assert_not_called()
+    mock_mkdir.assert_not_called()
+
+    assert sorted(PENDING_UPLOADS) == ["input/plant/dt=2025-06-01/summary-7-9-0",
+                                       "input/plant/dt=2025-06-02/summary-7-9-0"]
+    day = pq.read_table(BytesIO(PENDING_UPLOADS.pop(
+        "input/plant/dt=2025-06-01/summary-7-9-0"))).to_pandas()
+    assert day.index.tolist() == [1, 2]
+    assert day.columns.tolist() == ["count"]
+    clear_data_directory()
+    assert not PENDING_UPLOADS
+
+
+def test_load_to_s3_uploads_from_memory(monkeypatch):
+    """Test parquet built in memory is uploaded straight from memory, then dropped."""
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    PENDING_UPLOADS["input/plant/year=2025/month=6/day=1/summary-0"] = b"parquet"
+    mock_client = Mock()
+    with patch("load.walk", return_value=[]):
+        assert load_to_s3(mock_client)
+    body, bucket, key = mock_client.upload_fileobj.call_args.args
+    assert body.read() == b"parquet"
+    assert (bucket, key) == ("bucket", "input/plant/year=2025/month=6/day=1/summary-0")
+    mock_client.upload_file.assert_not_called()
+    assert not PENDING_UPLOADS
+
+
+class RetriedClient:
+    """S3 client whose uploads each took two retries."""
+
+    def __init__(self):
+        self.meta = Mock(events=HierarchicalEmitter())
+        self.keys = []
+
+    def upload_file(self, filename, bucket, key, Config, Callback):
+        with open(filename, "rb") as file:
+            Callback(len(file.read()))
+        self.meta.events.emit("after-call.s3.PutObject",
+                              parsed={"ResponseMetadata": {"RetryAttempts": 2}})
+        self.keys.append(key)
+
+
+def test_load_to_s3_reports_throughput_and_retries(tmp_path, monkeypatch, caplog):
+    """Test every file is uploaded by the thread pool, counting bytes sent and retries."""
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    caplog.set_level(INFO)
+    for day in (1, 2, 3):
+        partition = tmp_path / "plant" / f"day={day}"
+        partition.mkdir(parents=True)
+        (partition / "summary-0").write_bytes(b"x" * 10 * day)
+    s3 = RetriedClient()
+
+    with patch("load.walk", side_effect=lambda _: walk(tmp_path)), \
+            patch("load.get_s3_key", side_effect=lambda root, file: f"{root[-5:]}/{file}"):
+        assert load_to_s3(s3, workers=2, config=TransferConfig())
+
+    assert sorted(s3.keys) == ["day=1/summary-0", "day=2/summary-0", "day=3/summary-0"]
+    assert "Uploaded 3 files, 60 bytes" in caplog.text
+    assert "with 6 retries." in caplog.text
+    assert not s3.meta.events.emit("after-call.s3.PutObject", parsed={})
+
+
+def test_load_to_s3_replaces_partitions(fake_s3):
+    """Test replacing leaves each partition written to with only the objects just uploaded."""
+    fake_s3.objects.update({"input/plant/year=2025/month=6/day=1/summary-0": b"old",
+                            "input/plant/year=2025/month=6/day=1/summary-3-9-0": b"old",
+                            "input/plant/year=2025/month=6/day=10/summary-0": b"kept"})
+    PENDING_UPLOADS["input/plant/year=2025/month=6/day=1/summary-0"] = b"new"
+
+    with patch("load.walk", return_value=[]):
+        assert load_to_s3(fake_s3, replace=True)
+
+    assert fake_s3.objects == {"input/plant/year=2025/month=6/day=1/summary-0": b"new",
+                               "input/plant/year=2025/month=6/day=10/summary-0": b"kept"}
+
+
+def test_load_to_s3_adds_without_replacing(fake_s3):
+    """Test partitions keep their other objects unless replaced."""
+    fake_s3.objects["input/plant/year=2025/month=6/day=1/summary-3-9-0"] = b"old"
+    PENDING_UPLOADS["input/plant/year=2025/month=6/day=1/summary-10-12-0"] = b"new"
+
+    with patch("load.walk", return_value=[]):
+        load_to_s3(fake_s3)
+
+    assert len(fake_s3.objects) == 2
+
+
+def test_delete_stale_objects_in_batches(fake_s3):
+    """Test stale objects are deleted at most 1000 per request."""
+    fake_s3.objects.update({f"raw/record/year=2025/month=6/day=1/records-{number}-0": b""
+                            for number in range(1500)})
+    fake_s3.delete_objects = Mock(wraps=fake_s3.delete_objects)
+
+    assert delete_stale_objects(fake_s3, ["raw/record/year=2025/month=6/day=1/records-0-0"]) == 1499
+    assert [len(batch.kwargs["Delete"]["Objects"])
+            for batch in fake_s3.delete_objects.call_args_list] == [1000, 499]
+
+
+def test_get_summary_write_options(monkeypatch):
+    """Test summaries are sorted by plant and compressed with zstd, with bloom filters on
+    plant_id and plant_name and dictionaries only for text."""
+    schema = Table.from_pandas(DataFrame({"plant_id": [1], "plant_name": ["Fern"],
+                                          "count": [60]}), preserve_index=False).schema
+    options = get_summary_write_options(schema, 700)
+    assert options["compression"] == "zstd"
+    assert options["use_dictionary"] == ["plant_name"]
+    assert options["sorting_columns"] == (pq.SortingColumn(0),)
+    assert options["write_page_index"]
+    assert options["bloom_filter_options"] == {"plant_id": {"ndv": 700, "fpp": 0.05},
+                                               "plant_name": {"ndv": 700, "fpp": 0.05}}
+
+    monkeypatch.setenv("SUMMARY_COMPRESSION", "gzip")
+    monkeypatch.setenv("SUMMARY_ROW_GROUP_ROWS", "100")
+    options = get_summary_write_options(schema, 700)
+    assert options["compression"] == "gzip"
+    assert options["row_group_size"] == 100
+    assert options["bloom_filter_options"]["plant_id"]["ndv"] == 100
+
+    monkeypatch.setenv("SUMMARY_BLOOM_FILTERS", "false")
+    assert "bloom_filter_options" not in get_summary_write_options(schema, 700)
+
+
+def test_create_parquet_layout(tmp_path):
+    """Test each day's summary file is sorted by plant, with the tuned layout."""
+    summary = DataFrame({"plant_id": [3, 1, 2, 1],
+                         "plant_name": ["Palm", "Fern", "Cactus", "Fern"],
+                         "count": [60, 58, 59, 57], "year": [2025] * 4, "month": [6] * 4,
+                         "day": [1, 1, 1, 2]}).set_index("plant_id")
+    write = pq.write_to_dataset
+    with patch("load.pq.write_to_dataset",
+               side_effect=lambda table, root_path, **kwargs:
+               write(table, root_path=str(tmp_path / root_path[10:]), **kwargs)):
+        assert create_parquet(summary)
+
+    written = pq.ParquetFile(tmp_path / "plant" / "dt=2025-06-01" / "summary-0")
+    assert written.read().column("plant_id").to_pylist() == [1, 2, 3]
+    row_group = written.metadata.row_group(0)
+    assert row_group.sorting_columns == (pq.SortingColumn(
+        written.schema_arrow.get_field_index("plant_id")),)
+    assert row_group.column(0).compression == "ZSTD"
+    assert row_group.column(0).to_dict()["bloom_filter_offset"] is not None
+
+
+def get_day_summary(day: int, temperatures: list[float]) -> DataFrame:
+    start = datetime(2025, 6, day, 9)
+    return get_summary_from_df(DataFrame({
+        "plant_id": 1, "plant_name": "Fern", "botanist": "Alice",
+        "temperature": temperatures, "soil_moisture": 50.0,
+        "recording_taken": [start + timedelta(minutes=minute)
+                            for minute in range(len(temperatures))]}))
+
+
+def test_load_summary_merges_late_readings_into_their_day(fake_s3, monkeypatch):
+    """Test an export is staged under its id, and each day it touches is rebuilt from all
+    its staged summaries, adopting the day's summary from before staging."""
+    monkeypatch.setenv("LOAD_IN_MEMORY", "true")
+    create_parquet(get_day_summary(1, [10.0, 20.0]))
+    fake_s3.objects.update(PENDING_UPLOADS)
+    PENDING_UPLOADS.clear()
+    late = concat([get_day_summary(1, [30.0]), get_day_summary(2, [15.0])])
+
+    with patch("load.get_s3_client", return_value=fake_s3):
+        load_summary(late, 42)
+        load_summary(late, 42)
+
+    assert sorted(fake_s3.objects) == ["export/plant/dt=2025-06-01/adopted-summary-0",
+                                       "export/plant/dt=2025-06-01/summary-42-0",
+                                       "export/plant/dt=2025-06-02/summary-42-0",
+                                       "input/plant/dt=2025-06-01/summary-day-0",
+                                       "input/plant/dt=2025-06-02/summary-day-0"]
+    day = read_object(fake_s3, "input/plant/dt=2025-06-01/summary-day-0")
+    assert day["count"].tolist() == [3]
+    assert day["temperature_max"].tolist() == [30.0]
+    assert day["temperature_mean"].tolist() == [20.0]
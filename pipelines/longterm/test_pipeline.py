@@ -1,13 +1,24 @@
 # pylint: skip-file
 """Module for testing pipeline script."""
 
+from datetime import datetime, timedelta
 from logging import getLogger, StreamHandler, INFO
 from sys import stdout
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 
-from pytest import mark, raises
+from pandas import DataFrame, concat
+from pandas.testing import assert_frame_equal
+from pytest import fixture, mark, raises
 
-from pipeline import run
+from pipeline import run, rollup_chunks, update_monthly_rollups
+from transform import get_hourly_rollup
+
+
+@fixture(autouse=True)
+def mock_fill_archive():
+    """Archive nothing, naming the export 42."""
+    with patch('pipeline.fill_archive', return_value=42) as mock_fill:
+        yield mock_fill
 
 
 def test_run_valid(caplog):
@@ -27,15 +38,18 @@ def test_run_valid(caplog):
 
     with patch('pipeline.get_data_from_rds', return_value=mock_data), \
             patch('pipeline.get_summary_from_df', return_value=mock_summary), \
-            patch('pipeline.load_all') as mock_load:
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.clear_archive') as mock_clear:
         run()
 
-        mock_load.assert_called_once_with(mock_summary)
+        mock_load.assert_called_once_with(mock_summary, 42)
+        mock_clear.assert_called_once()
         out = caplog.text
         assert "Attempting pipeline run..." in out
         assert "Successfully received data from RDS!" in out
         assert "Successfully summarised data from RDS!" in out
         assert "Successfully loaded data into S3!" in out
+        assert "Successfully cleared exported data from RDS!" in out
 
 
 def test_run_rds_empty():
@@ -45,10 +59,12 @@ def test_run_rds_empty():
 
     with patch('pipeline.get_data_from_rds', return_value=mock_data), \
             patch('pipeline.get_summary_from_df'), \
-            patch('pipeline.load_all'):
+            patch('load.load_summary'), \
+            patch('pipeline.clear_archive') as mock_clear:
 
         with raises(ValueError, match="Received no data from RDS."):
             run()
+        mock_clear.assert_not_called()
 
 
 def test_run_no_summary_data():
@@ -61,7 +77,198 @@ def test_run_no_summary_data():
 
     with patch('pipeline.get_data_from_rds', return_value=mock_data), \
             patch('pipeline.get_summary_from_df', return_value=mock_summary), \
-            patch('pipeline.load_all'):
+            patch('load.load_summary'), \
+            patch('pipeline.clear_archive') as mock_clear:
 
         with raises(ValueError, match="Found no summary data from returned raw data!"):
             run()
+        mock_clear.assert_not_called()
+
+
+def test_run_streams_chunks(monkeypatch):
+    """Test run summarises streamed chunks when EXTRACT_CHUNK_ROWS is set."""
+    monkeypatch.setenv("EXTRACT_CHUNK_ROWS", "500")
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+
+    with patch('pipeline.stream_data_from_rds') as mock_stream, \
+            patch('pipeline.get_summary_from_chunks',
+                  return_value=mock_summary) as mock_chunks, \
+            patch('pipeline.get_data_from_rds') as mock_extract, \
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.clear_archive'):
+        run()
+
+    mock_stream.assert_called_once_with(500)
+    mock_chunks.assert_called_once_with(mock_stream.return_value, False)
+    mock_extract.assert_not_called()
+    mock_load.assert_called_once_with(mock_summary, 42)
+
+
+def test_run_incremental_nothing_to_export(monkeypatch):
+    """Test an incremental run finishes quietly when no closed day is left to export."""
+    monkeypatch.setenv("EXPORT_BATCH_ROWS", "1000")
+    mock_data = MagicMock()
+    mock_data.empty = True
+
+    with patch('pipeline.get_data_from_rds', return_value=mock_data), \
+            patch('pipeline.get_summary_from_df') as mock_summary, \
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.clear_archive') as mock_clear:
+        run()
+
+    mock_summary.assert_not_called()
+    mock_load.assert_not_called()
+    mock_clear.assert_not_called()
+
+
+def test_run_aggregates_in_sql(monkeypatch):
+    """Test run loads the database's summary when AGGREGATE_IN_SQL is set."""
+    monkeypatch.setenv("AGGREGATE_IN_SQL", "true")
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+
+    with patch('pipeline.get_summary_from_rds', return_value=mock_summary), \
+            patch('pipeline.get_data_from_rds') as mock_extract, \
+            patch('pipeline.get_summary_from_df') as mock_transform, \
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.clear_archive'):
+        run()
+
+    mock_extract.assert_not_called()
+    mock_transform.assert_not_called()
+    mock_load.assert_called_once_with(mock_summary, 42)
+
+
+def test_run_exports_raw(monkeypatch):
+    """Test run writes raw readings before loading when EXPORT_RAW is set."""
+    monkeypatch.setenv("EXPORT_RAW", "true")
+    mock_data = MagicMock()
+    mock_data.empty = False
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+
+    with patch('pipeline.get_data_from_rds', return_value=mock_data), \
+            patch('pipeline.get_summary_from_df', return_value=mock_summary), \
+            patch('load.clear_data_directory') as mock_clear_data, \
+            patch('load.create_raw_parquet') as mock_raw, \
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.clear_archive'):
+        run()
+
+    mock_clear_data.assert_called_once()
+    mock_raw.assert_called_once_with(mock_data, "records-42-{i}")
+    mock_load.assert_called_once_with(mock_summary, 42)
+
+
+def test_run_exports_rollups(monkeypatch):
+    """Test run writes hourly and daily rollups before loading, then rebuilds the months."""
+    monkeypatch.setenv("EXPORT_ROLLUPS", "true")
+    mock_data = MagicMock()
+    mock_data.empty = False
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+
+    with patch('pipeline.get_data_from_rds', return_value=mock_data), \
+            patch('pipeline.get_summary_from_df', return_value=mock_summary), \
+            patch('pipeline.get_hourly_rollup') as mock_hourly, \
+            patch('pipeline.merge_rollup') as mock_merge, \
+            patch('load.clear_data_directory'), \
+            patch('load.create_rollup_parquet') as mock_rollup, \
+            patch('load.load_summary') as mock_load, \
+            patch('pipeline.update_monthly_rollups') as mock_monthly, \
+            patch('pipeline.clear_archive'):
+        run()
+
+    mock_hourly.assert_called_once_with(mock_data)
+    mock_merge.assert_called_once_with(mock_hourly.return_value, "daily")
+    assert mock_rollup.call_args_list == [
+        call(mock_hourly.return_value, "hourly", "rollup-42-{i}"),
+        call(mock_merge.return_value, "daily", "rollup-42-{i}")]
+    mock_load.assert_called_once_with(mock_summary, 42)
+    mock_monthly.assert_called_once_with(mock_summary)
+
+
+@mark.parametrize("chunk_rows", (1, 2, 3))
+def test_rollup_chunks_matches_whole_rollup(chunk_rows):
+    """Test chunked hourly rollups hold each reading until its plant's next one, across
+    chunks, as the whole rollup does."""
+    start = datetime(2025, 6, 1, 9)
+    data = DataFrame({"plant_id": [1, 1, 1, 2, 2],
+                      "plant_name": ["Fern"] * 3 + ["Palm"] * 2,
+                      "botanist": "Alice",
+                      "temperature": [10.0, 20.0, 40.0, 15.0, 25.0],
+                      "soil_moisture": [50.0, 55.0, 60.0, 40.0, 45.0],
+                      "recording_taken": [start + timedelta(minutes=minute)
+                                          for minute in (0, 40, 70, 10, 100)]})
+    chunks = [data.iloc[start:start + chunk_rows] for start in range(0, len(data), chunk_rows)]
+    hourly = []
+
+    passed = concat(list(rollup_chunks(iter(chunks), hourly)), ignore_index=True)
+
+    assert_frame_equal(passed[data.columns], data)
+
+    assert_frame_equal(concat(hourly, ignore_index=True), get_hourly_rollup(data.copy()))
+
+
+def test_update_monthly_rollups_rebuilds_each_month(monkeypatch):
+    """Test each month in the summary is rebuilt from its daily rollups in S3."""
+    summary = DataFrame({"year": [2025, 2025, 2025], "month": [5, 6, 6], "day": [31, 1, 2]})
+    daily = MagicMock()
+    daily.empty = False
+
+    with patch('load.get_s3_client') as mock_client, \
+            patch('load.read_rollup', return_value=daily) as mock_read, \
+            patch('pipeline.merge_rollup') as mock_merge, \
+            patch('load.create_data_directory'), \
+            patch('load.create_rollup_parquet') as mock_rollup, \
+            patch('load.load_to_s3') as mock_upload, \
+            patch('load.get_upload_settings', return_value={"workers": 2, "config": None}), \
+            patch('load.delete_data_directory'):
+        update_monthly_rollups(summary)
+
+    assert mock_read.call_args_list == [
+        call(mock_client.return_value, "daily", year=2025, month=5),
+        call(mock_client.return_value, "daily", year=2025, month=6)]
+    mock_merge.assert_called_with(daily, "monthly")
+    mock_rollup.assert_called_with(mock_merge.return_value, "monthly")
+    mock_upload.assert_called_once_with(mock_client.return_value, workers=2, config=None,
+                                        replace=True)
+
+
+def test_run_summarises_with_sketches(monkeypatch):
+    """Test run passes EXPORT_SKETCHES to the transform."""
+    monkeypatch.setenv("EXPORT_SKETCHES", "true")
+    mock_data = MagicMock()
+    mock_data.empty = False
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+
+    with patch('pipeline.get_data_from_rds', return_value=mock_data), \
+            patch('pipeline.get_summary_from_df', return_value=mock_summary) as mock_transform, \
+            patch('load.load_summary'), \
+            patch('pipeline.clear_archive'):
+        run()
+
+    mock_transform.assert_called_once_with(mock_data, True)
+
+
+def test_run_compacts_closed_months(monkeypatch):
+    """Test run compacts closed months once the summary is loaded, when COMPACT_MONTHS is set."""
+    monkeypatch.setenv("COMPACT_MONTHS", "true")
+    mock_data = MagicMock()
+    mock_data.empty = False
+    mock_summary = MagicMock()
+    mock_summary.empty = False
+    calls = MagicMock()
+
+    with patch('pipeline.get_data_from_rds', return_value=mock_data), \
+            patch('pipeline.get_summary_from_df', return_value=mock_summary), \
+            patch('load.load_summary', calls.load_summary), \
+            patch('load.get_s3_client') as mock_client, \
+            patch('compact.compact_closed_months', calls.compact_closed_months), \
+            patch('pipeline.clear_archive'):
+        run()
+
+    assert [name for name, _, _ in calls.mock_calls] == ["load_summary", "compact_closed_months"]
+    calls.compact_closed_months.assert_called_once_with(mock_client.return_value)
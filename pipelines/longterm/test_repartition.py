@@ -0,0 +1,29 @@
+# pylint: skip-file
+"""Tests for long term summary repartitioning module."""
+
+from pytest import mark
+
+from repartition import get_dated_key, migrate_summaries
+
+
+@mark.parametrize("key, expected", (
+    ("input/plant/year=2025/month=6/day=1/summary-0", "input/plant/dt=2025-06-01/summary-0"),
+    ("input/plant/year=2025/month=12/day=31/summary-3-9-0",
+     "input/plant/dt=2025-12-31/summary-3-9-0"),
+    ("input/plant/year=2025/summary-0", None)))
+def test_get_dated_key(key, expected):
+    """Test year, month and day partitions become a zero padded dt partition."""
+    assert get_dated_key(key) == expected
+
+
+def test_migrate_summaries(fake_s3):
+    """Test each summary is moved to its dt partition, leaving dt partitions alone."""
+    fake_s3.objects.update({"input/plant/year=2025/month=6/day=1/summary-0": b"first",
+                            "input/plant/year=2025/month=6/day=2/summary-0": b"second",
+                            "input/plant/dt=2025-06-03/summary-0": b"third"})
+
+    assert migrate_summaries(fake_s3) == 2
+
+    assert fake_s3.objects == {"input/plant/dt=2025-06-01/summary-0": b"first",
+                               "input/plant/dt=2025-06-02/summary-0": b"second",
+                               "input/plant/dt=2025-06-03/summary-0": b"third"}
@@ -0,0 +1,94 @@
+# pylint: skip-file
+
+"""Module for testing sketch methods."""
+
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from numpy import array, nan, nanquantile
+from numpy.random import default_rng
+from pandas import DataFrame
+from pytest import approx, mark
+
+from sketch import (RELATIVE_ACCURACY, get_percentiles, get_sketch, get_sketch_quantiles,
+                    merge_sketches)
+from transform import get_summary_from_df
+from load import load_summary, read_objects
+
+
+def get_readings() -> array:
+    readings = default_rng(0).normal(18, 3, 5000)
+    readings[::40] = nan
+    return readings
+
+
+@mark.parametrize("fraction", (0.05, 0.5, 0.95))
+def test_get_sketch_quantiles_within_accuracy(fraction):
+    """Test a sketch's quantiles are within its relative accuracy of the readings'."""
+    readings = get_readings()
+    actual = get_sketch_quantiles(get_sketch(readings), [fraction])[0]
+    assert actual == approx(nanquantile(readings, fraction), rel=2 * RELATIVE_ACCURACY)
+
+
+def test_get_sketch_quantiles_signs():
+    """Test negative, zero and positive readings are kept in order."""
+    actual = get_sketch_quantiles(get_sketch(array([10.0, -5.0, 0.0, 2.0, -1.0])),
+                                  [0, 0.25, 0.5, 0.75, 1])
+    assert actual == approx([-5.0, -1.0, 0.0, 2.0, 10.0], rel=RELATIVE_ACCURACY)
+
+
+def test_get_sketch_quantiles_empty():
+    """Test a sketch without readings has no quantiles."""
+    assert get_sketch_quantiles(get_sketch(array([nan])), [0.5]) == [approx(nan, nan_ok=True)]
+
+
+def test_merge_sketches_matches_sketch_of_all_readings():
+    """Test merging sketches of parts gives the sketch of the whole, skipping missing ones."""
+    readings = get_readings()
+    parts = [get_sketch(readings[start:start + 700]) for start in range(0, 5000, 700)]
+    assert merge_sketches(parts + [None]) == get_sketch(readings)
+
+
+def test_get_percentiles_over_date_range():
+    """Test each plant's percentiles only merge the days in range."""
+    start = datetime(2025, 6, 1, 9)
+    raw = DataFrame({
+        "plant_id": [1, 1, 1, 1, 2, 2],
+        "plant_name": ["Fern"] * 4 + ["Palm"] * 2,
+        "botanist": ["Alice"] * 6,
+        "temperature": [10.0, 20.0, 30.0, 90.0, 15.0, 25.0],
+        "soil_moisture": [50.0] * 6,
+        "recording_taken": [start, start + timedelta(days=1), start + timedelta(days=1, hours=1),
+                            start + timedelta(days=2), start, start + timedelta(hours=1)]})
+    summary = get_summary_from_df(raw, sketched=True)
+
+    actual = get_percentiles(summary, "temperature", {"min": 0, "median": 0.5, "max": 1},
+                             end=date(2025, 6, 2))
+
+    assert actual.index.tolist() == [1, 2]
+    assert actual.loc[1].tolist() == approx([10.0, 20.0, 30.0], rel=RELATIVE_ACCURACY)
+    assert actual.loc[2].tolist() == approx([15.0, 15.0, 25.0], rel=RELATIVE_ACCURACY)
+
+
+def test_get_percentiles_from_loaded_summaries(fake_s3, monkeypatch):
+    """Test percentiles are read from summaries as loaded to S3, dated by their dt."""
+    monkeypatch.setenv("LOAD_IN_MEMORY", "true")
+    start = datetime(2025, 6, 1, 9)
+    summary = get_summary_from_df(DataFrame({
+        "plant_id": [1, 1, 1, 2],
+        "plant_name": ["Fern"] * 3 + ["Palm"],
+        "botanist": ["Alice"] * 4,
+        "temperature": [10.0, 20.0, 90.0, 15.0],
+        "soil_moisture": [50.0] * 4,
+        "recording_taken": [start, start + timedelta(hours=1), start + timedelta(days=1),
+                            start]}), sketched=True)
+    with patch("load.get_s3_client", return_value=fake_s3):
+        load_summary(summary, 1)
+    loaded = read_objects(fake_s3, "input/plant")
+
+    actual = get_percentiles(loaded, "temperature", {"min": 0, "max": 1},
+                             start=date(2025, 6, 1), end=date(2025, 6, 1))
+
+    assert "year" not in loaded and loaded.index.name == "plant_id"
+    assert actual.loc[1].tolist() == approx([10.0, 20.0], rel=RELATIVE_ACCURACY)
+    assert actual.loc[2].tolist() == approx([15.0, 15.0], rel=RELATIVE_ACCURACY)
@@ -0,0 +1,61 @@
+# pylint: skip-file
+"""Script to test functionality of the `tracing.py` script."""
+import json
+from pytest import raises
+from tracing import span, traced, set_attributes, to_attribute_value
+
+
+def read_spans(trace_file):
+    return [json.loads(line) for line in trace_file.read_text().splitlines()]
+
+
+def test_spans_nest_under_parent(tmp_path, monkeypatch):
+    trace_file = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("TRACE_OUTPUT", str(trace_file))
+
+    with span("run"):
+        with span("extract", rows=10):
+            pass
+
+    child, parent = read_spans(trace_file)
+    assert child["name"] == "extract"
+    assert child["traceId"] == parent["traceId"]
+    assert child["parentSpanId"] == parent["spanId"]
+    assert parent["parentSpanId"] == ""
+    assert child["attributes"] == [{"key": "rows", "value": {"intValue": 10}}]
+    assert child["endTimeUnixNano"] >= child["startTimeUnixNano"]
+
+
+def test_traced_records_error(tmp_path, monkeypatch):
+    trace_file = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("TRACE_OUTPUT", str(trace_file))
+
+    @traced("load")
+    def failing_load():
+        set_attributes(rows=3)
+        raise ValueError("failed")
+
+    with raises(ValueError):
+        failing_load()
+
+    [load_span] = read_spans(trace_file)
+    assert load_span["status"] == {"code": "STATUS_CODE_ERROR", "message": "failed"}
+    assert load_span["attributes"][0]["value"] == {"intValue": 3}
+
+
+def test_spans_not_exported_without_output(tmp_path, monkeypatch):
+    monkeypatch.delenv("TRACE_OUTPUT", raising=False)
+    monkeypatch.chdir(tmp_path)
+    with span("run"):
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_set_attributes_without_span():
+    set_attributes(rows=1)
+
+
+def test_to_attribute_value():
+    assert to_attribute_value(True) == {"boolValue": True}
+    assert to_attribute_value(1.5) == {"doubleValue": 1.5}
+    assert to_attribute_value("a") == {"stringValue": "a"}
@@ -2,11 +2,18 @@
 
 """Module for testing transform methods."""
 
+from datetime import datetime, timedelta
+
+from numpy import isnan, nan
 from pandas.api.typing import DataFrameGroupBy
-from pandas import DataFrame
+from pandas import DataFrame, concat
+from pandas.testing import assert_frame_equal
+from pytest import approx, mark
 
-from transform import (get_grouped_data, get_summary_from_df,
-                       get_summary_stats)
+from transform import (get_grouped_data, get_summary_from_df, get_time_parts,
+                       get_summary_stats, get_summary_from_chunks, get_sorted_summary,
+                       get_hourly_rollup, merge_rollup,
+                       merge_summaries)
 
 
 def test_get_grouped_data(test_ungrouped_dataframe):
@@ -30,4 +37,149 @@ def test_get_summary_from_df(test_ungrouped_dataframe, test_summary_dataframe):
         "month": "int32",
         "day": "int32"
     })
-    assert actual.equals(test_summary_dataframe)
+    assert actual[test_summary_dataframe.columns].equals(test_summary_dataframe)
+
+
+def get_readings(minutes: list[int], temperatures: list[float],
+                 moistures: list[float]) -> DataFrame:
+    start = datetime(2025, 6, 1, 9)
+    return get_time_parts(DataFrame({
+        "plant_id": [1] * len(minutes),
+        "plant_name": ["Fern"] * len(minutes),
+        "botanist": ["Alice"] * len(minutes),
+        "temperature": temperatures,
+        "soil_moisture": moistures,
+        "recording_taken": [start + timedelta(minutes=minute) for minute in minutes]
+    }))
+
+
+def test_get_sorted_summary_statistics():
+    """Test the sorted summary's extra statistics, with readings out of time order."""
+    actual = get_sorted_summary(get_readings([30, 0, 10], [40.0, 10.0, 20.0],
+                                             [nan, 50.0, 60.0])).iloc[0]
+    assert actual["temperature_mean"] == approx(70 / 3)
+    assert actual["temperature_std"] == approx(15.275252)
+    assert actual["temperature_p5"] == approx(11.0)
+    assert actual["temperature_median"] == 20.0
+    assert actual["temperature_p95"] == approx(38.0)
+    assert actual["temperature_time_weighted_mean"] == approx(50 / 3)
+    assert actual["soil_moisture_mean"] == 55.0
+    assert actual["soil_moisture_time_weighted_mean"] == approx(170 / 3)
+    assert actual["count"] == 3
+
+
+def test_get_sorted_summary_single_reading():
+    """Test a single reading has no spread and is its own time weighted mean."""
+    actual = get_sorted_summary(get_readings([0], [21.5], [nan])).iloc[0]
+    assert isnan(actual["temperature_std"])
+    assert actual["temperature_time_weighted_mean"] == 21.5
+    assert isnan(actual["soil_moisture_median"])
+    assert isnan(actual["soil_moisture_time_weighted_mean"])
+
+
+def test_get_sorted_summary_matches_agg(test_ungrouped_dataframe):
+    """Test the sorted summary gives the same min, median, max and count as agg."""
+    data = test_ungrouped_dataframe.assign(
+        temperature=[22.5, nan, 23.0, 30.0, 19.0, 21.5, nan],
+        botanist=["Alice", "Bob", "Alice", None, "Bob", "Bert", "Diana"])
+    expected = get_summary_stats(get_grouped_data(data))
+    assert_frame_equal(get_sorted_summary(data)[expected.columns], expected)
+
+
+@mark.parametrize("chunk_rows", [1, 2, 3, 7])
+def test_get_summary_from_chunks_matches_whole(test_ungrouped_dataframe, chunk_rows):
+    """Test summarising plant ordered chunks gives the same summary as all rows at once."""
+    ordered = test_ungrouped_dataframe.sort_values("plant_id", kind="stable",
+                                                   ignore_index=True)
+    chunks = (ordered.iloc[start:start + chunk_rows].copy()
+              for start in range(0, len(ordered), chunk_rows))
+    expected = get_summary_from_df(ordered.copy())
+    assert get_summary_from_chunks(chunks).equals(expected)
+
+
+def test_get_summary_from_chunks_empty():
+    """Test summarising no chunks returns an empty Dataframe."""
+    assert get_summary_from_chunks(iter([])).empty
+
+
+def test_get_hourly_rollup():
+    """Test each hour's rollup, weighting its last reading until the next hour's first."""
+    actual = get_hourly_rollup(get_readings([0, 40, 70], [10.0, 20.0, 40.0],
+                                            [50.0, nan, 60.0]))
+    assert actual["hour"].tolist() == [9, 10]
+    assert actual["count"].tolist() == [2, 1]
+    assert actual["temperature_sum"].tolist() == [30.0, 40.0]
+    assert actual["temperature_held_seconds"].tolist() == [4200.0, 0.0]
+    assert actual["temperature_time_weighted_mean"].tolist() == [approx(100 / 7), 40.0]
+    assert actual["soil_moisture_count"].tolist() == [1, 1]
+    assert isnan(actual["soil_moisture_std"]).all()
+
+
+def test_merge_rollup_matches_summary():
+    """Test hourly rollups merged into days give the same statistics as the daily summary."""
+    data = get_readings([5, 50, 61, 125, 180, 1500], [20.0, 22.5, nan, 19.0, 25.5, 18.0],
+                        [50.0, 52.0, 55.5, nan, 61.0, 49.0])
+    expected = get_sorted_summary(data.copy()).reset_index()
+
+    actual = merge_rollup(get_hourly_rollup(data), "daily")
+
+    assert actual["day"].tolist() == [1, 2]
+    for column in ("temperature", "soil_moisture"):
+        for statistic in ("min", "max", "mean", "std", "time_weighted_mean"):
+            name = f"{column}_{statistic}"
+            assert actual[name].tolist() == approx(expected[name].tolist(), nan_ok=True)
+    assert actual["count"].tolist() == expected["count"].tolist()
+
+
+def test_merge_rollup_monthly():
+    """Test daily rollups merge into one row per plant and month."""
+    data = get_readings([0, 30, 1440, 1500], [20.0, 22.0, 24.0, 26.0], [50.0, 50.0, 60.0, 60.0])
+    actual = merge_rollup(merge_rollup(get_hourly_rollup(data), "daily"), "monthly")
+    assert len(actual) == 1
+    assert actual.loc[0, "temperature_mean"] == 23.0
+    assert actual.loc[0, "temperature_time_weighted_mean"] == approx(68 / 3)
+    assert actual.loc[0, "soil_moisture_std"] == approx(5.773503)
+    assert actual.loc[0, "count"] == 4
+
+
+def test_get_sorted_summary_sketches():
+    """Test sketches are only added when asked for, one per group and reading."""
+    data = get_readings([0, 10, 1440], [10.0, 20.0, 30.0], [nan, nan, 40.0])
+    assert "temperature_sketch" not in get_sorted_summary(data.copy())
+
+    actual = get_sorted_summary(data, sketched=True)
+
+    assert actual.columns[-2:].tolist() == ["temperature_sketch", "soil_moisture_sketch"]
+    assert [len(sketch) for sketch in actual["temperature_sketch"]] == [14, 7]
+    assert actual["soil_moisture_sketch"].tolist()[0] == b""
+
+
+@mark.parametrize("sketched", (False, True))
+def test_merge_summaries_matches_whole_day(sketched):
+    """Test summaries of parts of a day merge into the day's summary, exactly for counts,
+    mins, maxes, means and standard deviations."""
+    data = get_readings([5, 50, 61, 125, 180, 1500, 1510],
+                        [20.0, 22.5, 21.0, 19.0, 25.5, 18.0, 17.0],
+                        [50.0, 52.0, 55.5, 51.0, 61.0, 49.0, 48.0])
+    expected = get_sorted_summary(data.copy(), sketched)
+    parts = concat([get_sorted_summary(data.iloc[:2].copy(), sketched),
+                    get_sorted_summary(data.iloc[2:].copy(), sketched)])
+
+    actual = merge_summaries(parts)
+
+    assert actual.columns.tolist() == expected.columns.tolist()
+    assert actual["day"].tolist() == [1, 2]
+    assert actual["count"].tolist() == [5, 2]
+    for column in ("temperature", "soil_moisture"):
+        for statistic in ("min", "max", "mean", "std"):
+            name = f"{column}_{statistic}"
+            assert actual[name].tolist() == approx(expected[name].tolist())
+        assert actual[f"{column}_median"].tolist() == \
+            approx(expected[f"{column}_median"].tolist(), rel=0.1)
+    assert actual.iloc[1].equals(expected.iloc[1])
+
+
+def test_merge_summaries_keeps_whole_days():
+    """Test summaries that are each a whole day are returned as they are."""
+    summary = get_sorted_summary(get_readings([0, 1440], [10.0, 20.0], [50.0, 60.0]))
+    assert merge_summaries(summary) is summary
@@ -1,15 +1,31 @@
 """Module for transforming data ready for S3."""
 
 from logging import getLogger
-from pandas import DataFrame
+from numpy import (ndarray, add, append, arange, argsort, bincount, cumsum, diff, errstate,
+                   flatnonzero, floor, fmax, fmin, inf, int16, int64, isnan, maximum, minimum,
+                   nan, sqrt, where, zeros)
+from pandas import DataFrame, MultiIndex, concat, factorize
 from pandas.api.typing import DataFrameGroupBy
 
+from sketch import get_group_sketches, get_sketch_quantiles, merge_sketches
+
+GROUP_COLUMNS = ['plant_id', 'plant_name', 'botanist', 'year', 'month', 'day']
+READING_COLUMNS = ("temperature", "soil_moisture")
+QUANTILES = {"p5": 0.05, "median": 0.5, "p95": 0.95}
+ROLLUP_KEY = ['plant_id', 'plant_name', 'botanist']
+ROLLUP_LEVELS = {"hourly": ['year', 'month', 'day', 'hour'],
+                 "daily": ['year', 'month', 'day'],
+                 "monthly": ['year', 'month']}
+ROLLUP_SUMS = {"count": "sum", "sum": "sum", "sum_squares": "sum", "min": "min", "max": "max",
+               "held_seconds": "sum", "weighted_sum": "sum"}
+
 
 def get_grouped_data(df: DataFrame) -> DataFrameGroupBy:
     """Return data grouped by key column."""
     logger = getLogger()
     logger.info("Creating group from Dataframe...")
-    return df.groupby(by=['plant_id', 'plant_name', 'botanist', 'year', 'month', 'day'])
+    # Only groups present in the data, as categorical columns would add every combination.
+    return df.groupby(by=GROUP_COLUMNS, observed=True)
 
 
 def get_summary_stats(grouping: DataFrameGroupBy) -> DataFrame:
@@ -37,13 +53,274 @@ def get_time_parts(data: DataFrame) -> DataFrame:
     return data
 
 
-def get_summary_from_df(raw: DataFrame) -> DataFrame:
+def get_group_codes(data: DataFrame, columns: tuple[str, ...] = tuple(GROUP_COLUMNS)) -> ndarray:
+    """Return each row's group, numbered in the order groupby sorts keys, or -1 if a key
+    is missing."""
+    codes = zeros(len(data), int64)
+    missing = zeros(len(data), bool)
+    size = 1
+    for column in columns:
+        column_codes, uniques = factorize(data[column], sort=True)
+        if size * len(uniques) >= 2 ** 62:
+            codes, kept = factorize(codes, sort=True)
+            size = len(kept)
+        codes = codes * len(uniques) + column_codes
+        size *= len(uniques)
+        missing |= column_codes < 0
+    codes[missing] = -1
+    return factorize(codes, sort=True)[0] - int(missing.any())
+
+
+def sort_by_group(order: ndarray, codes: ndarray) -> ndarray:
+    """Return a row order stably sorted by group, keeping the given order within groups."""
+    grouped = codes[order]
+    # Stable sorts of 16 bit integers are radix sorts, so most exports sort in linear time.
+    if len(grouped) and grouped.max() < 2 ** 15:
+        grouped = grouped.astype(int16)
+    return order[argsort(grouped, kind="stable")]
+
+
+def get_group_order(data: DataFrame, codes: ndarray) -> tuple[ndarray, ndarray, ndarray]:
+    """Return the row order sorting data by group then time, without rows missing a key,
+    with each sorted row's group and each group's size."""
+    times = data["recording_taken"].to_numpy("datetime64[ns]").view(int64)
+    order = sort_by_group(arange(len(data)), codes)
+    # Extracted rows are already in time order, so only sort by time if they are not.
+    if ((diff(times[order]) < 0) & (diff(codes[order]) == 0)).any():
+        order = sort_by_group(argsort(times), codes)
+    # Rows with a missing key sort first and are dropped, as groupby drops them.
+    order = order[codes[order] >= 0]
+    return order, codes[order], bincount(codes[order])
+
+
+def get_held_seconds(data: DataFrame, order: ndarray, last: ndarray) -> ndarray:
+    """Return how long each sorted reading held until the next, or 0 for the last rows."""
+    times = data["recording_taken"].to_numpy("datetime64[ns]").view(int64)[order]
+    held = append(diff(times) / 1e9, 0.0)
+    held[last] = 0.0
+    return held
+
+
+def get_reading_stats(values: ndarray, held: ndarray, codes: ndarray,
+                      starts: ndarray) -> dict[str, ndarray]:
+    """Return each group's statistics of one reading, from values sorted by group then time.
+
+    Each value is weighted by how long it was held until the group's next reading.
+    """
+    valid = ~isnan(values)
+    counts = add.reduceat(valid.astype(int64), starts)
+    filled = where(valid, values, 0.0)
+    # Missing values sort last as infinity, so each group's first values are its readings
+    # in ascending order. Sorting is also much faster without NaN.
+    ranked = where(valid, values, inf)
+    ranked = ranked[sort_by_group(argsort(ranked), codes)]
+    with errstate(invalid="ignore", divide="ignore"):
+        mean = add.reduceat(filled, starts) / counts
+        squares = add.reduceat(where(valid, values - mean[codes], 0.0) ** 2, starts)
+        weights = add.reduceat(where(valid, held, 0.0), starts)
+        weighted = add.reduceat(filled * held, starts) / weights
+        stats = {"min": ranked[starts], "max": ranked[starts + counts - 1]}
+        for name, quantile in QUANTILES.items():
+            position = (counts - 1) * quantile
+            lower = floor(position).astype(int64)
+            below = ranked[starts + lower]
+            above = ranked[starts + minimum(lower + 1, counts - 1)]
+            stats[name] = below + (position - lower) * (above - below)
+    stats = {name: where(counts > 0, stat, nan) for name, stat in stats.items()}
+    return {"min": stats["min"],
+            "median": stats["median"],
+            "max": stats["max"],
+            "mean": mean,
+            "std": where(counts > 1, sqrt(squares / maximum(counts - 1, 1)), nan),
+            "p5": stats["p5"],
+            "p95": stats["p95"],
+            "time_weighted_mean": where(weights > 0, weighted, mean)}
+
+
+def get_sorted_summary(data: DataFrame, sketched: bool = False) -> DataFrame:
+    """Return Dataframe with summary statistics of each group, from one pass over the
+    rows sorted by group, and a quantile sketch of each reading if sketched."""
+    logger = getLogger()
+    logger.info("Getting summary statistics from sorted groups...")
+    order, codes, sizes = get_group_order(data, get_group_codes(data))
+    starts = cumsum(sizes) - sizes
+    summary = data[GROUP_COLUMNS].iloc[order[starts]].set_index("plant_id")
+    held = get_held_seconds(data, order, cumsum(sizes) - 1)
+    for column in READING_COLUMNS:
+        values = data[column].to_numpy(dtype=float, na_value=nan)[order]
+        for name, stat in get_reading_stats(values, held, codes, starts).items():
+            summary[f"{column}_{name}"] = stat
+    summary["count"] = sizes
+    if sketched:
+        for column in READING_COLUMNS:
+            values = data[column].to_numpy(dtype=float, na_value=nan)[order]
+            summary[f"{column}_sketch"] = get_group_sketches(values, codes, len(sizes))
+    return summary
+
+
+def get_rollup_sums(values: ndarray, held: ndarray, starts: ndarray) -> dict[str, ndarray]:
+    """Return each group's sums, min and max of one reading, which merge into coarser groups."""
+    valid = ~isnan(values)
+    filled = where(valid, values, 0.0)
+    return {"count": add.reduceat(valid.astype(int64), starts),
+            "sum": add.reduceat(filled, starts),
+            "sum_squares": add.reduceat(filled * filled, starts),
+            "min": fmin.reduceat(values, starts),
+            "max": fmax.reduceat(values, starts),
+            "held_seconds": add.reduceat(where(valid, held, 0.0), starts),
+            "weighted_sum": add.reduceat(filled * held, starts)}
+
+
+def add_rollup_means(rollup: DataFrame) -> DataFrame:
+    """Return rollup with each reading's mean, standard deviation and time weighted mean,
+    worked out from its sums."""
+    for column in READING_COLUMNS:
+        count = rollup[f"{column}_count"]
+        total = rollup[f"{column}_sum"]
+        held = rollup[f"{column}_held_seconds"]
+        mean = total / count.where(count > 0)
+        variance = (rollup[f"{column}_sum_squares"] - total * mean) / (count - 1).where(count > 1)
+        rollup[f"{column}_mean"] = mean
+        rollup[f"{column}_std"] = variance.clip(lower=0) ** 0.5
+        rollup[f"{column}_time_weighted_mean"] = \
+            (rollup[f"{column}_weighted_sum"] / held.where(held > 0)).fillna(mean)
+    return rollup
+
+
+def get_hourly_rollup(data: DataFrame) -> DataFrame:
+    """Return the rollup of each plant, botanist and hour of readings.
+
+    Readings are weighted by how long they held until the plant's next reading that day,
+    so the hours of a day merge into the same time weighted mean as the whole day.
+    """
+    logger = getLogger()
+    logger.info("Getting hourly rollup from raw dataframe...")
+    data = get_time_parts(data).assign(hour=data["recording_taken"].dt.hour)
+    keys = ROLLUP_KEY + ROLLUP_LEVELS["hourly"]
+    order, _, sizes = get_group_order(data, get_group_codes(data, tuple(keys)))
+    starts = cumsum(sizes) - sizes
+    days = get_group_codes(data)[order]
+    held = get_held_seconds(data, order, append(flatnonzero(diff(days)), len(days) - 1))
+    rollup = data[keys].iloc[order[starts]].reset_index(drop=True)
+    for column in READING_COLUMNS:
+        values = data[column].to_numpy(dtype=float, na_value=nan)[order]
+        for name, stat in get_rollup_sums(values, held, starts).items():
+            rollup[f"{column}_{name}"] = stat
+    rollup["count"] = sizes
+    return add_rollup_means(rollup)
+
+
+def merge_rollup(rollup: DataFrame, level: str) -> DataFrame:
+    """Return a rollup merged into the groups of a level, from its sums, mins and maxes."""
+    logger = getLogger()
+    logger.info("Merging rollup into %s groups...", level)
+    sums = {f"{column}_{name}": method for column in READING_COLUMNS
+            for name, method in ROLLUP_SUMS.items()}
+    merged = rollup.groupby(by=ROLLUP_KEY + ROLLUP_LEVELS[level], observed=True) \
+        .agg({**sums, "count": "sum"}).reset_index()
+    return add_rollup_means(merged)
+
+
+def get_weighted_mean(values, counts, keys: list[str]):
+    """Return the mean of each group's values, weighted by their counts."""
+    weights = counts.where(values.notna(), 0)
+    sums = (values.fillna(0) * weights).groupby(keys, observed=True, sort=False).sum()
+    return sums / weights.groupby(keys, observed=True, sort=False).sum().where(lambda w: w > 0)
+
+
+def merge_summaries(summaries: DataFrame) -> DataFrame:
+    """Return one summary per plant, botanist and day, from summaries of parts of days.
+
+    Counts add up and mins and maxes are exact. Means, standard deviations and time
+    weighted means are combined by count, so are exact for means and standard deviations
+    unless readings are missing. Quantiles come from the merged sketches if
+    there are any, or are weighted by count if not. Days with a single summary are kept
+    as they are.
+    """
+    logger = getLogger()
+    logger.info("Merging summaries of parts of days...")
+    data = summaries.reset_index()
+    parts = data.groupby(GROUP_COLUMNS, observed=True, sort=False)["count"].transform("size")
+    single, split = data[parts == 1], data[parts > 1].copy()
+    if split.empty:
+        return summaries
+    keys = [split[column] for column in GROUP_COLUMNS]
+    grouping = split.groupby(keys, observed=True, sort=False)
+    merged = grouping[GROUP_COLUMNS].first()
+    merged["count"] = grouping["count"].sum()
+    counts = split["count"]
+    for column in READING_COLUMNS:
+        merged[f"{column}_min"] = grouping[f"{column}_min"].min()
+        merged[f"{column}_max"] = grouping[f"{column}_max"].max()
+        mean = get_weighted_mean(split[f"{column}_mean"], counts, keys)
+        # Pooled variance: each part's spread plus the spread of its mean from the day's.
+        part_mean = split[f"{column}_mean"].to_numpy() \
+            - mean.reindex(MultiIndex.from_arrays(keys)).to_numpy()
+        squares = ((counts - 1) * split[f"{column}_std"].fillna(0) ** 2
+                   + counts * part_mean ** 2).where(split[f"{column}_mean"].notna(), 0)
+        total = counts.where(split[f"{column}_mean"].notna(), 0) \
+            .groupby(keys, observed=True, sort=False).sum()
+        merged[f"{column}_mean"] = mean
+        merged[f"{column}_std"] = (squares.groupby(keys, observed=True, sort=False).sum()
+                                   / (total - 1).where(total > 1)) ** 0.5
+        merged[f"{column}_time_weighted_mean"] = \
+            get_weighted_mean(split[f"{column}_time_weighted_mean"], counts, keys)
+        if f"{column}_sketch" in split:
+            sketches = grouping[f"{column}_sketch"].agg(merge_sketches)
+            merged[f"{column}_sketch"] = sketches
+            quantiles = DataFrame([get_sketch_quantiles(sketch, list(QUANTILES.values()))
+                                   for sketch in sketches], index=sketches.index,
+                                  columns=list(QUANTILES))
+        else:
+            quantiles = DataFrame({name: get_weighted_mean(split[f"{column}_{name}"],
+                                                           counts, keys)
+                                   for name in QUANTILES})
+        for name in QUANTILES:
+            merged[f"{column}_{name}"] = quantiles[name]
+    merged = concat([single, merged.reset_index(drop=True)[data.columns]], ignore_index=True)
+    return merged.sort_values(GROUP_COLUMNS, kind="stable").set_index("plant_id")
+
+
+def get_summary_from_df(raw: DataFrame, sketched: bool = False) -> DataFrame:
     """Return summary Dataframe from regular Dataframe."""
     logger = getLogger()
     logger.info("Getting summary stats from raw dataframe...")
     time_df = get_time_parts(raw)
-    grouped_df = get_grouped_data(time_df)
-    return get_summary_stats(grouped_df)
+    return get_sorted_summary(time_df, sketched)
+
+
+def split_last_plant(data: DataFrame) -> tuple[DataFrame, DataFrame]:
+    """Return the rows of every plant but the last in plant ordered data, and the rows of
+    the last plant, which can continue in the next chunk."""
+    complete = data["plant_id"] != data["plant_id"].iloc[-1]
+    return data[complete], data[~complete]
+
+
+def get_complete_plants(chunks):
+    """Yield the rows of whole plants from Dataframe chunks ordered by plant.
+
+    A plant's rows are yielded once its last row has arrived, so only one chunk and
+    the rows of one plant are held at a time.
+    """
+    carried = DataFrame()
+    for chunk in chunks:
+        data = concat([carried, chunk], ignore_index=True) if not carried.empty else chunk
+        complete, carried = split_last_plant(data)
+        if not complete.empty:
+            yield complete.copy()
+    if not carried.empty:
+        yield carried.copy()
+
+
+def get_summary_from_chunks(chunks, sketched: bool = False) -> DataFrame:
+    """Return summary Dataframe from Dataframe chunks ordered by plant.
+
+    Each plant is summarised once its last row has arrived, so medians stay exact.
+    """
+    logger = getLogger()
+    logger.info("Getting summary stats from streamed chunks...")
+    summaries = [get_summary_from_df(plants, sketched) for plants in get_complete_plants(chunks)]
+    return concat(summaries) if summaries else DataFrame()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+"""Module for buffering cleaned readings between bulk loads to the database."""
+
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from logging import getLogger
+from os import environ as ENV, listdir, makedirs, path, remove
+from uuid import uuid4
+
+import pandas as pd
+from pandas import DataFrame
+
+from tracing_short import traced, set_attributes
+
+BUFFER_TIME_FORMAT = "%Y%m%dT%H%M%S"
+BUFFER_DTYPES = {"botanist_phone": str}
+
+
+def get_flush_limits() -> tuple[timedelta, int]:
+    """Return the buffer age and row count that trigger a flush."""
+    return (timedelta(minutes=int(ENV.get("FLUSH_MINUTES", "10"))),
+            int(ENV.get("FLUSH_ROWS", "5000")))
+
+
+def split_s3_uri(uri: str) -> tuple[str, str]:
+    """Return the bucket and key prefix of an S3 URI."""
+    bucket, _, prefix = uri.removeprefix("s3://").partition("/")
+    return bucket, prefix.strip("/")
+
+
+def get_s3_client():
+    """Return client to S3 bucket, importing boto3 only when S3 is used."""
+    from boto3 import client  # pylint: disable=import-outside-toplevel
+    return client("s3")
+
+
+def get_batch_name(rows: int, now: datetime) -> str:
+    """Return a buffer file name holding its write time and row count."""
+    return f"{now.strftime(BUFFER_TIME_FORMAT)}-{rows}-{uuid4().hex[:8]}.csv"
+
+
+def parse_batch_name(name: str) -> tuple[datetime, int]:
+    """Return the write time and row count of a buffer file."""
+    written, rows, _ = name.removesuffix(".csv").split("-")
+    return (datetime.strptime(written, BUFFER_TIME_FORMAT).replace(tzinfo=timezone.utc),
+            int(rows))
+
+
+@traced("buffer.write")
+def write_buffer(data: DataFrame, uri: str, now: datetime = None) -> str:
+    """Append a batch of readings to the buffer as a new file."""
+    logger = getLogger()
+    name = get_batch_name(len(data), now or datetime.now(timezone.utc))
+    body = data.to_csv(index=False)
+    set_attributes(rows=len(data), bytes=len(body))
+    if uri.startswith("s3://"):
+        bucket, prefix = split_s3_uri(uri)
+        get_s3_client().put_object(Bucket=bucket, Key=f"{prefix}/{name}",
+                                   Body=body.encode())
+    else:
+        makedirs(uri, exist_ok=True)
+        with open(path.join(uri, name), "w", encoding="utf-8") as file:
+            file.write(body)
+    logger.info("Buffered %d readings in %s.", len(data), name)
+    return name
+
+
+def list_buffer(uri: str) -> list[str]:
+    """Return the names of all buffered files, oldest first."""
+    if uri.startswith("s3://"):
+        bucket, prefix = split_s3_uri(uri)
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        names = [obj["Key"].rsplit("/", 1)[-1]
+                 for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/")
+                 for obj in page.get("Contents", [])]
+    elif path.isdir(uri):
+        names = listdir(uri)
+    else:
+        names = []
+    return sorted(name for name in names if name.endswith(".csv"))
+
+
+def should_flush(names: list[str], max_age: timedelta, max_rows: int,
+                 now: datetime = None) -> bool:
+    """Return true if the buffer is old enough or large enough to flush, or holds readings
+    from a day that has ended, so they are in the database before the day is exported."""
+    if not names:
+        return False
+    now = now or datetime.now(timezone.utc)
+    batches = [parse_batch_name(name) for name in names]
+    oldest = min(written for written, _ in batches)
+    rows = sum(count for _, count in batches)
+    return now - oldest >= max_age or rows >= max_rows or oldest.date() < now.date()
+
+
+@traced("buffer.read")
+def read_buffer(uri: str, names: list[str]) -> DataFrame:
+    """Return the readings held in the given buffer files."""
+    if uri.startswith("s3://"):
+        bucket, prefix = split_s3_uri(uri)
+        s3 = get_s3_client()
+        batches = [pd.read_csv(StringIO(s3.get_object(Bucket=bucket, Key=f"{prefix}/{name}")
+                                        ["Body"].read().decode()), dtype=BUFFER_DTYPES)
+                   for name in names]
+    else:
+        batches = [pd.read_csv(path.join(uri, name), dtype=BUFFER_DTYPES) for name in names]
+    buffered = pd.concat(batches, ignore_index=True)
+    set_attributes(files=len(names), rows=len(buffered))
+    return buffered
+
+
+def delete_buffer(uri: str, names: list[str]):
+    """Remove flushed files from the buffer."""
+    logger = getLogger()
+    if uri.startswith("s3://"):
+        bucket, prefix = split_s3_uri(uri)
+        s3 = get_s3_client()
+        for start in range(0, len(names), 1000):
+            s3.delete_objects(Bucket=bucket, Delete={
+                "Objects": [{"Key": f"{prefix}/{name}"} for name in names[start:start + 1000]]})
+    else:
+        for name in names:
+            remove(path.join(uri, name))
+    logger.info("Removed %d flushed files from the buffer.", len(names))
@@ -0,0 +1,119 @@
+"""Script to run the short term pipeline as a long running service."""
+from math import floor
+from os import environ as ENV
+from signal import signal, SIGINT, SIGTERM
+from threading import Event
+from time import monotonic
+from logging import getLogger
+
+from dotenv import load_dotenv
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from load_short import get_connection
+from pipeline_short import run_pipeline, set_logger, prewarm
+
+
+class PersistentConnection:
+    """Keeps one database connection open across pipeline runs."""
+
+    def __init__(self, connect=get_connection):
+        """Initialise without connecting."""
+        self.connect = connect
+        self.conn = None
+
+    def get(self):
+        """Return the open connection, connecting if there is none."""
+        if self.conn is None:
+            self.conn = self.connect()
+        return self.conn
+
+    def reset(self):
+        """Close the connection, so the next run reconnects."""
+        logger = getLogger()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception as e:
+                logger.warning("Failed to close database connection: %s", e)
+        self.conn = None
+
+
+def get_session(pool_size: int = 10) -> Session:
+    """Return an HTTP session that keeps connections to the plant API open."""
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_next_tick(start: float, now: float, interval: float) -> float:
+    """Return the first tick after now, on a fixed grid of intervals from start."""
+    return start + (floor((now - start) / interval) + 1) * interval
+
+
+def run_daemon(run, interval: float, stop: Event, clock=monotonic):
+    """Call run on every tick until stopped, skipping ticks missed by an overrunning run."""
+    logger = getLogger()
+    start = clock()
+    tick = start
+
+    while not stop.is_set():
+        try:
+            run()
+        except Exception as e:
+            logger.error("Short-term ETL pipeline failed: %s", str(e))
+
+        next_tick = get_next_tick(start, clock(), interval)
+        skipped = round((next_tick - tick) / interval) - 1
+        if skipped:
+            logger.warning("Run overran its tick, skipping %d ticks.", skipped)
+        tick = next_tick
+        stop.wait(max(0.0, tick - clock()))
+
+    logger.info("Stopped short-term ETL daemon.")
+
+
+def handle_signals(stop: Event):
+    """Stop the daemon after the current run on SIGTERM or SIGINT."""
+    logger = getLogger()
+
+    def request_stop(signum, _):
+        logger.info("Received signal %d, stopping after the current run...", signum)
+        stop.set()
+
+    signal(SIGTERM, request_stop)
+    signal(SIGINT, request_stop)
+
+
+def main():
+    """Run the short term pipeline every PIPELINE_INTERVAL seconds."""
+    logger = getLogger()
+    interval = float(ENV.get("PIPELINE_INTERVAL", "60"))
+    logger.info("Starting short-term ETL daemon every %s seconds...", interval)
+
+    prewarm()
+    stop = Event()
+    handle_signals(stop)
+    session = get_session()
+    db_connection = PersistentConnection()
+
+    def run():
+        try:
+            run_pipeline(session, db_connection.get)
+        except Exception:
+            db_connection.reset()
+            raise
+
+    try:
+        run_daemon(run, interval, stop)
+    finally:
+        db_connection.reset()
+        session.close()
+
+
+if __name__ == "__main__":
+    set_logger()
+    load_dotenv()
+    main()
@@ -6,6 +6,8 @@ import pandas as pd
 import json
 import csv
 
+from tracing_short import traced, set_attributes, add_to_attribute
+
 
 class APIError(Exception):
     """Describes an error triggered by a failing API call."""
@@ -42,29 +44,33 @@ def validate_status(status_code: int, plant_id: int) -> None:
             f"Unexpected error for plant with id: {plant_id}", status_code)
 
 
-def fetch_plant_info(plant_id: int) -> dict:
+def fetch_plant_info(plant_id: int, session: requests.Session = None) -> dict:
     """Returns plant data from the API for a given id."""
     base_url = "https://sigma-labs-bot.herokuapp.com/api/plants/"
 
-    res = requests.get(f"{base_url}{plant_id}")
+    res = (session or requests).get(f"{base_url}{plant_id}")
+    add_to_attribute("bytes", len(res.content or b""))
     validate_status(res.status_code, plant_id)
     return res.json()
 
 
-def fetch_all_plants(start_plant: int = 1, end_plant: int = 50) -> list[dict]:
+@traced("extract.fetch_all_plants")
+def fetch_all_plants(start_plant: int = 1, end_plant: int = 50,
+                     session: requests.Session = None) -> list[dict]:
     """Fetches the data from all plants, appends to a list and returns a DataFrame."""
     plants = []
     skipped_ids = []
 
     for p_id in range(start_plant, end_plant+1):
         try:
-            plant_data = fetch_plant_info(p_id)
+            plant_data = fetch_plant_info(p_id, session)
             plants.append(plant_data)
         except APIError as e:
             logging.warning(
                 f"Skipped plant {p_id} - {e.message}, HTTP {e.code}")
             skipped_ids.append(p_id)
 
+    set_attributes(rows=len(plants), skipped=len(skipped_ids))
     if not plants:
         logging.warning("No plant data was fetched.")
     return pd.DataFrame(plants)
@@ -1,18 +1,32 @@
 """Modules for loading data to SQL Server DB."""
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from decimal import Decimal
+from functools import partial
 from logging import getLogger
 from os import environ as ENV
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
 from dotenv import load_dotenv
 from pyodbc import connect, Connection
 
+from backend_short import get_backend, get_sqlite_connection
+from tracing_short import traced, set_attributes
+
+RECORD_BATCH_SIZE = 1000
+READING_PRECISION = Decimal("0.01")
+
 
 def get_connection() -> Connection:
     """Return database connection."""
     logger = getLogger()
+    if get_backend() == "sqlite":
+        logger.info("Getting local SQLite connection...")
+        return get_sqlite_connection(ENV["SQLITE_PATH"], "gamma")
     logger.info("Getting RDS connection...")
     connection_string = f"""
                             DRIVER={{ODBC Driver 18 for SQL Server}};
@@ -27,6 +41,14 @@ def get_connection() -> Connection:
     return connect(connection_string)
 
 
+def to_reading(value) -> Decimal | None:
+    """Return a sensor value as a 2dp decimal, or None if it is missing."""
+    if value == "" or pd.isna(value):
+        return None
+    return Decimal(str(value)).quantize(READING_PRECISION)
+
+
+@traced("load.origin_country")
 def insert_origin_country(data: DataFrame, conn: Connection):
     """Insert data into `origin_country` table."""
     logger = getLogger()
@@ -43,6 +65,7 @@ def insert_origin_country(data: DataFrame, conn: Connection):
         country for country in unique_countries if country not in countries_in_db
     ]
 
+    set_attributes(rows=len(countries_to_insert))
     if countries_to_insert:
         insert_query = """INSERT INTO gamma.origin_country (name) VALUES (?);"""
         with conn.cursor() as curs:
@@ -54,6 +77,7 @@ def insert_origin_country(data: DataFrame, conn: Connection):
         logger.info("No new countries to insert.")
 
 
+@traced("load.botanist")
 def insert_botanist(data: DataFrame, conn: Connection):
     """Insert data into `botanist` table."""
     logger = getLogger()
@@ -70,6 +94,7 @@ def insert_botanist(data: DataFrame, conn: Connection):
 
     botanist_to_insert = list(unique_botanists - botanist_in_db)
 
+    set_attributes(rows=len(botanist_to_insert))
     if botanist_to_insert:
         insert_query = "INSERT INTO gamma.botanist (name, email, phone) VALUES (?, ?, ?);"
         with conn.cursor() as curs:
@@ -80,6 +105,7 @@ def insert_botanist(data: DataFrame, conn: Connection):
         logger.info("No new botanists to insert.")
 
 
+@traced("load.origin_city")
 def insert_origin_city(data: DataFrame, conn: Connection):
     """Insert data into `origin_city` table."""
     logger = getLogger()
@@ -108,6 +134,7 @@ def insert_origin_city(data: DataFrame, conn: Connection):
 
     cities_to_insert = list(unique_cities - cities_in_db)
 
+    set_attributes(rows=len(cities_to_insert))
     if cities_to_insert:
         insert_query = "INSERT INTO gamma.origin_city (name, country_id) VALUES (?, ?)"
         with conn.cursor() as curs:
@@ -118,6 +145,7 @@ def insert_origin_city(data: DataFrame, conn: Connection):
         logger.info("No new cities to insert.")
 
 
+@traced("load.plant")
 def insert_plant(data: DataFrame, conn: Connection):
     """Insert data into `plant` table."""
     logger = getLogger()
@@ -152,6 +180,7 @@ def insert_plant(data: DataFrame, conn: Connection):
     plants_to_insert = list(plants_to_insert[["plant_id", "name", "city_id"]].itertuples(
         index=False, name=None))
 
+    set_attributes(rows=len(plants_to_insert))
     if plants_to_insert:
         insert_query = "INSERT INTO gamma.plant (plant_id, name, city_id) VALUES (?, ?, ?)"
         with conn.cursor() as curs:
@@ -162,6 +191,7 @@ def insert_plant(data: DataFrame, conn: Connection):
         logger.info("No new plants to insert.")
 
 
+@traced("load.botanist_plant")
 def insert_botanist_plant(data: DataFrame, conn: Connection):
     """Insert data into `botanist_plant` table."""
     logger = getLogger()
@@ -187,6 +217,7 @@ def insert_botanist_plant(data: DataFrame, conn: Connection):
         if (int(row.plant_id), int(row.botanist_id)) not in botanist_plant_in_db
     ]
 
+    set_attributes(rows=len(botanist_plant_to_insert))
     if botanist_plant_to_insert:
         insert_query = "INSERT INTO gamma.botanist_plant (plant_id, botanist_id) VALUES (?, ?)"
         with conn.cursor() as curs:
@@ -198,6 +229,7 @@ def insert_botanist_plant(data: DataFrame, conn: Connection):
         logger.info("No new botanist_plant records to insert.")
 
 
+@traced("load.record")
 def insert_record(data: DataFrame, conn: Connection):
     """Insert data into `record` table."""
     logger = getLogger()
@@ -217,15 +249,16 @@ def insert_record(data: DataFrame, conn: Connection):
 
     records_to_insert = [
         (
-            float(row.temperature),
+            to_reading(row.temperature),
             row.last_watered,
-            float(row.soil_moisture),
+            to_reading(row.soil_moisture),
             row.recording_taken,
             int(row.plant_id)
         )
         for row in records.itertuples(index=False)
     ]
 
+    set_attributes(rows=len(records_to_insert))
     if records_to_insert:
         insert_query = """
             INSERT INTO gamma.record (temperature, last_watered, soil_moisture, recording_taken, plant_id)
@@ -239,6 +272,67 @@ def insert_record(data: DataFrame, conn: Connection):
         logger.info("No new records to insert.")
 
 
+@traced("load.loaded_records")
+def drop_loaded_records(data: DataFrame, conn: Connection) -> DataFrame:
+    """Return data without the readings already in `record`, matched by plant and time taken."""
+    logger = getLogger()
+    if data.empty:
+        return data
+    taken = pd.to_datetime(data["recording_taken"], utc=True).dt.tz_localize(None)
+    loaded_query = """
+        SELECT plant_id, recording_taken FROM gamma.record
+        WHERE recording_taken BETWEEN ? AND ?
+    """
+    with conn.cursor() as curs:
+        curs.execute(loaded_query, (taken.min().to_pydatetime(), taken.max().to_pydatetime()))
+        loaded = {(int(plant_id), pd.Timestamp(recorded))
+                  for plant_id, recorded in curs.fetchall()}
+
+    is_new = [key not in loaded for key in zip(data["plant_id"].astype(int), taken)]
+    set_attributes(rows=len(is_new) - sum(is_new))
+    if not all(is_new):
+        logger.info("Skipping %d readings already loaded.", len(is_new) - sum(is_new))
+    return data[is_new]
+
+
+@traced("load.latest_readings")
+def upsert_latest_readings(data: DataFrame, conn: Connection):
+    """Replace each plant's row in `latest_reading` with its newest reading."""
+    logger = getLogger()
+    logger.info("Updating latest_reading...")
+
+    latest = data.sort_values("recording_taken").drop_duplicates(
+        "plant_id", keep="last")
+    latest_readings = [
+        (
+            int(row.plant_id),
+            to_reading(row.temperature),
+            pd.to_datetime(row.last_watered, utc=True),
+            to_reading(row.soil_moisture),
+            pd.to_datetime(row.recording_taken, utc=True)
+        )
+        for row in latest.itertuples(index=False)
+    ]
+
+    set_attributes(rows=len(latest_readings))
+    if latest_readings:
+        plant_ids = [(reading[0],) for reading in latest_readings]
+        insert_query = """
+            INSERT INTO gamma.latest_reading
+            (plant_id, temperature, last_watered, soil_moisture, recording_taken)
+            VALUES (?, ?, ?, ?, ?)
+        """
+        with conn.cursor() as curs:
+            curs.executemany(
+                "DELETE FROM gamma.latest_reading WHERE plant_id = ?", plant_ids)
+            curs.executemany(insert_query, latest_readings)
+            conn.commit()
+            logger.info("Updated %d latest readings.", len(latest_readings))
+    else:
+        logger.info("No latest readings to update.")
+
+
+@traced("load.load_data")
 def load_data(data: DataFrame, conn: Connection):
     """Load all plant data to the database in correct order."""
     logger = getLogger()
@@ -254,6 +348,83 @@ def load_data(data: DataFrame, conn: Connection):
     logger.info("Data load pipeline completed successfully.")
 
 
+def run_on_connection(insert, data: DataFrame, get_conn):
+    """Run an insert step on its own database connection."""
+    conn = get_conn()
+    try:
+        insert(data, conn)
+    finally:
+        conn.close()
+
+
+def split_records(data: DataFrame, batch_size: int, workers: int) -> list[DataFrame]:
+    """Split records into batches of whole plants, at most one per worker."""
+    batch_count = min(workers, -(-len(data) // batch_size))
+    if batch_count <= 1:
+        return [data]
+    plant_batches = np.array_split(data["plant_id"].unique(), batch_count)
+    return [data[data["plant_id"].isin(plant_ids)]
+            for plant_ids in plant_batches if len(plant_ids)]
+
+
+def insert_record_batches(data: DataFrame, get_conn, workers: int = 1,
+                          batch_size: int = RECORD_BATCH_SIZE):
+    """Insert records in plant batches across a small pool of connections."""
+    logger = getLogger()
+    batches = split_records(data, batch_size, workers)
+    logger.info("Inserting records in %d batches...", len(batches))
+
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        futures = [executor.submit(copy_context().run, run_on_connection,
+                                   insert_record, batch, get_conn)
+                   for batch in batches]
+    for future in futures:
+        future.result()
+
+
+def get_load_steps(record_workers: int) -> dict[str, tuple]:
+    """Return each load step with the steps it depends on."""
+    return {
+        "origin_country": (partial(run_on_connection, insert_origin_country), ()),
+        "botanist": (partial(run_on_connection, insert_botanist), ()),
+        "origin_city": (partial(run_on_connection, insert_origin_city),
+                        ("origin_country",)),
+        "plant": (partial(run_on_connection, insert_plant), ("origin_city",)),
+        "botanist_plant": (partial(run_on_connection, insert_botanist_plant),
+                           ("botanist", "plant")),
+        "record": (partial(insert_record_batches, workers=record_workers),
+                   ("plant",))
+    }
+
+
+@traced("load.load_data_concurrently")
+def load_data_concurrently(data: DataFrame, get_conn=get_connection, workers: int = 2):
+    """Load all plant data, running independent steps on separate connections."""
+    logger = getLogger()
+    logger.info("Starting concurrent data load pipeline with %d workers...", workers)
+
+    steps = get_load_steps(workers)
+    done = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while len(done) < len(steps):
+            for name, (step, dependencies) in steps.items():
+                if (name not in done and name not in running.values()
+                        and all(dependency in done for dependency in dependencies)):
+                    running[executor.submit(copy_context().run, step,
+                                            data, get_conn)] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step_name = running.pop(future)
+                future.result()
+                done.add(step_name)
+                logger.info("Finished load step: %s", step_name)
+
+    logger.info("Concurrent data load pipeline completed successfully.")
+
+
 if __name__ == "__main__":
     load_dotenv()
 
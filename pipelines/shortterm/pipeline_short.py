@@ -1,4 +1,6 @@
 """Script to run the full short term pipeline."""
+from importlib import import_module
+from os import environ as ENV
 from sys import stdout
 from logging import getLogger, StreamHandler, INFO
 
@@ -6,7 +8,12 @@ from dotenv import load_dotenv
 import pandas as pd
 
 from transform_short import transform_data
-from load_short import get_connection, load_data
+from load_short import (get_connection, load_data, load_data_concurrently,
+                        upsert_latest_readings, drop_loaded_records)
+from tracing_short import span
+from lease_short import run_exclusively, parse_scheduled_time
+from buffer_short import (write_buffer, list_buffer, should_flush, read_buffer,
+                          delete_buffer, get_flush_limits)
 
 
 def set_logger():
@@ -16,21 +23,92 @@ def set_logger():
     logger.addHandler(StreamHandler(stdout))
 
 
-def run_pipeline():
-    """Runs the pipeline."""
+def get_prewarm_modules() -> list[str]:
+    """Return the lazily imported modules the configured run will use."""
+    modules = []
+    if ENV.get("BUFFER_URI", "").startswith("s3://"):
+        modules.append("boto3")
+    return modules
+
+
+def prewarm():
+    """Import the lazily imported modules the configured run will use."""
+    for module in get_prewarm_modules():
+        import_module(module)
+
+
+def load_readings(data: pd.DataFrame, get_conn=None):
+    """Load readings into RDS, concurrently if LOAD_WORKERS is above 1.
+
+    A shared connection, such as the daemon's, is used for the whole load, as
+    concurrent steps each open and close a connection of their own.
+    """
+    logger = getLogger()
+    load_workers = int(ENV.get("LOAD_WORKERS", "1"))
+    if load_workers > 1 and get_conn is not None:
+        logger.warning("Ignoring LOAD_WORKERS=%d to load on the shared database connection.",
+                       load_workers)
+        load_workers = 1
+    if load_workers > 1:
+        load_data_concurrently(data, get_connection, load_workers)
+    else:
+        with (get_conn or get_connection)() as conn:
+            load_data(data, conn)
+
+
+def buffer_readings(data: pd.DataFrame, buffer_uri: str, get_conn=None):
+    """Add readings to the buffer, and flush it to RDS once it is due.
+
+    A flush that fails after loading leaves its files in the buffer, so readings
+    already in RDS are skipped rather than loaded again by the next flush.
+    """
+    logger = getLogger()
+    write_buffer(data, buffer_uri)
+
+    buffered = list_buffer(buffer_uri)
+    if should_flush(buffered, *get_flush_limits()):
+        logger.info("Flushing %d buffered batches to RDS...", len(buffered))
+        with span("buffer.flush", files=len(buffered)):
+            readings = read_buffer(buffer_uri, buffered)
+            with (get_conn or get_connection)() as conn:
+                readings = drop_loaded_records(readings, conn)
+            if not readings.empty:
+                load_readings(readings, get_conn)
+            delete_buffer(buffer_uri, buffered)
+        logger.info("Successfully loaded buffered data into RDS!")
+
+
+def run_pipeline(session=None, get_conn=None):
+    """Runs the pipeline, optionally reusing an HTTP session and database connection."""
 
     logger = getLogger()
     logger.info("Starting short term ETL pipeline...")
 
-    clean_df = transform_data()
+    with span("short_pipeline.run"):
+        with span("transform") as stage:
+            clean_df = transform_data(session)
+            stage.set(rows=len(clean_df))
+
+        if clean_df.empty:
+            raise ValueError("No cleaned DataFrame received.")
+        logger.info("Successfully retrieved and cleaned data from API!")
+
+        buffer_uri = ENV.get("BUFFER_URI")
+        if buffer_uri:
+            with span("buffer", rows=len(clean_df)):
+                buffer_readings(clean_df, buffer_uri, get_conn)
+        else:
+            with span("load", rows=len(clean_df)):
+                load_readings(clean_df, get_conn)
+            logger.info("Successfully loaded data into RDS!")
+
+        with (get_conn or get_connection)() as conn:
+            upsert_latest_readings(clean_df, conn)
+        logger.info("Successfully updated latest readings!")
 
-    if clean_df.empty:
-        raise ValueError("No cleaned DataFrame received.")
-    logger.info("Successfully retrieved and cleaned data from API!")
 
-    with get_connection() as conn:
-        load_data(clean_df, conn)
-    logger.info("Successfully loaded data into RDS!")
+if "AWS_LAMBDA_FUNCTION_NAME" in ENV:
+    prewarm()
 
 
 def lambda_handler(event, context):
@@ -41,10 +119,12 @@ def lambda_handler(event, context):
     logger.info("Initiating short-term ETL with Lambda...")
 
     try:
-        run_pipeline()
+        ran = run_exclusively("short_pipeline", run_pipeline, get_connection,
+                              parse_scheduled_time(event))
         return {
             "statusCode": 200,
-            "message": "Short-term ETL pipeline completed."
+            "message": ("Short-term ETL pipeline completed." if ran
+                        else "Short-term ETL pipeline already running.")
         }
     except Exception as e:
         logger.error("Short-term ETL pipeline failed: %s", str(e))
@@ -0,0 +1,111 @@
+# pylint: skip-file
+"""Script to test loading into the local SQLite backend."""
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from backend_short import get_backend, get_sqlite_connection
+from buffer_short import list_buffer
+from load_short import load_data, upsert_latest_readings
+from pipeline_short import buffer_readings
+
+SCHEMA_FILE = Path(__file__).parents[2] / "architecture" / "database" / "schema_sqlite.sql"
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    db_path = tmp_path / "plants.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+    conn.close()
+    return str(db_path)
+
+
+@pytest.fixture
+def plant_data():
+    return pd.DataFrame([
+        {"plant_id": 1, "name": "Venus flytrap", "origin_city": "Stammside",
+         "origin_country": "Albania", "temperature": 13.77,
+         "last_watered": "2025-06-04 13:51:41.000000+00:00", "soil_moisture": 92.33,
+         "recording_taken": "2025-06-04 16:10:03.000000+00:00",
+         "botanist_name": "Kenneth Buckridge",
+         "botanist_email": "kenneth.buckridge@lnhm.co.uk", "botanist_phone": "+7639148635"},
+        {"plant_id": 2, "name": "Sundew", "origin_city": "Willowtown",
+         "origin_country": "Canada", "temperature": 18.21,
+         "last_watered": "2025-06-03 09:14:12.000000+00:00", "soil_moisture": 88.9,
+         "recording_taken": "2025-06-03 09:15:00.000000+00:00",
+         "botanist_name": "Kenneth Buckridge",
+         "botanist_email": "kenneth.buckridge@lnhm.co.uk", "botanist_phone": "+7639148635"}
+    ])
+
+
+def test_get_backend_defaults_to_mssql(monkeypatch):
+    monkeypatch.delenv("DB_BACKEND", raising=False)
+    assert get_backend() == "mssql"
+
+
+def test_get_backend_rejects_unknown(monkeypatch):
+    monkeypatch.setenv("DB_BACKEND", "oracle")
+    with pytest.raises(ValueError):
+        get_backend()
+
+
+def test_get_sqlite_connection_rejects_bad_schema(sqlite_path):
+    with pytest.raises(ValueError):
+        get_sqlite_connection(sqlite_path, "gamma; DROP")
+
+
+def test_load_data_into_sqlite(sqlite_path, plant_data):
+    conn = get_sqlite_connection(sqlite_path, "gamma")
+    load_data(plant_data, conn)
+    load_data(plant_data, conn)
+
+    with conn.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM gamma.origin_country;")
+        assert curs.fetchone()[0] == 2
+        curs.execute("SELECT COUNT(*) FROM gamma.botanist;")
+        assert curs.fetchone()[0] == 1
+        curs.execute("SELECT COUNT(*) FROM gamma.botanist_plant;")
+        assert curs.fetchone()[0] == 2
+        curs.execute("""SELECT temperature, recording_taken FROM gamma.record
+                        WHERE plant_id = 1 ORDER BY record_id LIMIT 1;""")
+        assert curs.fetchone() == (13.77, datetime(2025, 6, 4, 16, 10, 3))
+    conn.close()
+
+
+def test_upsert_latest_readings_into_sqlite(sqlite_path, plant_data):
+    conn = get_sqlite_connection(sqlite_path, "gamma")
+    upsert_latest_readings(plant_data, conn)
+    plant_data["temperature"] = [14.0, 19.0]
+    upsert_latest_readings(plant_data, conn)
+
+    with conn.cursor() as curs:
+        curs.execute("SELECT plant_id, temperature FROM gamma.latest_reading ORDER BY plant_id;")
+        assert curs.fetchall() == [(1, 14.0), (2, 19.0)]
+    conn.close()
+
+
+def test_buffer_flush_after_failed_delete_loads_readings_once(sqlite_path, plant_data,
+                                                              tmp_path, monkeypatch):
+    """Test a flush that fails between loading and deleting its files does not load
+    their readings again on the next flush."""
+    monkeypatch.setenv("DB_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", sqlite_path)
+    monkeypatch.setenv("FLUSH_ROWS", "1")
+    uri = str(tmp_path / "buffer")
+    later = plant_data.assign(recording_taken=["2025-06-04 16:11:03.000000+00:00",
+                                               "2025-06-04 16:11:00.000000+00:00"])
+
+    with patch("pipeline_short.delete_buffer", side_effect=RuntimeError):
+        with pytest.raises(RuntimeError):
+            buffer_readings(plant_data, uri)
+    buffer_readings(later, uri)
+
+    conn = get_sqlite_connection(sqlite_path, "gamma")
+    with conn.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM gamma.record;")
+        assert curs.fetchone()[0] == 4
+    conn.close()
+    assert list_buffer(uri) == []
@@ -0,0 +1,82 @@
+# pylint: skip-file
+"""Script to test functionality of the `buffer_short.py` script."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from buffer_short import (write_buffer, list_buffer, read_buffer, delete_buffer,
+                          should_flush, get_batch_name, parse_batch_name, split_s3_uri)
+
+NOW = datetime(2025, 6, 4, 16, 10, tzinfo=timezone.utc)
+
+
+def sample_readings():
+    return pd.DataFrame({"plant_id": [1, 2],
+                         "temperature": [13.77, 18.21],
+                         "botanist_phone": ["+7639148635", "+1445982713"]})
+
+
+def test_batch_name_round_trip():
+    written, rows = parse_batch_name(get_batch_name(50, NOW))
+    assert written == NOW
+    assert rows == 50
+
+
+def test_split_s3_uri():
+    assert split_s3_uri("s3://bucket/buffer/short/") == ("bucket", "buffer/short")
+
+
+def test_local_buffer_round_trip(tmp_path):
+    uri = str(tmp_path / "buffer")
+    write_buffer(sample_readings(), uri, NOW)
+    write_buffer(sample_readings(), uri, NOW + timedelta(minutes=1))
+
+    names = list_buffer(uri)
+    buffered = read_buffer(uri, names)
+
+    assert len(names) == 2
+    assert len(buffered) == 4
+    assert buffered["botanist_phone"].to_list()[0] == "+7639148635"
+
+    delete_buffer(uri, names)
+    assert list_buffer(uri) == []
+
+
+def test_list_buffer_missing_directory(tmp_path):
+    assert list_buffer(str(tmp_path / "missing")) == []
+
+
+@patch("buffer_short.get_s3_client")
+def test_write_buffer_to_s3(mock_get_client):
+    mock_s3 = MagicMock()
+    mock_get_client.return_value = mock_s3
+
+    name = write_buffer(sample_readings(), "s3://bucket/buffer", NOW)
+
+    kwargs = mock_s3.put_object.call_args.kwargs
+    assert kwargs["Bucket"] == "bucket"
+    assert kwargs["Key"] == f"buffer/{name}"
+
+
+def test_should_flush_empty_buffer():
+    assert not should_flush([], timedelta(minutes=10), 500, NOW)
+
+
+def test_should_flush_on_age():
+    names = [get_batch_name(50, NOW - timedelta(minutes=10))]
+    assert should_flush(names, timedelta(minutes=10), 500, NOW)
+
+
+def test_should_flush_on_rows():
+    names = [get_batch_name(300, NOW), get_batch_name(300, NOW)]
+    assert should_flush(names, timedelta(minutes=10), 500, NOW)
+
+
+def test_should_flush_on_day_rollover():
+    midnight = NOW.replace(hour=0, minute=1)
+    names = [get_batch_name(50, midnight - timedelta(minutes=2))]
+    assert should_flush(names, timedelta(minutes=10), 500, midnight)
+
+
+def test_should_not_flush_small_new_buffer():
+    names = [get_batch_name(50, NOW - timedelta(minutes=2)), get_batch_name(50, NOW)]
+    assert not should_flush(names, timedelta(minutes=10), 500, NOW)
@@ -0,0 +1,78 @@
+# pylint: skip-file
+"""Script to test functionality of the `daemon_short.py` script."""
+from unittest.mock import MagicMock
+from daemon_short import get_next_tick, run_daemon, PersistentConnection
+
+
+class FakeClock:
+    """Clock and stop event that advance time instead of sleeping."""
+
+    def __init__(self, ticks: int):
+        self.now = 100.0
+        self.ticks = ticks
+        self.waits = []
+
+    def __call__(self):
+        return self.now
+
+    def is_set(self):
+        return len(self.waits) >= self.ticks
+
+    def wait(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+
+
+def test_get_next_tick_on_grid():
+    assert get_next_tick(0, 12.5, 10) == 20
+
+
+def test_get_next_tick_exactly_on_tick():
+    assert get_next_tick(0, 20, 10) == 30
+
+
+def test_run_daemon_does_not_drift():
+    clock = FakeClock(ticks=3)
+
+    def run():
+        clock.now += 2.5
+
+    run_daemon(run, 10, clock, clock)
+
+    assert clock.waits == [7.5, 7.5, 7.5]
+    assert clock.now == 130
+
+
+def test_run_daemon_skips_overrun_ticks():
+    clock = FakeClock(ticks=2)
+    starts = []
+
+    def run():
+        starts.append(clock.now)
+        clock.now += 25
+
+    run_daemon(run, 10, clock, clock)
+
+    assert starts == [100, 130]
+
+
+def test_run_daemon_keeps_running_after_failure():
+    clock = FakeClock(ticks=2)
+    run = MagicMock(side_effect=[Exception("failed"), None])
+
+    run_daemon(run, 10, clock, clock)
+
+    assert run.call_count == 2
+
+
+def test_persistent_connection_reuses_and_resets():
+    connect = MagicMock(side_effect=[MagicMock(), MagicMock()])
+    connection = PersistentConnection(connect)
+
+    first = connection.get()
+    assert connection.get() is first
+
+    connection.reset()
+    first.close.assert_called_once()
+    assert connection.get() is not first
+    assert connect.call_count == 2
@@ -1,6 +1,7 @@
 # pylint: skip-file
 """Script to test functionality of the `extract_short.py` script."""
 import pytest
+from unittest.mock import MagicMock
 import pandas as pd
 from extract_short import fetch_all_plants, fetch_plant_info, APIError
 
@@ -79,3 +80,12 @@ def test_fetch_all_plants_returns_df(requests_mock):
     result = fetch_all_plants(1, 3)
 
     assert isinstance(result, pd.DataFrame)
+
+
+def test_fetch_plant_info_uses_session():
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.json.return_value = {"plant_id": 1}
+
+    assert fetch_plant_info(1, session) == {"plant_id": 1}
+    session.get.assert_called_once_with(f"{URL_BASE}1")
@@ -0,0 +1,138 @@
+# pylint: skip-file
+"""Script to test the run-overlap lease against the local SQLite backend."""
+import sqlite3
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+import pytest
+from backend_short import get_sqlite_connection
+from lease_short import (acquire_lease, release_lease, request_rerun, take_pending,
+                         run_exclusively, parse_scheduled_time, get_overlap_policy,
+                         utc_now)
+
+SCHEMA_FILE = Path(__file__).parents[2] / "architecture" / "database" / "schema_sqlite.sql"
+
+
+@pytest.fixture
+def get_conn(tmp_path):
+    db_path = tmp_path / "plants.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+    conn.close()
+    return partial(get_sqlite_connection, str(db_path), "gamma")
+
+
+def get_runs(get_conn) -> list[tuple]:
+    conn = get_conn()
+    runs = conn.execute("""SELECT job_name, outcome, lag_seconds, duration_seconds
+                           FROM gamma.job_run ORDER BY run_id;""").fetchall()
+    conn.close()
+    return runs
+
+
+def test_acquire_lease_once(get_conn):
+    conn = get_conn()
+    assert acquire_lease(conn, "short_pipeline", "first", 60)
+    assert not acquire_lease(conn, "short_pipeline", "second", 60)
+
+
+def test_acquire_lease_after_release(get_conn):
+    conn = get_conn()
+    acquire_lease(conn, "short_pipeline", "first", 60)
+    release_lease(conn, "short_pipeline", "first")
+    assert acquire_lease(conn, "short_pipeline", "second", 60)
+
+
+def test_acquire_lease_after_expiry(get_conn):
+    conn = get_conn()
+    acquire_lease(conn, "short_pipeline", "first", 60, utc_now() - timedelta(minutes=5))
+    assert acquire_lease(conn, "short_pipeline", "second", 60)
+
+
+def test_release_lease_ignores_other_holder(get_conn):
+    conn = get_conn()
+    acquire_lease(conn, "short_pipeline", "first", 60)
+    release_lease(conn, "short_pipeline", "second")
+    assert not acquire_lease(conn, "short_pipeline", "third", 60)
+
+
+def test_take_pending_once(get_conn):
+    conn = get_conn()
+    acquire_lease(conn, "short_pipeline", "first", 60)
+    assert request_rerun(conn, "short_pipeline")
+    assert take_pending(conn, "short_pipeline", "first", 60)
+    assert not take_pending(conn, "short_pipeline", "first", 60)
+
+
+def test_request_rerun_without_holder(get_conn):
+    assert not request_rerun(get_conn(), "short_pipeline")
+
+
+def test_run_exclusively_records_lag(get_conn):
+    calls = []
+    scheduled = utc_now() - timedelta(seconds=90)
+    assert run_exclusively("short_pipeline", lambda: calls.append(1), get_conn, scheduled)
+    assert calls == [1]
+    job_name, outcome, lag, duration = get_runs(get_conn)[0]
+    assert (job_name, outcome) == ("short_pipeline", "ran")
+    assert 90 <= lag < 120
+    assert duration >= 0
+
+
+def test_run_exclusively_adds_new_job(get_conn):
+    assert run_exclusively("new_job", lambda: None, get_conn)
+    assert [row[:3] for row in get_runs(get_conn)] == [("new_job", "ran", None)]
+
+
+def test_run_exclusively_skips_overlap(get_conn, monkeypatch):
+    monkeypatch.setenv("OVERLAP_POLICY", "skip")
+    calls = []
+
+    def run():
+        calls.append(1)
+        assert not run_exclusively("short_pipeline", run, get_conn)
+
+    assert run_exclusively("short_pipeline", run, get_conn)
+    assert calls == [1]
+    assert [row[1] for row in get_runs(get_conn)] == ["skipped", "ran"]
+
+
+def test_run_exclusively_merges_overlaps(get_conn, monkeypatch):
+    monkeypatch.setenv("OVERLAP_POLICY", "merge")
+    calls = []
+
+    def run():
+        calls.append(1)
+        if len(calls) == 1:
+            assert not run_exclusively("short_pipeline", run, get_conn)
+            assert not run_exclusively("short_pipeline", run, get_conn)
+
+    assert run_exclusively("short_pipeline", run, get_conn)
+    assert calls == [1, 1]
+    assert [row[1] for row in get_runs(get_conn)] == ["merged", "merged", "ran"]
+
+
+def test_run_exclusively_releases_after_failure(get_conn):
+    def fail():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        run_exclusively("short_pipeline", fail, get_conn)
+    assert [row[1] for row in get_runs(get_conn)] == ["failed"]
+    assert run_exclusively("short_pipeline", lambda: None, get_conn)
+
+
+def test_parse_scheduled_time():
+    assert parse_scheduled_time({"scheduled_time": "2025-06-01T12:00:00+01:00"}) \
+        == datetime(2025, 6, 1, 11, 0)
+
+
+@pytest.mark.parametrize("event", [{}, None, {"scheduled_time": "<aws.scheduler.scheduled-time>"}])
+def test_parse_scheduled_time_missing(event):
+    assert parse_scheduled_time(event) is None
+
+
+def test_get_overlap_policy_rejects_unknown(monkeypatch):
+    monkeypatch.setenv("OVERLAP_POLICY", "queue")
+    with pytest.raises(ValueError):
+        get_overlap_policy()
@@ -1,8 +1,12 @@
 # pylint: skip-file
 """Script to test functionality of the `load_short.py` script."""
+from decimal import Decimal
+from threading import Lock
 from unittest.mock import MagicMock, patch
 import pandas as pd
-from load_short import insert_origin_country, insert_botanist, insert_origin_city, load_data
+from load_short import (insert_origin_country, insert_botanist, insert_origin_city, load_data,
+                        load_data_concurrently, insert_record_batches, split_records,
+                        insert_record, to_reading, upsert_latest_readings)
 
 
 @patch("load_short.getLogger")
@@ -196,3 +200,114 @@ def test_load_data(mock_logger, mock_record, mock_bp, mock_plant, mock_botanist,
     mock_plant.assert_called_once_with(mock_data, mock_conn)
     mock_bp.assert_called_once_with(mock_data, mock_conn)
     mock_record.assert_called_once_with(mock_data, mock_conn)
+
+
+def test_load_data_concurrently_respects_dependencies():
+    order = []
+    lock = Lock()
+
+    def recorder(name):
+        def insert(data, conn):
+            with lock:
+                order.append(name)
+        return insert
+
+    mock_data = pd.DataFrame({"plant_id": [1, 2]})
+    mock_get_conn = MagicMock()
+
+    with patch("load_short.insert_origin_country", recorder("country")), \
+            patch("load_short.insert_origin_city", recorder("city")), \
+            patch("load_short.insert_botanist", recorder("botanist")), \
+            patch("load_short.insert_plant", recorder("plant")), \
+            patch("load_short.insert_botanist_plant", recorder("botanist_plant")), \
+            patch("load_short.insert_record", recorder("record")):
+        load_data_concurrently(mock_data, mock_get_conn, workers=3)
+
+    assert sorted(order) == sorted(["country", "city", "botanist", "plant",
+                                    "botanist_plant", "record"])
+    assert order.index("country") < order.index("city") < order.index("plant")
+    assert order.index("plant") < order.index("record")
+    assert order.index("plant") < order.index("botanist_plant")
+    assert order.index("botanist") < order.index("botanist_plant")
+    assert mock_get_conn.return_value.close.call_count == 6
+
+
+def test_split_records_keeps_plants_together():
+    data = pd.DataFrame({"plant_id": [1, 1, 2, 2, 3, 3, 4, 4],
+                         "temperature": range(8)})
+
+    batches = split_records(data, batch_size=2, workers=3)
+
+    assert len(batches) == 3
+    assert sum(len(batch) for batch in batches) == len(data)
+    plant_sets = [set(batch["plant_id"]) for batch in batches]
+    assert not set.intersection(*plant_sets)
+
+
+def test_split_records_small_batch_not_split():
+    data = pd.DataFrame({"plant_id": [1, 2, 3]})
+
+    batches = split_records(data, batch_size=10, workers=4)
+
+    assert len(batches) == 1
+
+
+@patch("load_short.insert_record")
+def test_insert_record_batches_uses_connection_per_batch(mock_insert):
+    data = pd.DataFrame({"plant_id": [1, 2, 3, 4]})
+    mock_get_conn = MagicMock()
+
+    insert_record_batches(data, mock_get_conn, workers=2, batch_size=2)
+
+    assert mock_insert.call_count == 2
+    assert mock_get_conn.call_count == 2
+    assert mock_get_conn.return_value.close.call_count == 2
+
+
+def test_to_reading():
+    assert to_reading(13.771) == Decimal("13.77")
+    assert to_reading("") is None
+    assert to_reading(float("nan")) is None
+
+
+@patch("load_short.getLogger")
+def test_insert_record_sends_fixed_precision_readings(mock_get_logger):
+    test_data = pd.DataFrame({
+        "temperature": [14.77, ""],
+        "last_watered": ["2025-06-04 13:51:41+00:00", "2025-06-04 13:51:41+00:00"],
+        "soil_moisture": [19.2, 20.0],
+        "recording_taken": ["2025-06-05 12:35:06+00:00", "2025-06-05 12:36:06+00:00"],
+        "plant_id": [1, 300]
+    })
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    insert_record(test_data, mock_conn)
+
+    rows = mock_cursor.executemany.call_args.args[1]
+    assert rows[0][0] == Decimal("14.77")
+    assert rows[0][2] == Decimal("19.20")
+    assert rows[1][0] is None
+    assert rows[1][4] == 300
+
+
+def test_upsert_latest_readings_keeps_newest():
+    data = pd.DataFrame({
+        "plant_id": [1, 1, 2],
+        "temperature": [13.0, 14.0, 18.21],
+        "last_watered": ["2025-06-04 13:51:41+00:00"] * 3,
+        "soil_moisture": [92.0, 91.0, 88.9],
+        "recording_taken": ["2025-06-04 16:09:00+00:00", "2025-06-04 16:10:00+00:00",
+                            "2025-06-04 16:10:00+00:00"]
+    })
+    mock_conn = MagicMock()
+    mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+
+    upsert_latest_readings(data, mock_conn)
+
+    deleted, inserted = mock_cursor.executemany.call_args_list
+    assert deleted.args[1] == [(1,), (2,)]
+    assert [row[:2] for row in inserted.args[1]] == [(1, Decimal("14.00")),
+                                                      (2, Decimal("18.21"))]
+    mock_conn.commit.assert_called_once()
@@ -1,9 +1,12 @@
 # pylint: skip-file
 import pytest
 import pandas as pd
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+from os import environ
 
-from pipeline_short import run_pipeline, lambda_handler
+from pipeline_short import run_pipeline, lambda_handler, get_prewarm_modules, load_readings
+from daemon_short import PersistentConnection
 
 
 @patch("pipeline_short.transform_data", return_value=pd.DataFrame())
@@ -12,24 +15,97 @@ def test_run_pipeline_raises_on_empty_df(mock_transform):
         run_pipeline()
 
 
+@patch("pipeline_short.upsert_latest_readings")
 @patch("pipeline_short.transform_data")
 @patch("pipeline_short.get_connection")
 @patch("pipeline_short.load_data")
-def test_run_pipeline_success(mock_load, mock_conn, mock_transform):
+def test_run_pipeline_success(mock_load, mock_conn, mock_transform, mock_upsert):
     mock_transform.return_value = pd.DataFrame({"plant_id": [1, 2, 3]})
     mock_conn.return_value.__enter__.return_value = "fake_conn"
     run_pipeline()
     mock_load.assert_called_once()
+    mock_upsert.assert_called_once()
 
 
+@patch("pipeline_short.upsert_latest_readings")
+@patch("pipeline_short.get_connection")
+@patch("pipeline_short.transform_data")
+@patch("pipeline_short.load_data_concurrently")
+@patch("pipeline_short.load_data")
+def test_run_pipeline_concurrent_load(mock_load, mock_concurrent, mock_transform,
+                                      mock_conn, mock_upsert):
+    mock_transform.return_value = pd.DataFrame({"plant_id": [1, 2, 3]})
+    with patch.dict(environ, {"LOAD_WORKERS": "4"}):
+        run_pipeline()
+    mock_load.assert_not_called()
+    assert mock_concurrent.call_args.args[2] == 4
+
+
+@patch("pipeline_short.upsert_latest_readings")
+@patch("pipeline_short.drop_loaded_records", side_effect=lambda data, conn: data)
+@patch("pipeline_short.get_connection")
+@patch("pipeline_short.transform_data")
+@patch("pipeline_short.load_data")
+def test_run_pipeline_buffers_until_due(mock_load, mock_transform, mock_conn,
+                                        mock_loaded, mock_upsert, tmp_path):
+    mock_transform.return_value = pd.DataFrame({"plant_id": [1, 2, 3]})
+    buffer_env = {"BUFFER_URI": str(tmp_path), "FLUSH_MINUTES": "10", "FLUSH_ROWS": "6"}
+    with patch.dict(environ, buffer_env):
+        run_pipeline()
+        mock_load.assert_not_called()
+        mock_upsert.assert_called_once()
+
+        run_pipeline()
+    assert len(mock_load.call_args.args[0]) == 6
+    assert list(tmp_path.iterdir()) == []
+
+
+def run_now(job_name, run, *args):
+    run()
+    return True
+
+
+@patch("pipeline_short.run_exclusively", side_effect=run_now)
 @patch("pipeline_short.run_pipeline", return_value=None)
-def test_lambda_handler_success(mock_pipeline):
+def test_lambda_handler_success(mock_pipeline, mock_exclusively):
     response = lambda_handler({}, {})
     assert response["statusCode"] == 200
     assert response["message"] == "Short-term ETL pipeline completed."
+    mock_pipeline.assert_called_once()
 
 
+@patch("pipeline_short.run_exclusively", side_effect=run_now)
 @patch("pipeline_short.run_pipeline", side_effect=Exception("failed"))
-def test_lambda_handler_fails(mock_pipeline):
+def test_lambda_handler_fails(mock_pipeline, mock_exclusively):
     with pytest.raises(RuntimeError, match="Error with Python runtime."):
         lambda_handler({}, {})
+
+
+@patch("pipeline_short.run_exclusively", return_value=False)
+def test_lambda_handler_already_running(mock_exclusively):
+    response = lambda_handler({"scheduled_time": "2025-06-01T12:00:00Z"}, {})
+    assert response["message"] == "Short-term ETL pipeline already running."
+    assert mock_exclusively.call_args.args[3] == datetime(2025, 6, 1, 12, 0)
+
+
+def test_get_prewarm_modules_for_s3_buffer():
+    with patch.dict(environ, {"BUFFER_URI": "s3://bucket/buffer"}):
+        assert get_prewarm_modules() == ["boto3"]
+
+
+def test_get_prewarm_modules_without_buffer():
+    with patch.dict(environ, {"BUFFER_URI": ""}):
+        assert get_prewarm_modules() == []
+
+
+@patch("pipeline_short.get_connection")
+@patch("pipeline_short.load_data_concurrently")
+@patch("pipeline_short.load_data")
+def test_load_readings_uses_the_daemon_connection(mock_load, mock_concurrent, mock_conn):
+    db_connection = PersistentConnection(MagicMock)
+    data = pd.DataFrame({"plant_id": [1, 2, 3]})
+    with patch.dict(environ, {"LOAD_WORKERS": "4"}):
+        load_readings(data, db_connection.get)
+    mock_concurrent.assert_not_called()
+    mock_conn.assert_not_called()
+    assert mock_load.call_args.args[1] is db_connection.conn.__enter__.return_value
@@ -0,0 +1,27 @@
+# pylint: skip-file
+"""Script to test tracing across the short term pipeline."""
+import json
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from load_short import load_data_concurrently
+from tracing_short import span
+
+
+def noop_step(data, get_conn):
+    with span("step"):
+        pass
+
+
+@patch("load_short.get_load_steps")
+def test_concurrent_load_spans_share_trace(mock_steps, tmp_path, monkeypatch):
+    trace_file = tmp_path / "trace.jsonl"
+    monkeypatch.setenv("TRACE_OUTPUT", str(trace_file))
+    mock_steps.return_value = {"a": (noop_step, ()), "b": (noop_step, ("a",))}
+
+    load_data_concurrently(pd.DataFrame(), MagicMock(), workers=2)
+
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    parent = spans[-1]
+    assert parent["name"] == "load.load_data_concurrently"
+    assert [s["parentSpanId"] for s in spans[:-1]] == [parent["spanId"]] * 2
+    assert {s["traceId"] for s in spans} == {parent["traceId"]}
@@ -107,10 +107,10 @@ def clean_df(plants_df: DataFrame) -> DataFrame:
     return clean_df
 
 
-def transform_data() -> DataFrame:
+def transform_data(session=None) -> DataFrame:
     """Runs the transformation phase of the pipeline."""
 
-    raw_plants_df = fetch_all_plants()
+    raw_plants_df = fetch_all_plants(session=session)
     raw_plants_df = extract_nested_columns(raw_plants_df)
     raw_plants_df = drop_irrelevant_columns(raw_plants_df)
     clean_plants_df = clean_df(raw_plants_df)
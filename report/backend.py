@@ -0,0 +1,95 @@
+"""Module for running against an embedded SQLite database in place of SQL Server."""
+
+import sqlite3
+from datetime import datetime, timezone
+from decimal import Decimal
+from os import environ as ENV
+
+from numpy import int64, float64
+from pandas import Timestamp
+
+DIALECTS = {
+    "mssql": {
+        "hours_ago": "DATEADD(hour, -{hours}, GETDATE())",
+        "today": "CAST(CAST(GETDATE() AS DATE) AS DATETIME)",
+        "top": "TOP {rows}",
+        "limit": "",
+        "truncate": "TRUNCATE TABLE {table}"
+    },
+    "sqlite": {
+        "hours_ago": "datetime('now', '-{hours} hours')",
+        "today": "datetime('now', 'start of day')",
+        "top": "",
+        "limit": "LIMIT {rows}",
+        "truncate": "DELETE FROM {table}"
+    }
+}
+
+
+def get_backend() -> str:
+    """Return the configured database backend."""
+    backend = ENV.get("DB_BACKEND", "mssql")
+    if backend not in DIALECTS:
+        raise ValueError(f"Unknown database backend: {backend}")
+    return backend
+
+
+def get_dialect() -> dict[str, str]:
+    """Return the SQL fragments for the configured database backend."""
+    return DIALECTS[get_backend()]
+
+
+def to_sqlite_datetime(value: datetime) -> str:
+    """Return a datetime as naive UTC text, matching SQL Server DATETIME storage."""
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(" ")
+
+
+def from_sqlite_datetime(value: bytes) -> datetime:
+    """Return a datetime from SQLite DATETIME text."""
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, to_sqlite_datetime)
+sqlite3.register_adapter(Timestamp, to_sqlite_datetime)
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(int64, int)
+sqlite3.register_adapter(float64, float)
+sqlite3.register_converter("DATETIME", from_sqlite_datetime)
+
+
+class BackendCursor(sqlite3.Cursor):
+    """SQLite cursor that supports the pyodbc cursor context manager and commit."""
+
+    def __enter__(self):
+        """Return the cursor."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the cursor."""
+        self.close()
+
+    def commit(self):
+        """Commit the cursor's connection."""
+        self.connection.commit()
+
+
+class BackendConnection(sqlite3.Connection):
+    """SQLite connection returning pyodbc style cursors."""
+
+    def cursor(self, factory=BackendCursor):
+        """Return a new cursor."""
+        return super().cursor(factory)
+
+
+def get_sqlite_connection(db_path: str, schema: str) -> BackendConnection:
+    """Return a SQLite connection with the database attached under the schema name."""
+    if not schema.isidentifier():
+        raise ValueError(f"Invalid schema name: {schema}")
+    conn = sqlite3.connect(":memory:", factory=BackendConnection,
+                           detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False)
+    conn.execute(f"ATTACH DATABASE ? AS {schema};", (db_path,))
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
@@ -11,10 +11,16 @@ from pandas import DataFrame, Series
 import numpy as np
 from pyodbc import connect, Connection
 
+from backend import get_backend, get_sqlite_connection
+from tracing import traced, set_attributes
+
 
 def get_connection():
     """Return database connection."""
     logger = getLogger()
+    if get_backend() == "sqlite":
+        logger.info("Getting local SQLite connection...")
+        return get_sqlite_connection(ENV["SQLITE_PATH"], ENV.get("DB_SCHEMA", "gamma"))
     logger.info("Getting RDS connection...")
     connection_string = f"""
                             DRIVER={{ODBC Driver 18 for SQL Server}};
@@ -35,6 +41,7 @@ def detect_outliers(series: Series) -> Series:
     return z_scores > 3
 
 
+@traced("extract.get_latest_readings")
 def get_latest_readings(conn: Connection) -> DataFrame:
     """Get 3 latest readings for each plant."""
     query = """
@@ -63,7 +70,9 @@ def get_latest_readings(conn: Connection) -> DataFrame:
     WHERE lr.record = 1 OR lr.record = 2 OR lr.record = 3
     """
 
-    return pd.read_sql(query, conn)
+    readings = pd.read_sql(query, conn)
+    set_attributes(rows=len(readings))
+    return readings.astype({"temperature": float, "soil_moisture": float})
 
 
 def create_issue_message(row):
@@ -0,0 +1,139 @@
+"""Module for stopping scheduled runs of a job from overlapping, using a database lease."""
+
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from os import environ as ENV
+from uuid import uuid4
+
+TABLE_PREFIX = ""
+OVERLAP_POLICIES = ("skip", "merge")
+
+
+def utc_now() -> datetime:
+    """Return the current time as naive UTC, matching DATETIME columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_scheduled_time(event) -> datetime | None:
+    """Return the scheduled time passed in a scheduler event, as naive UTC."""
+    value = event.get("scheduled_time") if isinstance(event, dict) else None
+    if not value or value.startswith("<"):
+        return None
+    scheduled = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if scheduled.tzinfo:
+        scheduled = scheduled.astimezone(timezone.utc).replace(tzinfo=None)
+    return scheduled
+
+
+def get_overlap_policy() -> str:
+    """Return whether an overlapping run is skipped or merged into the running one."""
+    policy = ENV.get("OVERLAP_POLICY", "skip")
+    if policy not in OVERLAP_POLICIES:
+        raise ValueError(f"Unknown overlap policy: {policy}")
+    return policy
+
+
+def ensure_lease(conn, job_name: str):
+    """Add the job's lease row if it does not exist yet."""
+    with conn.cursor() as curs:
+        curs.execute(f"""INSERT INTO {TABLE_PREFIX}job_lease (job_name, pending)
+                         SELECT ?, 0 WHERE NOT EXISTS (
+                            SELECT 1 FROM {TABLE_PREFIX}job_lease WHERE job_name = ?);""",
+                     (job_name, job_name))
+        conn.commit()
+
+
+def acquire_lease(conn, job_name: str, holder: str, seconds: int,
+                  now: datetime = None) -> bool:
+    """Return true if the lease was free or expired and is now held by holder."""
+    now = now or utc_now()
+    with conn.cursor() as curs:
+        curs.execute(f"""UPDATE {TABLE_PREFIX}job_lease
+                         SET holder = ?, expires_at = ?, pending = 0
+                         WHERE job_name = ?
+                         AND (holder IS NULL OR expires_at < ?);""",
+                     (holder, now + timedelta(seconds=seconds), job_name, now))
+        acquired = curs.rowcount == 1
+        conn.commit()
+    return acquired
+
+
+def request_rerun(conn, job_name: str) -> bool:
+    """Return true if the running holder was asked to run the job once more."""
+    with conn.cursor() as curs:
+        curs.execute(f"""UPDATE {TABLE_PREFIX}job_lease SET pending = 1
+                         WHERE job_name = ? AND holder IS NOT NULL;""", (job_name,))
+        requested = curs.rowcount == 1
+        conn.commit()
+    return requested
+
+
+def take_pending(conn, job_name: str, holder: str, seconds: int) -> bool:
+    """Return true if a rerun was requested, clearing it and extending the lease."""
+    with conn.cursor() as curs:
+        curs.execute(f"""UPDATE {TABLE_PREFIX}job_lease
+                         SET pending = 0, expires_at = ?
+                         WHERE job_name = ? AND holder = ? AND pending = 1;""",
+                     (utc_now() + timedelta(seconds=seconds), job_name, holder))
+        pending = curs.rowcount == 1
+        conn.commit()
+    return pending
+
+
+def release_lease(conn, job_name: str, holder: str):
+    """Free the lease if it is still held by holder."""
+    with conn.cursor() as curs:
+        curs.execute(f"""UPDATE {TABLE_PREFIX}job_lease
+                         SET holder = NULL, expires_at = NULL
+                         WHERE job_name = ? AND holder = ?;""", (job_name, holder))
+        conn.commit()
+
+
+def record_run(conn, job_name: str, scheduled_at: datetime | None, started_at: datetime,
+               finished_at: datetime | None, outcome: str):
+    """Record a run's outcome and how far behind its schedule it started."""
+    logger = getLogger()
+    lag = (started_at - scheduled_at).total_seconds() if scheduled_at else None
+    duration = (finished_at - started_at).total_seconds() if finished_at else None
+    with conn.cursor() as curs:
+        curs.execute(f"""INSERT INTO {TABLE_PREFIX}job_run
+                         (job_name, scheduled_at, started_at, finished_at,
+                          lag_seconds, duration_seconds, outcome)
+                         VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                     (job_name, scheduled_at, started_at, finished_at, lag, duration, outcome))
+        conn.commit()
+    logger.info("Recorded %s run as %s, %s seconds behind schedule.", job_name, outcome, lag)
+
+
+def run_exclusively(job_name: str, run, get_conn, scheduled_at: datetime = None,
+                    lease_seconds: int = None) -> bool:
+    """Run a job unless another run holds its lease, returning true if it ran."""
+    logger = getLogger()
+    policy = get_overlap_policy()
+    lease_seconds = lease_seconds or int(ENV.get("LEASE_SECONDS", "150"))
+    holder = uuid4().hex
+    started_at = utc_now()
+
+    conn = get_conn()
+    try:
+        ensure_lease(conn, job_name)
+        if not acquire_lease(conn, job_name, holder, lease_seconds, started_at):
+            outcome = "merged" if policy == "merge" and request_rerun(conn, job_name) \
+                else "skipped"
+            logger.warning("%s is already running, this run was %s.", job_name, outcome)
+            record_run(conn, job_name, scheduled_at, started_at, None, outcome)
+            return False
+
+        outcome = "failed"
+        try:
+            run()
+            while take_pending(conn, job_name, holder, lease_seconds):
+                logger.info("Running %s again for a merged overlapping run...", job_name)
+                run()
+            outcome = "ran"
+        finally:
+            release_lease(conn, job_name, holder)
+            record_run(conn, job_name, scheduled_at, started_at, utc_now(), outcome)
+        return True
+    finally:
+        conn.close()
@@ -5,9 +5,10 @@ from logging import getLogger, INFO, StreamHandler
 
 from dotenv import load_dotenv
 
-import boto3
 from pandas import DataFrame
 from data import get_connection, identify_critical_plants
+from tracing import span
+from lease import run_exclusively, parse_scheduled_time
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -52,30 +53,47 @@ def report_to_topic(sns_client, report: str):
         logger.error("Failed to send message: %s", e)
 
 
-def run():
-    """Run the Report script."""
+def get_sns_client():
+    """Return SNS client, importing boto3 only when there is a report to send."""
+    import boto3  # pylint: disable=import-outside-toplevel
     sns_client = boto3.client(
         "sns", aws_access_key_id=ENV["AWS_ACCESS_KEY_ID"],
         aws_secret_access_key=ENV["AWS_SECRET_ACCESS_KEY"],
         aws_session_token=ENV["AWS_SESSION_TOKEN"],
         region_name=ENV["TOPIC_REGION"])
     logger.info("Connected to SNS Topic.")
+    return sns_client
 
-    with get_connection() as conn:
-        critical_plants = identify_critical_plants(conn)
 
-    report = turn_to_report(critical_plants)
-    report_to_topic(sns_client, report)
+def run():
+    """Run the Report script."""
+    with span("report.run"):
+        with span("extract") as stage:
+            with get_connection() as conn:
+                critical_plants = identify_critical_plants(conn)
+            stage.set(rows=len(critical_plants))
+
+        with span("report") as stage:
+            report = turn_to_report(critical_plants)
+            stage.set(bytes=len(report.encode()))
+
+        if report:
+            with span("publish"):
+                report_to_topic(get_sns_client(), report)
+        else:
+            logger.info("No report to send. Skipping SNS publish.")
     return report
 
 
 def lambda_handler(event=None, context=None):
     """AWS Lambda handler that sends out plant report using SNS."""
     try:
-        report = run()
+        reports = []
+        run_exclusively("report", lambda: reports.append(run()), get_connection,
+                        parse_scheduled_time(event))
         return {
             "statusCode": 200,
-            "message": report
+            "message": reports[-1] if reports else "Report already running."
         }
     except Exception as e:
         logger.error("Error processing pipeline: %s", str(e))
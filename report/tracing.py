@@ -0,0 +1,115 @@
+"""Module for timing pipeline stages as OpenTelemetry style trace spans."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from json import dumps
+from os import environ as ENV, urandom
+from sys import stdout
+from threading import Lock
+from time import time_ns
+
+CURRENT_SPAN = ContextVar("current_span", default=None)
+EXPORT_LOCK = Lock()
+
+
+class Span:
+    """A timed stage of a pipeline run, with attributes such as row counts."""
+
+    def __init__(self, name: str, parent: "Span" = None):
+        """Start a span as a child of parent, or of a new trace."""
+        self.name = name
+        self.trace_id = parent.trace_id if parent else urandom(16).hex()
+        self.span_id = urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ""
+        self.start = time_ns()
+        self.end = None
+        self.attributes = {}
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        """Return the span in the OTLP JSON span shape."""
+        return {
+            "resource": {"service.name": ENV.get("OTEL_SERVICE_NAME", "lmnh-plant-health")},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": [{"key": key, "value": to_attribute_value(value)}
+                           for key, value in self.attributes.items()],
+            "status": ({"code": "STATUS_CODE_ERROR", "message": self.error}
+                       if self.error else {"code": "STATUS_CODE_OK"})
+        }
+
+
+def to_attribute_value(value) -> dict:
+    """Return an attribute value in the OTLP JSON value shape."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": value}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def export_span(finished: Span):
+    """Write a finished span as a JSON line to TRACE_OUTPUT, if it is set."""
+    output = ENV.get("TRACE_OUTPUT")
+    if not output:
+        return
+    line = dumps(finished.to_dict())
+    with EXPORT_LOCK:
+        if output == "stdout":
+            stdout.write(line + "\n")
+        else:
+            with open(output, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a span, nested under the current span."""
+    current = Span(name, CURRENT_SPAN.get())
+    current.set(**attributes)
+    token = CURRENT_SPAN.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        current.end = time_ns()
+        CURRENT_SPAN.reset(token)
+        export_span(current)
+
+
+def traced(name: str):
+    """Decorate a function to run inside a span."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span, if there is one."""
+    current = CURRENT_SPAN.get()
+    if current:
+        current.set(**attributes)
+
+
+def add_to_attribute(key: str, amount: int):
+    """Add to a counting attribute of the current span, if there is one."""
+    current = CURRENT_SPAN.get()
+    if current:
+        current.attributes[key] = current.attributes.get(key, 0) + amount
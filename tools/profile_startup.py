@@ -0,0 +1,63 @@
+"""Prints an import time breakdown for each Lambda handler."""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from os import path
+from subprocess import run
+from sys import executable
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+HANDLERS = {
+    "short": ("pipelines/shortterm", "pipeline_short"),
+    "long": ("pipelines/longterm", "pipeline"),
+    "report": ("report", "report")
+}
+
+
+def parse_import_times(output: str) -> list[tuple[str, int, int]]:
+    """Return the module name, self and cumulative microseconds of each import."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line.removeprefix("import time:").split("|")
+        imports.append((name.strip(), int(self_time), int(cumulative)))
+    return imports
+
+
+def get_package_times(imports: list[tuple[str, int, int]]) -> dict[str, int]:
+    """Return the total self time of each top level package, slowest first."""
+    totals = defaultdict(int)
+    for name, self_time, _ in imports:
+        totals[name.split(".")[0]] += self_time
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def profile_handler(directory: str, module: str) -> list[tuple[str, int, int]]:
+    """Return the import times of a handler module imported in a fresh interpreter."""
+    result = run([executable, "-X", "importtime", "-c", f"import {module}"],
+                 cwd=path.join(ROOT, directory), capture_output=True, text=True, check=True)
+    return parse_import_times(result.stderr)
+
+
+def print_breakdown(handler: str, imports: list[tuple[str, int, int]], top: int):
+    """Print the total import time and the slowest packages of a handler."""
+    total = sum(self_time for _, self_time, _ in imports)
+    print(f"\n{handler}: {total / 1000:.1f} ms to import")
+    print(f"{'package':<24}{'time (ms)':>12}{'share':>8}")
+    for package, self_time in list(get_package_times(imports).items())[:top]:
+        print(f"{package:<24}{self_time / 1000:>12.1f}{self_time / total:>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Print an import time breakdown for each handler.")
+    parser.add_argument("handlers", nargs="*", default=list(HANDLERS),
+                        help=f"Handlers to profile, from {', '.join(HANDLERS)}")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to show")
+    args = parser.parse_args()
+    unknown = set(args.handlers) - set(HANDLERS)
+    if unknown:
+        parser.error(f"unknown handlers: {', '.join(sorted(unknown))}")
+    for handler_name in args.handlers:
+        print_breakdown(handler_name, profile_handler(*HANDLERS[handler_name]), args.top)
@@ -0,0 +1,22 @@
+# pylint: skip-file
+"""Script to test functionality of the `profile_startup.py` script."""
+from profile_startup import parse_import_times, get_package_times
+
+IMPORT_TIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | pandas._libs
+import time:       900 |       1320 | pandas
+import time:        50 |         50 | boto3
+"""
+
+
+def test_parse_import_times():
+    assert parse_import_times(IMPORT_TIME_OUTPUT) == [("_io", 120, 120),
+                                                      ("pandas._libs", 300, 420),
+                                                      ("pandas", 900, 1320),
+                                                      ("boto3", 50, 50)]
+
+
+def test_get_package_times_sums_by_top_level_package():
+    package_times = get_package_times(parse_import_times(IMPORT_TIME_OUTPUT))
+    assert list(package_times.items()) == [("pandas", 1200), ("_io", 120), ("boto3", 50)]
@@ -0,0 +1,39 @@
+# pylint: skip-file
+"""Script to test functionality of the `view_traces.py` script."""
+import json
+from view_traces import parse_spans, group_traces, format_trace, summarise
+
+
+def make_span(name, span_id, parent_id, start_ms, end_ms, trace_id="t1", rows=None):
+    return {"traceId": trace_id, "spanId": span_id, "parentSpanId": parent_id, "name": name,
+            "startTimeUnixNano": start_ms * 1_000_000, "endTimeUnixNano": end_ms * 1_000_000,
+            "attributes": [] if rows is None else [{"key": "rows", "value": {"intValue": rows}}],
+            "status": {"code": "STATUS_CODE_OK"}}
+
+
+SPANS = [make_span("extract", "b", "a", 0, 40, rows=50),
+         make_span("load", "c", "a", 40, 100),
+         make_span("run", "a", "", 0, 100)]
+
+
+def test_parse_spans_skips_log_prefixes_and_text():
+    lines = ["START RequestId: 1\n",
+             f"2025-06-04T16:10:03Z\t{json.dumps(SPANS[0])}\n",
+             "{not json\n"]
+    assert parse_spans(lines) == [SPANS[0]]
+
+
+def test_format_trace_nests_and_places_bars():
+    lines = format_trace(group_traces(SPANS)["t1"])
+    assert lines[0].startswith("run")
+    assert lines[1].startswith("  extract")
+    assert lines[1].endswith("rows=50")
+    assert "|" + "█" * 16 + " " * 24 + "|" in lines[1]
+    assert "|" + " " * 16 + "█" * 24 + "|" in lines[2]
+
+
+def test_summarise_totals_span_paths_across_traces():
+    second = [make_span("run", "x", "", 0, 50, trace_id="t2")]
+    rows = summarise(group_traces(SPANS + second))
+    assert rows[0] == ("run", 2, 150.0, 100.0)
+    assert ("run/extract", 1, 40.0, 40.0) in rows
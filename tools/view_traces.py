@@ -0,0 +1,127 @@
+"""Prints trace spans written by the pipelines as a flame style timeline or summary."""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from json import loads, JSONDecodeError
+from sys import stdin
+
+BAR_WIDTH = 40
+
+
+def parse_spans(lines) -> list[dict]:
+    """Return the spans found in JSON lines, skipping any text before each span."""
+    spans = []
+    for line in lines:
+        start = line.find("{")
+        if start == -1:
+            continue
+        try:
+            found = loads(line[start:])
+        except JSONDecodeError:
+            continue
+        if "spanId" in found and "traceId" in found:
+            spans.append(found)
+    return spans
+
+
+def get_duration_ms(found: dict) -> float:
+    """Return the duration of a span in milliseconds."""
+    return (found["endTimeUnixNano"] - found["startTimeUnixNano"]) / 1_000_000
+
+
+def get_attributes(found: dict) -> dict:
+    """Return span attributes as a plain dictionary."""
+    return {attribute["key"]: next(iter(attribute["value"].values()))
+            for attribute in found.get("attributes", [])}
+
+
+def group_traces(spans: list[dict]) -> dict[str, list[dict]]:
+    """Return spans grouped by trace, in the order each trace started."""
+    traces = defaultdict(list)
+    for found in sorted(spans, key=lambda item: item["startTimeUnixNano"]):
+        traces[found["traceId"]].append(found)
+    return dict(traces)
+
+
+def walk_trace(spans: list[dict]):
+    """Yield each span of a trace with its depth and path, parents before children."""
+    span_ids = {found["spanId"] for found in spans}
+    children = defaultdict(list)
+    for found in spans:
+        parent = found["parentSpanId"] if found["parentSpanId"] in span_ids else ""
+        children[parent].append(found)
+
+    def walk(parent_id: str, depth: int, path: str):
+        for child in children[parent_id]:
+            child_path = f"{path}/{child['name']}" if path else child["name"]
+            yield child, depth, child_path
+            yield from walk(child["spanId"], depth + 1, child_path)
+
+    yield from walk("", 0, "")
+
+
+def format_trace(spans: list[dict]) -> list[str]:
+    """Return a trace as lines of indented spans with bars placed on its timeline."""
+    start = min(found["startTimeUnixNano"] for found in spans)
+    end = max(found["endTimeUnixNano"] for found in spans)
+    total = max(end - start, 1)
+    lines = []
+    for found, depth, _ in walk_trace(spans):
+        offset = round((found["startTimeUnixNano"] - start) / total * BAR_WIDTH)
+        width = max(1, round((found["endTimeUnixNano"] - found["startTimeUnixNano"])
+                             / total * BAR_WIDTH))
+        bar = " " * offset + "█" * min(width, BAR_WIDTH - offset)
+        attributes = " ".join(f"{key}={value}"
+                              for key, value in get_attributes(found).items())
+        error = " ERROR" if found["status"]["code"] == "STATUS_CODE_ERROR" else ""
+        name = "  " * depth + found["name"]
+        lines.append(f"{name:<40}{get_duration_ms(found):>10.1f} ms "
+                     f"|{bar:<{BAR_WIDTH}}| {attributes}{error}".rstrip())
+    return lines
+
+
+def summarise(traces: dict[str, list[dict]]) -> list[tuple[str, int, float, float]]:
+    """Return the count, total and max milliseconds of each span path across traces."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for spans in traces.values():
+        for found, _, path in walk_trace(spans):
+            duration = get_duration_ms(found)
+            total = totals[path]
+            total[0] += 1
+            total[1] += duration
+            total[2] = max(total[2], duration)
+    return sorted(((path, count, total, longest)
+                   for path, (count, total, longest) in totals.items()),
+                  key=lambda row: row[2], reverse=True)
+
+
+def print_summary(rows: list[tuple[str, int, float, float]]):
+    """Print span path totals, slowest first."""
+    print(f"{'span':<72}{'count':>7}{'total (ms)':>13}{'mean (ms)':>12}{'max (ms)':>11}")
+    for path, count, total, longest in rows:
+        print(f"{path:<72}{count:>7}{total:>13.1f}{total / count:>12.1f}{longest:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Print pipeline trace spans.")
+    parser.add_argument("files", nargs="*", help="Trace files, read from stdin if none")
+    parser.add_argument("--last", type=int, default=5, help="Number of traces to print")
+    parser.add_argument("--summary", action="store_true",
+                        help="Print totals per span across all traces instead")
+    args = parser.parse_args()
+
+    if args.files:
+        span_lines = []
+        for file_name in args.files:
+            with open(file_name, encoding="utf-8") as file:
+                span_lines.extend(file.readlines())
+    else:
+        span_lines = stdin.readlines()
+
+    all_traces = group_traces(parse_spans(span_lines))
+    if args.summary:
+        print_summary(summarise(all_traces))
+    else:
+        for trace_id, trace_spans in list(all_traces.items())[-args.last:]:
+            print(f"\ntrace {trace_id}")
+            print("\n".join(format_trace(trace_spans)))